@@ -0,0 +1,295 @@
+"""
+JSON API for time entries.
+
+/api/entries accepts a single object or an array for POST, PATCH and DELETE.
+A batch is validated as a whole (projects are checked with one IN query) and
+written with one bulk statement and one commit; if any item is invalid nothing
+is written and the per-item errors are returned.
+"""
+from functools import wraps
+
+from flask import Blueprint, request, jsonify
+from sqlalchemy import insert
+
+from app import db
+from models import TimeEntry, User, add_rollup_delta, apply_rollup_deltas, bump_data_versions, entry_version_keys
+from queries import entry_query, entry_scope_for, scoped, keyset_page, PAGE_SIZE
+from routes import get_current_user
+from utils import parse_date_from_input
+from validation import validate_entry_fields, existing_project_ids
+
+bp = Blueprint('api', __name__)
+
+# Largest batch accepted by one request
+MAX_BATCH_SIZE = 5000
+
+
+def api_login_required(f):
+    """Like login_required, but answers 401 JSON instead of redirecting"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if get_current_user() is None:
+            return jsonify({'error': 'Authentication required'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def entry_to_dict(entry):
+    """JSON representation of a time entry"""
+    return {
+        'id': entry.id,
+        'date': entry.date.strftime('%Y-%m-%d'),
+        'project_id': entry.project_id,
+        'project': entry.project.name if entry.project else None,
+        'user_id': entry.user_id,
+        'minutes': entry.minutes,
+        'hours': entry.hours,
+        'hours_display': entry.hours_minutes_display,
+        'description': entry.description or '',
+        'created_at': entry.created_at.isoformat() if entry.created_at else None,
+        'updated_at': entry.updated_at.isoformat() if entry.updated_at else None
+    }
+
+
+def _json_items():
+    """Request body as a list of objects, or None if it is not an object/array of objects"""
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict) and isinstance(payload.get('entries'), list):
+        payload = payload['entries']
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list) or not all(isinstance(item, dict) for item in payload):
+        return None
+    return payload
+
+
+def _batch_error(message, status=400):
+    return jsonify({'error': message}), status
+
+
+def _target_user_ids(items, current_user):
+    """
+    Resolve the owner of each item: always the caller, except that admins may
+    pass user_id to write entries for other users of their organization.
+    Returns (user_ids, errors_by_index).
+    """
+    requested = {item.get('user_id') for item in items if item.get('user_id') is not None}
+    valid_ids = set()
+    if requested and current_user.is_admin:
+        ids = {int(user_id) for user_id in requested if str(user_id).isdigit()}
+        valid_ids = {user_id for (user_id,) in
+                     User.query.with_entities(User.id).filter(User.org_id == current_user.org_id,
+                                                              User.id.in_(ids)).all()}
+
+    user_ids, errors = [], {}
+    for index, item in enumerate(items):
+        user_id = item.get('user_id')
+        if user_id is None or (not current_user.is_admin and str(user_id) == str(current_user.id)):
+            user_ids.append(current_user.id)
+        elif not current_user.is_admin:
+            user_ids.append(None)
+            errors[index] = ['Only admins can write entries for other users']
+        elif not str(user_id).isdigit() or int(user_id) not in valid_ids:
+            user_ids.append(None)
+            errors[index] = ['Unknown user']
+        else:
+            user_ids.append(int(user_id))
+    return user_ids, errors
+
+
+@bp.route('/api/entries', methods=['GET'])
+@api_login_required
+def api_list_entries():
+    """List the caller's entries, newest first, with keyset pagination"""
+    query = scoped(entry_query(), entry_scope_for(get_current_user()))
+
+    start_date = parse_date_from_input(request.args.get('start_date'))
+    end_date = parse_date_from_input(request.args.get('end_date'))
+    if start_date:
+        query = query.filter(TimeEntry.date >= start_date)
+    if end_date:
+        query = query.filter(TimeEntry.date <= end_date)
+    project_id = request.args.get('project_id')
+    if project_id and project_id.isdigit():
+        query = query.filter(TimeEntry.project_id == int(project_id))
+
+    try:
+        limit = min(max(int(request.args.get('limit', PAGE_SIZE)), 1), 500)
+    except ValueError:
+        return _batch_error('limit must be a number')
+
+    entries, next_cursor = keyset_page(query, request.args.get('cursor'), page_size=limit)
+    return jsonify({
+        'entries': [entry_to_dict(entry) for entry in entries],
+        'next_cursor': next_cursor
+    })
+
+
+@bp.route('/api/entries', methods=['POST'])
+@api_login_required
+def api_create_entries():
+    """Create one or many entries in a single bulk insert and commit"""
+    items = _json_items()
+    if items is None:
+        return _batch_error('Expected a JSON object or an array of objects')
+    if not items:
+        return _batch_error('No entries given')
+    if len(items) > MAX_BATCH_SIZE:
+        return _batch_error(f'At most {MAX_BATCH_SIZE} entries per request', 413)
+
+    current_user = get_current_user()
+    known_projects = existing_project_ids((item.get('project_id') for item in items), current_user.org_id)
+    user_ids, errors = _target_user_ids(items, current_user)
+
+    rows = []
+    for index, item in enumerate(items):
+        values, item_errors = validate_entry_fields(
+            item.get('date'), item.get('project_id'), item.get('hours'),
+            item.get('description', ''), known_project_ids=known_projects
+        )
+        item_errors = errors.get(index, []) + item_errors
+        if item_errors:
+            errors[index] = item_errors
+            continue
+        values['user_id'] = user_ids[index]
+        values['org_id'] = current_user.org_id
+        rows.append(values)
+
+    if errors:
+        return jsonify({'errors': [{'index': index, 'errors': item_errors}
+                                   for index, item_errors in sorted(errors.items())]}), 400
+
+    deltas = {}
+    for row in rows:
+        add_rollup_delta(deltas, row['user_id'], row['project_id'], row['date'], row['minutes'], 1)
+
+    try:
+        # One multi-row INSERT; ids are returned in the order of the request items
+        result = db.session.execute(insert(TimeEntry).returning(TimeEntry.id, sort_by_parameter_order=True), rows)
+        ids = [entry_id for (entry_id,) in result]
+        apply_rollup_deltas(deltas, current_user.org_id)
+        # Bulk statements bypass the flush hook that bumps data versions
+        bump_data_versions(entry_version_keys(current_user.org_id, {row['user_id'] for row in rows}))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return _batch_error(f'Error adding entries: {str(e)}', 500)
+
+    return jsonify({'created': len(ids), 'ids': ids}), 201
+
+
+def _load_owned_entries(ids, current_user):
+    """Entries with the given ids that the caller may modify, in one query"""
+    query = TimeEntry.query.filter(TimeEntry.org_id == current_user.org_id, TimeEntry.id.in_(ids))
+    if not current_user.is_admin:
+        query = query.filter(TimeEntry.user_id == current_user.id)
+    return {entry.id: entry for entry in query.all()}
+
+
+def _item_ids(items):
+    ids = []
+    for item in items:
+        try:
+            ids.append(int(item.get('id')))
+        except (TypeError, ValueError):
+            ids.append(None)
+    return ids
+
+
+@bp.route('/api/entries', methods=['PATCH'])
+@api_login_required
+def api_update_entries():
+    """Update one or many entries; each item needs an id plus the fields to change"""
+    items = _json_items()
+    if items is None:
+        return _batch_error('Expected a JSON object or an array of objects')
+    if len(items) > MAX_BATCH_SIZE:
+        return _batch_error(f'At most {MAX_BATCH_SIZE} entries per request', 413)
+
+    current_user = get_current_user()
+    ids = _item_ids(items)
+    entries = _load_owned_entries([entry_id for entry_id in ids if entry_id is not None], current_user)
+    known_projects = existing_project_ids((item['project_id'] for item in items if 'project_id' in item),
+                                          current_user.org_id)
+
+    errors = {}
+    updates = []
+    for index, (item, entry_id) in enumerate(zip(items, ids)):
+        entry = entries.get(entry_id)
+        if entry is None:
+            errors[index] = ['Entry not found']
+            continue
+        values, item_errors = validate_entry_fields(
+            item.get('date', entry.date.strftime('%Y-%m-%d')),
+            item.get('project_id', entry.project_id),
+            item.get('hours', entry.hours_minutes_display),
+            item.get('description', entry.description or ''),
+            known_project_ids=known_projects | {entry.project_id}
+        )
+        if item_errors:
+            errors[index] = item_errors
+            continue
+        updates.append((entry, values))
+
+    if errors:
+        return jsonify({'errors': [{'index': index, 'errors': item_errors}
+                                   for index, item_errors in sorted(errors.items())]}), 400
+
+    deltas = {}
+    for entry, values in updates:
+        add_rollup_delta(deltas, entry.user_id, entry.project_id, entry.date, -entry.minutes, -1)
+        entry.date = values['date']
+        entry.project_id = values['project_id']
+        entry.minutes = values['minutes']
+        entry.description = values['description']
+        add_rollup_delta(deltas, entry.user_id, entry.project_id, entry.date, entry.minutes, 1)
+
+    try:
+        apply_rollup_deltas(deltas, current_user.org_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return _batch_error(f'Error updating entries: {str(e)}', 500)
+
+    return jsonify({'updated': len(updates), 'entries': [entry_to_dict(entry) for entry, _ in updates]})
+
+
+@bp.route('/api/entries', methods=['DELETE'])
+@api_login_required
+def api_delete_entries():
+    """Delete entries given as ids, objects with an id, or {"ids": [...]}"""
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict) and isinstance(payload.get('ids'), list):
+        items = [{'id': entry_id} for entry_id in payload['ids']]
+    elif isinstance(payload, list) and all(not isinstance(item, dict) for item in payload):
+        items = [{'id': entry_id} for entry_id in payload]
+    else:
+        items = _json_items()
+    if items is None:
+        return _batch_error('Expected a list of ids or objects with an id')
+    if len(items) > MAX_BATCH_SIZE:
+        return _batch_error(f'At most {MAX_BATCH_SIZE} entries per request', 413)
+
+    current_user = get_current_user()
+    ids = _item_ids(items)
+    entries = _load_owned_entries([entry_id for entry_id in ids if entry_id is not None], current_user)
+
+    missing = [{'index': index, 'errors': ['Entry not found']}
+               for index, entry_id in enumerate(ids) if entry_id not in entries]
+    if missing:
+        return jsonify({'errors': missing}), 400
+
+    deltas = {}
+    for entry in entries.values():
+        add_rollup_delta(deltas, entry.user_id, entry.project_id, entry.date, -entry.minutes, -1)
+
+    try:
+        apply_rollup_deltas(deltas, current_user.org_id)
+        TimeEntry.query.filter(TimeEntry.id.in_(list(entries))).delete(synchronize_session=False)
+        bump_data_versions(entry_version_keys(current_user.org_id, {entry.user_id for entry in entries.values()}))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return _batch_error(f'Error deleting entries: {str(e)}', 500)
+
+    return jsonify({'deleted': len(entries)})
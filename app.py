@@ -1,24 +1,238 @@
+"""
+Application factory.
+
+create_app() only configures Flask and registers the extensions, blueprints
+and CLI commands; it does not touch the database. Schema setup is explicit:
+`flask db upgrade` migrates (or, on an empty database, creates) the schema,
+then `flask init-db` adds the default data, rollup backfill and search index,
+so booting a worker or a test client does not inspect the schema.
+
+`from app import app` (gunicorn app:app, the maintenance scripts) still works:
+the shared instance is created on first access.
+"""
+import logging
 import os
+import click
 from flask import Flask
+from flask.cli import with_appcontext
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
+from sqlalchemy import inspect
+
+import instrumentation
+from db_pool import engine_options, normalize_database_url
+
+db = SQLAlchemy()
+# Absolute, so `flask init-db` finds the revisions from any working directory
+migrate = Migrate(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
+
+
+def create_app(config=None):
+    """Build a configured app; config is a dict of overrides applied last"""
+    app = Flask(__name__)
+    app.secret_key = os.environ.get('SECRET_KEY', 'your_secret_key')
+
+    db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'instance', 'timetracker.db'))
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(
+        os.environ.get('DATABASE_URL', f'sqlite:///{db_path}'))
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if config:
+        app.config.update(config)
+    # Level of the module loggers; a no-op when the server already configured logging
+    logging.basicConfig(level=str(app.config.get('LOG_LEVEL', os.environ.get('LOG_LEVEL', 'INFO'))).upper())
+    # Pool sizing, pre-ping, recycle and statement timeout (see db_pool.py)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+
+    db.init_app(app)
+    migrate.init_app(app, db)
+    # Per-request statement counts and timings, slow query log (see instrumentation.py)
+    instrumentation.init_app(app)
+
+    # Importing the blueprints also imports the models
+    from routes import bp as main_blueprint
+    from api import bp as api_blueprint
+    app.register_blueprint(main_blueprint)
+    app.register_blueprint(api_blueprint)
 
-app = Flask(__name__)
-app.secret_key = os.environ.get('SECRET_KEY', 'your_secret_key')
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(import_csv_command)
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(create_org_command)
+    app.cli.add_command(grant_operator_command)
+    app.cli.add_command(partition_time_entry_command)
+    return app
 
-db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'instance', 'timetracker.db'))
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', f'sqlite:///{db_path}')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db = SQLAlchemy(app)
 
-# Import User model after db is initialized to avoid circular imports
-from models import User
+def _missing_columns():
+    """Model columns that existing tables lack, i.e. what pending migrations still have to add"""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if table.name in existing_tables:
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            missing += [f'{table.name}.{column.name}' for column in table.columns if column.name not in columns]
+    return missing
 
-# Import routes to register all routes with the app
-import routes
 
-# Create tables at startup (Flask 3+ compatible)
-with app.app_context():
+def _stamp_latest_revision():
+    """Record a schema built by create_all() as fully migrated"""
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    script = ScriptDirectory.from_config(migrate.get_config())
+    with db.engine.begin() as connection:
+        MigrationContext.configure(connection).stamp(script, 'heads')
+
+
+def init_database(load_defaults=False):
+    """
+    Create missing tables, backfill the daily rollup and set up the search
+    index. An existing database must be migrated first (`flask db upgrade`):
+    the default data and the backfill use the latest columns, so this raises
+    RuntimeError before touching anything if a table still lacks one.
+    """
+    from models import (
+        TimeEntry, DailyRollup, rebuild_daily_rollups, initialize_default_data, ensure_default_organization,
+        DEFAULT_ORG_ID
+    )
+    from search_index import init_search_index
+
+    empty = not inspect(db.engine).get_table_names()
+    missing = _missing_columns()
+    if missing:
+        raise RuntimeError(f"The database schema is out of date (missing {', '.join(missing)}); "
+                           "run `flask db upgrade` first")
+
     db.create_all()
+    if empty:
+        # Already at the latest schema, so `flask db upgrade` has nothing to redo
+        _stamp_latest_revision()
+    ensure_default_organization()
+    db.session.commit()
+    if load_defaults:
+        initialize_default_data(DEFAULT_ORG_ID)
+
+    # Backfill the daily rollup the first time it is created on an existing database
+    if db.session.query(DailyRollup.id).first() is None and db.session.query(TimeEntry.id).first() is not None:
+        rebuild_daily_rollups()
+
+    # Full-text search index on entry descriptions (FTS5 / tsvector)
+    return init_search_index()
+
+
+@click.command('init-db')
+@click.option('--defaults', is_flag=True, help='Also create the default projects and settings')
+@with_appcontext
+def init_db_command(defaults):
+    """Create the database schema and derived tables"""
+    try:
+        backend = init_database(load_defaults=defaults)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    print(f"Database initialized (search backend: {backend or 'LIKE fallback'}).")
+
+
+@click.command('import-csv')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--username', required=True, help='User the imported entries belong to')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows inserted per commit')
+@click.option('--create-projects', is_flag=True, help='Create projects that do not exist yet')
+@with_appcontext
+def import_csv_command(path, username, batch_size, create_projects):
+    """Import time entries from a CSV file in the export layout"""
+    from imports import import_csv
+    from models import User
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        raise click.ClickException(f'No user named {username}')
+    with open(path, newline='', encoding='utf-8-sig') as stream:
+        result = import_csv(stream, user, batch_size=batch_size, create_projects=create_projects)
+    print(f"Imported {result.imported} entries, {result.error_count} rows rejected.")
+    for line_number, message in result.errors:
+        print(f"  line {line_number}: {message}")
+
+
+@click.command('rebuild-rollups')
+@with_appcontext
+def rebuild_rollups_command():
+    """Recompute the daily rollup table from existing time entries"""
+    from models import rebuild_daily_rollups
+    count = rebuild_daily_rollups()
+    print(f"Rebuilt {count} daily rollup rows.")
+
+
+@click.command('create-org')
+@click.argument('name')
+@click.option('--admin', 'admin_username', required=True, help="Username of the organization's first admin")
+@click.password_option('--password', help='Password of the first admin (prompted if omitted)')
+@with_appcontext
+def create_org_command(name, admin_username, password):
+    """Create an organization with its default projects, settings and first admin"""
+    from models import Organization, User, create_organization, initialize_default_data
+    from partitioning import create_org_partition
+    if Organization.query.filter_by(name=name).first():
+        raise click.ClickException(f'An organization named {name} already exists')
+    if User.query.filter_by(username=admin_username).first():
+        raise click.ClickException(f'Username {admin_username} is taken')
+
+    admin = User(username=admin_username)
+    admin.set_password(password)
+    organization = create_organization(name, admin)
+    partitioned = create_org_partition(db.session.connection(), organization.id)
+    db.session.commit()
+    initialize_default_data(organization.id)
+    print(f"Created organization {name} (id {organization.id}) with admin {admin_username}"
+          f"{' and its time_entry partition' if partitioned else ''}.")
+
+
+@click.command('grant-operator')
+@click.argument('username')
+@click.option('--revoke', is_flag=True, help='Take the operator flag away instead')
+@with_appcontext
+def grant_operator_command(username, revoke):
+    """Let a user see the deployment-wide metrics and slow query log"""
+    from models import User
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        raise click.ClickException(f'No user named {username}')
+    user.is_operator = not revoke
+    db.session.commit()
+    print(f"{username} is {'no longer' if revoke else 'now'} a deployment operator.")
+
+
+@click.command('partition-time-entry')
+@click.option('--apply', is_flag=True, help='Run the statements instead of printing them')
+@with_appcontext
+def partition_time_entry_command(apply):
+    """PostgreSQL only: partition time_entry by organization (see partitioning.py)"""
+    from partitioning import partition_time_entry
+    try:
+        with db.engine.begin() as connection:
+            statements = partition_time_entry(connection, apply=apply)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    if not statements:
+        print('time_entry is already partitioned.')
+    elif apply:
+        print(f'time_entry partitioned by organization ({len(statements)} statements).')
+    else:
+        print(';\n'.join(statements) + ';')
+        print('-- Re-run with --apply to execute these statements in one transaction.')
+
+
+_shared_app = []
+
+
+def __getattr__(name):
+    # Module-level `app`, built on first use rather than at import
+    if name == 'app':
+        if not _shared_app:
+            _shared_app.append(create_app())
+        return _shared_app[0]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    # Go through the importable module so the models and blueprints share its db
+    import app as app_module
+    app_module.app.run(debug=True)
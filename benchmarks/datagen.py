@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Synthetic data generator for the benchmarks.
+
+Fills an empty database with users x projects x years of time entries that
+look like real use: every user works on a handful of projects, logs a few
+entries on most weekdays and writes short task descriptions from a shared
+vocabulary (so search has realistic hit rates). The same --seed always
+produces the same rows.
+
+Usage:
+    python benchmarks/datagen.py                       # defaults, temp SQLite file
+    python benchmarks/datagen.py --users 50 --years 5 --database-url sqlite:////tmp/big.db
+
+Everything is written to the default organization, so the pages measure one
+tenant's data. run_benchmarks.py imports seed_database() from here.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+BENCH_PASSWORD = 'bench-password'
+
+# models.DEFAULT_ORG_ID; not imported so generating rows does not need the app
+DEFAULT_ORG_ID = 1
+
+VERBS = ['Fix', 'Review', 'Implement', 'Refactor', 'Test', 'Document', 'Deploy', 'Plan', 'Debug', 'Design']
+SUBJECTS = ['login flow', 'invoice export', 'search page', 'API client', 'billing report', 'database migration',
+            'dashboard charts', 'user settings', 'email templates', 'payment webhook', 'mobile layout', 'CI pipeline']
+SUFFIXES = ['', '', ' with client', ' after standup', ' for release', ' (follow-up)', ' and code review']
+
+ENTRY_LENGTHS = [15, 30, 45, 60, 90, 120, 180, 240]
+
+# Rows written per INSERT batch
+BATCH_SIZE = 10_000
+
+
+class DataSpec:
+    """Volumes for one generated dataset"""
+
+    def __init__(self, users=10, projects=30, years=2, entries_per_day=3, projects_per_user=5, seed=42):
+        self.users = users
+        self.projects = projects
+        self.years = years
+        self.entries_per_day = entries_per_day
+        self.projects_per_user = min(projects_per_user, projects)
+        self.seed = seed
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def add_spec_arguments(parser):
+    """Command line options shared by datagen.py and run_benchmarks.py"""
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--projects', type=int, default=30)
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--entries-per-day', type=int, default=3, help='average entries per user per weekday')
+    parser.add_argument('--projects-per-user', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42, help='random seed; same seed, same data')
+
+
+def spec_from_args(args):
+    return DataSpec(args.users, args.projects, args.years, args.entries_per_day,
+                    args.projects_per_user, args.seed)
+
+
+def _description(rng):
+    return f'{rng.choice(VERBS)} {rng.choice(SUBJECTS)}{rng.choice(SUFFIXES)}'
+
+
+def generate_entries(spec, today=None):
+    """Yield time_entry rows (dicts) for spec, user by user and day by day"""
+    rng = random.Random(spec.seed)
+    today = today or date.today()
+    first_day = today - timedelta(days=365 * spec.years)
+    for user_id in range(1, spec.users + 1):
+        user_projects = rng.sample(range(1, spec.projects + 1), spec.projects_per_user)
+        day = first_day
+        while day <= today:
+            # Weekdays, with the odd day off
+            if day.weekday() < 5 and rng.random() > 0.05:
+                for _ in range(rng.randint(1, spec.entries_per_day * 2 - 1)):
+                    created_at = datetime.combine(day, datetime.min.time()) + timedelta(
+                        minutes=rng.randrange(8 * 60, 19 * 60))
+                    yield {
+                        'date': day,
+                        'org_id': DEFAULT_ORG_ID,
+                        'user_id': user_id,
+                        'project_id': rng.choice(user_projects),
+                        'minutes': rng.choice(ENTRY_LENGTHS),
+                        'description': _description(rng),
+                        'created_at': created_at,
+                        'updated_at': created_at,
+                    }
+            day += timedelta(days=1)
+
+
+def seed_database(spec):
+    """
+    Create the schema and fill it for spec, then build the rollups and the
+    search index. Call inside an app context on an empty database. User 1
+    (bench1) is an admin; every user's password is BENCH_PASSWORD.
+    Returns the number of time entries written.
+    """
+    from werkzeug.security import generate_password_hash
+    from app import db, init_database
+    from models import Organization, User, Project, TimeEntry
+
+    db.create_all()
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    count = 0
+    with db.engine.begin() as conn:
+        conn.execute(Organization.__table__.insert(), [
+            {'id': DEFAULT_ORG_ID, 'name': 'Default', 'created_at': datetime.utcnow()}
+        ])
+        conn.execute(User.__table__.insert(), [
+            {'id': i, 'org_id': DEFAULT_ORG_ID, 'username': f'bench{i}', 'password_hash': password_hash,
+             'is_admin': i == 1}
+            for i in range(1, spec.users + 1)
+        ])
+        conn.execute(Project.__table__.insert(), [
+            {'id': i, 'org_id': DEFAULT_ORG_ID, 'name': f'Bench Project {i}', 'description': f'Synthetic project {i}',
+             'active': True, 'created_at': datetime.utcnow()}
+            for i in range(1, spec.projects + 1)
+        ])
+        batch = []
+        for row in generate_entries(spec):
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                conn.execute(TimeEntry.__table__.insert(), batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            conn.execute(TimeEntry.__table__.insert(), batch)
+            count += len(batch)
+
+    # Rollup backfill and FTS rebuild over the rows written above
+    init_database(load_defaults=True)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill a database with synthetic time entries')
+    add_spec_arguments(parser)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    else:
+        fd, path = tempfile.mkstemp(suffix='.db', prefix='bench_data_')
+        os.close(fd)
+        os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    print(f"Seeding {os.environ['DATABASE_URL']}")
+
+    from app import create_app
+    started = time.perf_counter()
+    with create_app().app_context():
+        count = seed_database(spec_from_args(args))
+    print(f'Wrote {count:,} time entries for {args.users} users in {time.perf_counter() - started:.1f}s '
+          f'(log in as bench1 / {BENCH_PASSWORD})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the main pages.
+
+Seeds a fresh SQLite database with datagen.py, logs in as the generated admin
+and requests each page through the Flask test client, reporting per page the
+p50/p95 latency, the SQL statements issued and the peak Python memory
+allocated while serving it. Results are saved as JSON; pass an earlier file
+with --compare to see what got slower.
+
+Usage:
+    python benchmarks/run_benchmarks.py                               # defaults, results in benchmarks/results/
+    python benchmarks/run_benchmarks.py --users 50 --years 5 --repeat 30
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/before.json
+    python benchmarks/run_benchmarks.py --only reports,export_pdf
+
+Render caching is cleared before every timed request so each one runs the view
+(--cached measures cache hits instead). Exports run inline (EXPORT_JOBS_EAGER).
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datagen import BENCH_PASSWORD, add_spec_arguments, spec_from_args
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+# Exports are much slower than the pages, so they get fewer timed runs
+EXPORT_SCENARIOS = ('export_csv', 'export_pdf')
+
+
+def scenarios(today):
+    """(name, method, url, form data, expected status) for every benchmarked view"""
+    year_ago = (today - timedelta(days=365)).isoformat()
+    return [
+        ('dashboard', 'GET', '/', None, 200),
+        ('entries', 'GET', '/entries', None, 200),
+        ('search_entries', 'GET', '/search?q=review', None, 200),
+        ('reports', 'GET', '/reports', None, 200),
+        ('export_csv', 'GET', '/export_data?quick=all_data', None, 200),
+        ('export_pdf', 'POST', '/export_data',
+         {'format': 'pdf', 'start_date': year_ago, 'end_date': today.isoformat(),
+          'include_descriptions': 'on', 'include_totals': 'on'}, 202),
+        ('api_cycle_stats', 'GET', f'/api/cycle_stats/{today.isoformat()}', None, 200),
+    ]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the main pages end to end')
+    add_spec_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=20, help='timed requests per page')
+    parser.add_argument('--export-repeat', type=int, default=5, help='timed requests per export')
+    parser.add_argument('--only', help='comma-separated scenario names')
+    parser.add_argument('--cached', action='store_true', help='keep the render cache between requests')
+    parser.add_argument('--output', help='JSON results file (default benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', help='earlier JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=20.0,
+                        help='percent slowdown of p50 flagged as a regression in --compare')
+    return parser.parse_args()
+
+
+def percentile(samples, pct):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[pct - 1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def max_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_scenario(client, count_statements, render_cache, scenario, repeat, cached):
+    name, method, url, data, expected_status = scenario
+
+    def request_once():
+        response = client.open(url, method=method, data=data, headers={'Accept': 'application/json'}
+                               if method == 'POST' else None)
+        body = response.get_data()  # drain streamed responses
+        response.close()
+        assert response.status_code == expected_status, (name, response.status_code)
+        return len(body)
+
+    request_once()  # warm up imports and in-process caches
+
+    timings, statement_counts = [], []
+    for _ in range(repeat):
+        if not cached:
+            render_cache.clear()
+        with count_statements() as statements:
+            started = time.perf_counter()
+            response_bytes = request_once()
+            timings.append((time.perf_counter() - started) * 1000)
+        statement_counts.append(len(statements))
+
+    if not cached:
+        render_cache.clear()
+    tracemalloc.start()
+    request_once()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'method': method,
+        'url': url,
+        'runs': repeat,
+        'p50_ms': percentile(timings, 50),
+        'p95_ms': percentile(timings, 95),
+        'mean_ms': statistics.mean(timings),
+        'max_ms': max(timings),
+        'statements': max(statement_counts),
+        'peak_memory_kb': peak // 1024,
+        'response_bytes': response_bytes,
+    }
+
+
+def print_results(results):
+    print(f'\n{"page":<18}{"p50 ms":>10}{"p95 ms":>10}{"SQL":>6}{"peak KB":>10}{"bytes":>12}')
+    for name, result in results.items():
+        print(f'{name:<18}{result["p50_ms"]:>10.1f}{result["p95_ms"]:>10.1f}{result["statements"]:>6}'
+              f'{result["peak_memory_kb"]:>10}{result["response_bytes"]:>12}')
+
+
+def compare(results, baseline_path, tolerance):
+    """Print the change against an earlier run; returns the names that got slower"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f'\n=== compared with {baseline_path} (commit {baseline.get("git_commit")}) ===')
+    if baseline.get('data') != results['data']:
+        print('Warning: the datasets differ, the numbers are not directly comparable')
+    print(f'{"page":<18}{"p50 before":>12}{"p50 now":>10}{"change":>9}{"SQL before":>12}{"SQL now":>9}')
+    regressions = []
+    for name, result in results['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+        flag = ''
+        if change > tolerance or result['statements'] > before['statements']:
+            regressions.append(name)
+            flag = '  SLOWER'
+        print(f'{name:<18}{before["p50_ms"]:>12.1f}{result["p50_ms"]:>10.1f}{change:>8.0f}%'
+              f'{before["statements"]:>12}{result["statements"]:>9}{flag}')
+    return regressions
+
+
+def main():
+    args = parse_args()
+    fd, path = tempfile.mkstemp(suffix='.db', prefix='bench_pages_')
+    os.close(fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+
+    from contextlib import contextmanager
+    from sqlalchemy import event
+    from app import create_app, db
+    from datagen import seed_database
+    from models import ExportJob
+    from response_cache import render_cache
+
+    app = create_app({'EXPORT_JOBS_EAGER': True})
+    spec = spec_from_args(args)
+    with app.app_context():
+        print(f'Seeding {path}...')
+        started = time.perf_counter()
+        entry_count = seed_database(spec)
+        print(f'Wrote {entry_count:,} time entries in {time.perf_counter() - started:.1f}s')
+        engine = db.engine
+
+    @contextmanager
+    def count_statements():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    client = app.test_client()
+    response = client.post('/login', data={'username': 'bench1', 'password': BENCH_PASSWORD})
+    assert response.status_code == 302, 'login failed'
+
+    only = set(args.only.split(',')) if args.only else None
+    results = {}
+    try:
+        for scenario in scenarios(date.today()):
+            name = scenario[0]
+            if only and name not in only:
+                continue
+            repeat = args.export_repeat if name in EXPORT_SCENARIOS else args.repeat
+            print(f'Running {name} ({repeat} requests)...')
+            results[name] = run_scenario(client, count_statements, render_cache, scenario, repeat, args.cached)
+    finally:
+        # Export files are written to the instance folder; the database is throwaway
+        with app.app_context():
+            for job in ExportJob.query.all():
+                if job.file_path and os.path.exists(job.file_path):
+                    os.remove(job.file_path)
+        os.remove(path)
+
+    output = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'data': dict(spec.as_dict(), entries=entry_count),
+        'cached': args.cached,
+        'max_rss_kb': max_rss_kb(),
+        'results': results,
+    }
+    print_results(results)
+
+    output_path = args.output or os.path.join(RESULTS_DIR, f'{datetime.now():%Y%m%d_%H%M%S}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f'\nResults saved to {output_path}')
+
+    if args.compare:
+        regressions = compare(output, args.compare, args.tolerance)
+        if regressions:
+            print(f'\nSlower than the baseline: {", ".join(regressions)}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
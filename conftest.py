@@ -0,0 +1,71 @@
+"""
+Shared pytest fixtures: a fresh app and database per test.
+
+Every test gets its own SQLite file under tmp_path, created by init_database(),
+and the in-process caches (settings, rendered pages, system stats, request
+metrics) are emptied around it, so a test passes alone and in any order.
+Users made with make_user log in with the password '<username>-password'.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, init_database, db
+
+
+def _clear_process_caches():
+    from models import invalidate_settings_cache
+    from response_cache import render_cache
+    from system_stats import clear_system_stats_cache
+    from instrumentation import metrics
+    invalidate_settings_cache()
+    render_cache.clear()
+    clear_system_stats_cache()
+    metrics.reset()
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        # Run background export jobs inline, writing their files next to the database
+        'EXPORT_JOBS_EAGER': True,
+        'EXPORT_DIR': str(tmp_path / 'exports'),
+    })
+    _clear_process_caches()
+    with app.app_context():
+        init_database()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    _clear_process_caches()
+
+
+@pytest.fixture
+def make_user(app):
+    """make_user(username, **columns) -> id of a new user (default organization unless org_id is given)"""
+    from models import User
+
+    def make_user(username, **columns):
+        with app.app_context():
+            user = User(username=username, **columns)
+            user.set_password(f'{username}-password')
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+    return make_user
+
+
+@pytest.fixture
+def login(app):
+    """login(username) -> test client with that user's session"""
+    def login(username):
+        client = app.test_client()
+        response = client.post('/login', data={'username': username, 'password': f'{username}-password'})
+        assert response.status_code == 302
+        return client
+    return login
@@ -0,0 +1,254 @@
+"""
+Database engine and connection pool configuration.
+
+Every engine the project creates (the app's, and the one-off engines in the
+maintenance scripts) gets its options from engine_options(), driven by
+environment variables:
+
+    DB_POOL_SIZE             connections kept open per process (default 5)
+    DB_MAX_OVERFLOW          extra connections allowed under load (default 5)
+    DB_MAX_CONNECTIONS       optional budget for the whole deployment; divided by
+                             WEB_CONCURRENCY (gunicorn workers) to cap each
+                             process's pool_size + max_overflow
+    DB_POOL_TIMEOUT          seconds to wait for a free connection (default 10)
+    DB_POOL_RECYCLE          seconds before a connection is replaced (default 1800)
+    DB_STATEMENT_TIMEOUT_MS  PostgreSQL statement_timeout, 0 to disable (default 30000)
+    DB_PGBOUNCER             set to 1 behind PgBouncer: no client-side pool
+                             (NullPool) and no startup parameters
+
+Connections are pre-pinged on checkout, so a connection the server (or a load
+balancer) closed while idle is replaced instead of failing the request.
+Time spent waiting for a pooled connection is recorded in pool_stats.
+
+SQLite file databases are tuned for several processes sharing them: every new
+connection switches to WAL (readers no longer block on the writer) with
+synchronous=NORMAL, waits SQLITE_BUSY_TIMEOUT_MS (default 5000) for the write
+lock, and gets a larger page cache and memory-mapped reads. SQLITE_PRAGMAS=0
+turns this off. Writers can still lose the race for the lock, so the write
+paths run through retry_on_locked().
+"""
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 5
+DEFAULT_POOL_TIMEOUT = 10
+DEFAULT_POOL_RECYCLE = 1800
+DEFAULT_STATEMENT_TIMEOUT_MS = 30000
+
+# Checkouts that wait longer than this are logged; the pool is too small
+SLOW_CHECKOUT_SECONDS = 0.5
+
+DEFAULT_SQLITE_BUSY_TIMEOUT_MS = 5000
+SQLITE_CACHE_SIZE_KB = 64 * 1024
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+
+# Attempts made by retry_on_locked() and the first backoff delay (doubled per retry)
+WRITE_RETRY_ATTEMPTS = 5
+WRITE_RETRY_DELAY = 0.05
+
+
+def normalize_database_url(database_url):
+    """Use the postgresql:// scheme SQLAlchemy expects (Render and Heroku hand out postgres://)"""
+    if database_url and database_url.startswith('postgres://'):
+        return database_url.replace('postgres://', 'postgresql://', 1)
+    return database_url
+
+
+def _env_int(env, name, default):
+    try:
+        return int(env.get(name, default))
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring invalid {name}={env.get(name)!r}, using {default}")
+        return default
+
+
+def _env_flag(env, name):
+    return str(env.get(name, '')).lower() in ('1', 'true', 'yes', 'on')
+
+
+class PoolStats:
+    """Thread-safe counters for connection checkouts and the time spent waiting for them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record(self, waited, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        if waited >= SLOW_CHECKOUT_SECONDS:
+            logger.warning(f"Waited {waited * 1000:.0f} ms for a database connection"
+                           f"{' and timed out' if timed_out else ''}; consider a larger pool")
+
+    def snapshot(self):
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': (self.total_wait / attempts * 1000) if attempts else 0.0,
+                'max_wait_ms': self.max_wait * 1000,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record(time.perf_counter() - started)
+        return connection
+
+
+def engine_options(database_url, env=None):
+    """Keyword arguments for create_engine() (or SQLALCHEMY_ENGINE_OPTIONS) for this URL"""
+    env = os.environ if env is None else env
+    url = normalize_database_url(database_url) or ''
+
+    if url.startswith('sqlite'):
+        if ':memory:' in url or url in ('sqlite://', 'sqlite:///'):
+            return {}
+        # File connections cannot go stale, so there is nothing to pre-ping
+        return {'poolclass': TimedQueuePool}
+
+    options = {'pool_pre_ping': True}
+    if _env_flag(env, 'DB_PGBOUNCER'):
+        # PgBouncer does the pooling; it also rejects most startup parameters,
+        # so statement_timeout has to be set on the role or in pgbouncer.ini
+        options['poolclass'] = NullPool
+        return options
+
+    pool_size = _env_int(env, 'DB_POOL_SIZE', DEFAULT_POOL_SIZE)
+    max_overflow = _env_int(env, 'DB_MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW)
+    budget = _env_int(env, 'DB_MAX_CONNECTIONS', 0)
+    if budget > 0:
+        per_worker = max(1, budget // max(1, _env_int(env, 'WEB_CONCURRENCY', 1)))
+        pool_size = min(pool_size, per_worker)
+        max_overflow = min(max_overflow, per_worker - pool_size)
+
+    options.update({
+        'poolclass': TimedQueuePool,
+        'pool_size': max(1, pool_size),
+        'max_overflow': max(0, max_overflow),
+        'pool_timeout': _env_int(env, 'DB_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT),
+        'pool_recycle': _env_int(env, 'DB_POOL_RECYCLE', DEFAULT_POOL_RECYCLE),
+    })
+
+    statement_timeout = _env_int(env, 'DB_STATEMENT_TIMEOUT_MS', DEFAULT_STATEMENT_TIMEOUT_MS)
+    if statement_timeout > 0 and url.startswith('postgresql'):
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
+def create_db_engine(database_url=None, single_use=False):
+    """
+    Engine for scripts that run outside the app. database_url defaults to
+    DATABASE_URL; single_use skips the pool for one-shot maintenance work.
+    """
+    url = normalize_database_url(database_url or os.environ.get('DATABASE_URL', 'sqlite:///timetracker.db'))
+    options = engine_options(url)
+    if single_use:
+        for key in ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle'):
+            options.pop(key, None)
+        options['poolclass'] = NullPool
+    return create_engine(url, **options)
+
+
+def pool_status(engine):
+    """Pool occupancy for an engine plus the process-wide checkout wait statistics"""
+    pool = engine.pool
+    status = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': max(0, pool.overflow()),
+        })
+    status.update(pool_stats.snapshot())
+    return status
+
+
+def sqlite_pragmas(env=None):
+    """PRAGMA statements run on every new SQLite connection (empty when disabled)"""
+    env = os.environ if env is None else env
+    if str(env.get('SQLITE_PRAGMAS', '1')).lower() in ('0', 'false', 'no', 'off'):
+        return []
+    busy_timeout = _env_int(env, 'SQLITE_BUSY_TIMEOUT_MS', DEFAULT_SQLITE_BUSY_TIMEOUT_MS)
+    return [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f'PRAGMA busy_timeout={busy_timeout}',
+        f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}',
+        f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}',
+        'PRAGMA temp_store=MEMORY',
+    ]
+
+
+@event.listens_for(Engine, 'connect')
+def _tune_sqlite_connection(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for statement in sqlite_pragmas():
+            cursor.execute(statement)
+    finally:
+        cursor.close()
+
+
+def is_locked_error(error):
+    """True for SQLite's "database is locked" / "database table is locked" errors"""
+    return isinstance(error, OperationalError) and 'is locked' in str(error.orig)
+
+
+def retry_on_locked(session, work, attempts=WRITE_RETRY_ATTEMPTS):
+    """
+    Call work(), which makes its changes and commits, retrying with jittered
+    backoff while SQLite reports the database is locked. The session is rolled
+    back before each retry, so work must redo all of its changes. Other errors,
+    and the last locked error, are raised to the caller.
+    """
+    delay = WRITE_RETRY_DELAY
+    for attempt in range(1, attempts + 1):
+        try:
+            return work()
+        except OperationalError as e:
+            session.rollback()
+            if not is_locked_error(e) or attempt == attempts:
+                raise
+            logger.info(f"Database locked, retrying write ({attempt}/{attempts - 1})")
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            delay *= 2
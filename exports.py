@@ -0,0 +1,137 @@
+"""
+Export helpers.
+
+CSV exports are generated incrementally: rows are read in keyset batches, the
+project name comes from the same joined SELECT (no per-row lazy load of
+entry.project), and the SUMMARY totals are accumulated while the rows are
+written, so memory use does not grow with the export size.
+PDF rendering lives in pdf_export.py; both formats are generated by the
+background export jobs (see jobs.py) when they are too large for a request.
+"""
+import csv
+import io
+
+from sqlalchemy import func
+
+from models import TimeEntry, Project
+from queries import scoped_entry_query, newest_first, after_position, position_of
+from utils import minutes_to_hours, minutes_to_hours_minutes
+
+# Rows fetched per SELECT while exporting
+EXPORT_BATCH_SIZE = 1000
+
+# Rows written to the CSV buffer before a chunk is yielded to the client
+CSV_CHUNK_ROWS = 500
+
+
+def export_query(start_date=None, end_date=None, project_ids=None, scope=None):
+    """Entry query (joined to Project) for the export filters, limited to an EntryScope's entries"""
+    query = scoped_entry_query(scope)
+    if start_date:
+        query = query.filter(TimeEntry.date >= start_date)
+    if end_date:
+        query = query.filter(TimeEntry.date <= end_date)
+    if project_ids:
+        query = query.filter(TimeEntry.project_id.in_(project_ids))
+    return query
+
+
+def project_totals(query):
+    """[(project name, minutes)] for an entry query, from one aggregate query"""
+    return query.order_by(None).with_entities(
+        Project.name,
+        func.sum(TimeEntry.minutes)
+    ).group_by(Project.name).order_by(Project.name).all()
+
+
+def csv_headers(include_descriptions=True):
+    """Header row used by CSV exports"""
+    headers = ['Date', 'Project', 'Hours (Decimal)', 'Hours (HH:MM)']
+    if include_descriptions:
+        headers.append('Description')
+    headers.extend(['Created At', 'Updated At'])
+    return headers
+
+
+def hours_cells(minutes):
+    """The decimal and HH:MM hours columns for a duration in minutes"""
+    return [f"{minutes_to_hours(minutes):.2f}", minutes_to_hours_minutes(minutes)]
+
+
+def iter_export_rows(query):
+    """
+    Yield (date, project_name, minutes, description, created_at, updated_at) tuples
+    for an entry query that is already joined to Project, newest first.
+    Rows are read in keyset batches, so no cursor (and on SQLite no read lock)
+    stays open for the whole export while the rows are being written out.
+    """
+    rows_query = newest_first(query.with_entities(
+        TimeEntry.date,
+        Project.name,
+        TimeEntry.minutes,
+        TimeEntry.description,
+        TimeEntry.created_at,
+        TimeEntry.updated_at,
+        TimeEntry.id
+    ))
+    batch = rows_query.limit(EXPORT_BATCH_SIZE).all()
+    while batch:
+        for row in batch:
+            yield row[:6]
+        if len(batch) < EXPORT_BATCH_SIZE:
+            break
+        batch = after_position(rows_query, *position_of(batch[-1])).limit(EXPORT_BATCH_SIZE).all()
+
+
+def _format_timestamp(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def iter_csv(query, include_descriptions=True, include_totals=True):
+    """Yield the CSV export for an entry query as text chunks"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return chunk
+
+    writer.writerow(csv_headers(include_descriptions))
+
+    project_totals = {}
+    total_minutes = 0
+    row_count = 0
+
+    for entry_date, project_name, minutes, description, created_at, updated_at in iter_export_rows(query):
+        row = [entry_date.strftime('%Y-%m-%d'), project_name] + hours_cells(minutes)
+        if include_descriptions:
+            row.append(description or '')
+        row.extend([_format_timestamp(created_at), _format_timestamp(updated_at)])
+        writer.writerow(row)
+
+        project_totals[project_name] = project_totals.get(project_name, 0) + minutes
+        total_minutes += minutes
+        row_count += 1
+        if row_count % CSV_CHUNK_ROWS == 0:
+            yield flush()
+
+    if include_totals and row_count:
+        writer.writerow([])  # Empty row
+        writer.writerow(['SUMMARY'])
+
+        for project_name, minutes in project_totals.items():
+            writer.writerow(['TOTAL', project_name] + hours_cells(minutes))
+
+        writer.writerow(['GRAND TOTAL', 'All Projects'] + hours_cells(total_minutes))
+
+    yield flush()
+
+
+def write_csv(query, path, include_descriptions=True, include_totals=True):
+    """Write the CSV export for an entry query to path"""
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        for chunk in iter_csv(query, include_descriptions, include_totals):
+            output.write(chunk)
+
@@ -5,9 +5,11 @@ Run this as a one-time setup script in Render's deploy commands
 """
 
 import os
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from datetime import datetime
 
+from db_pool import create_db_engine
+
 def fix_database():
     """Fix database schema for Render deployment"""
     
@@ -16,11 +18,8 @@ def fix_database():
         print("❌ DATABASE_URL not found")
         return False
     
-    # Handle PostgreSQL URL format
-    if database_url.startswith("postgres://"):
-        database_url = database_url.replace("postgres://", "postgresql://", 1)
-    
-    engine = create_engine(database_url)
+    # One connection for the whole fix; postgres:// URLs are normalized
+    engine = create_db_engine(database_url, single_use=True)
     
     try:
         with engine.connect() as conn:
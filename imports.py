@@ -0,0 +1,148 @@
+"""
+CSV import of time entries.
+
+Reads the column layout written by export_data() (Date, Project,
+Hours (Decimal), Hours (HH:MM), Description; extra columns and the SUMMARY
+block are ignored). The file is parsed as a stream and inserted in batches,
+each batch committed with its rollup changes, so memory stays bounded no
+matter how many rows the file has.
+"""
+import csv
+
+from sqlalchemy import insert
+
+from app import db
+from models import (
+    TimeEntry, Project, add_rollup_delta, apply_rollup_deltas, bump_data_versions, entry_version_keys
+)
+from validation import validate_entry_fields
+
+# Rows inserted (and committed) per batch
+IMPORT_BATCH_SIZE = 5000
+
+# Row errors kept for the report; further errors are only counted
+MAX_REPORTED_ERRORS = 1000
+
+# First-column markers of the totals block export_data() appends
+SUMMARY_MARKERS = {'SUMMARY', 'TOTAL', 'GRAND TOTAL'}
+
+
+class ImportResult:
+    """Outcome of a CSV import"""
+
+    def __init__(self):
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []  # (line number, message), capped at MAX_REPORTED_ERRORS
+        self.created_projects = []
+
+    def add_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+    def __repr__(self):
+        return f'<ImportResult imported={self.imported} errors={self.error_count}>'
+
+
+class ImportFormatError(ValueError):
+    """The file does not have the expected header"""
+
+
+def _column_positions(header):
+    positions = {name.strip().lower(): index for index, name in enumerate(header)}
+    if 'date' not in positions or 'project' not in positions:
+        raise ImportFormatError('The CSV header must contain "Date" and "Project" columns')
+    if 'hours (decimal)' not in positions and 'hours (hh:mm)' not in positions and 'hours' not in positions:
+        raise ImportFormatError('The CSV header must contain "Hours (Decimal)" or "Hours (HH:MM)"')
+    return positions
+
+
+def _cell(row, positions, name):
+    index = positions.get(name)
+    if index is None or index >= len(row):
+        return ''
+    return row[index].strip()
+
+
+def _flush(rows, deltas, result, org_id):
+    if not rows:
+        return
+    # A bulk insert adds no objects to the session, so nothing accumulates between
+    # batches and the objects the caller holds (its user) stay attached
+    db.session.execute(insert(TimeEntry), rows)
+    apply_rollup_deltas(deltas, org_id)
+    bump_data_versions(entry_version_keys(org_id, {row['user_id'] for row in rows}))
+    db.session.commit()
+    result.imported += len(rows)
+
+
+def import_csv(stream, user, batch_size=IMPORT_BATCH_SIZE, create_projects=False):
+    """
+    Import entries for user from a text stream in export_data() CSV layout.
+    Project names are looked up in (and created in) the user's organization.
+    Valid rows are imported even if others fail; each failure is reported
+    with its line number. Set create_projects to add unknown project names
+    instead of rejecting their rows.
+    """
+    user_id, org_id = user.id, user.org_id
+    result = ImportResult()
+    reader = csv.reader(stream)
+    try:
+        positions = _column_positions(next(reader))
+    except StopIteration:
+        raise ImportFormatError('The file is empty')
+
+    # One query for every project name; lookups below are in memory
+    project_ids = {name: project_id for project_id, name in
+                   db.session.query(Project.id, Project.name).filter(Project.org_id == org_id).all()}
+    known_ids = set(project_ids.values())
+
+    rows, deltas = [], {}
+    for line_number, row in enumerate(reader, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        marker = row[0].strip().upper()
+        if marker == 'SUMMARY':
+            break  # Only totals follow
+        if marker in SUMMARY_MARKERS:
+            continue
+
+        project_name = _cell(row, positions, 'project')
+        project_id = project_ids.get(project_name)
+        if project_id is None and project_name and create_projects:
+            project = Project(org_id=org_id, name=project_name)
+            db.session.add(project)
+            db.session.flush()
+            project_id = project_ids[project_name] = project.id
+            known_ids.add(project_id)
+            result.created_projects.append(project_name)
+        if project_id is None:
+            result.add_error(line_number, f'Unknown project "{project_name}"' if project_name else 'Missing project')
+            continue
+
+        # HH:MM is exact; the decimal column is rounded to two places
+        hours_str = (_cell(row, positions, 'hours (hh:mm)')
+                     or _cell(row, positions, 'hours (decimal)')
+                     or _cell(row, positions, 'hours'))
+        values, errors = validate_entry_fields(
+            _cell(row, positions, 'date'), project_id, hours_str,
+            _cell(row, positions, 'description'), known_project_ids=known_ids
+        )
+        if errors:
+            result.add_error(line_number, '; '.join(errors))
+            continue
+
+        values['user_id'] = user_id
+        values['org_id'] = org_id
+        rows.append(values)
+        add_rollup_delta(deltas, user_id, values['project_id'], values['date'], values['minutes'], 1)
+
+        if len(rows) >= batch_size:
+            _flush(rows, deltas, result, org_id)
+            rows, deltas = [], {}
+
+    _flush(rows, deltas, result, org_id)
+    # Projects created for a batch that ended up empty still need committing
+    db.session.commit()
+    return result
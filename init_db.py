@@ -1,5 +1,5 @@
-from app import app, db
+from app import create_app, init_database
 
-with app.app_context():
-    db.create_all()
+with create_app().app_context():
+    init_database()
     print("Database and tables created successfully.")
@@ -0,0 +1,361 @@
+"""
+Per-request SQL and timing instrumentation.
+
+init_app() hooks every request and every SQL statement the app runs:
+
+    - each endpoint gets a request counter, a duration histogram, a histogram
+      of statements per request and the total time spent in the database;
+    - statements slower than SLOW_QUERY_MS (default 200) are logged and kept
+      with their bound parameters, the endpoint and user that ran them and,
+      for SELECTs, the EXPLAIN plan (SLOW_QUERY_EXPLAIN=0 skips the plan);
+    - requests slower than SLOW_REQUEST_MS (default 1000) are logged and kept
+      with their statement count and database time.
+
+The settings are read from the app config, falling back to the environment.
+The numbers are per worker process: /admin/metrics shows them and /metrics
+serves them in the Prometheus text format.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+from flask import g, has_request_context, request, session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_QUERY_MS = 200
+DEFAULT_SLOW_REQUEST_MS = 1000
+
+# Slow queries and slow requests kept for /admin/metrics
+SLOW_LOG_SIZE = 100
+
+# Bound parameters longer than this are cut in the slow query log
+MAX_PARAMETERS_LENGTH = 500
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+}
+
+SlowQuery = namedtuple('SlowQuery', [
+    'at', 'endpoint', 'user_id', 'duration_ms', 'statement', 'parameters', 'plan'
+])
+SlowRequest = namedtuple('SlowRequest', [
+    'at', 'endpoint', 'method', 'path', 'user_id', 'status', 'duration_ms', 'statements', 'db_ms'
+])
+
+
+class Histogram:
+    """Cumulative bucket counts plus sum and count, as in a Prometheus histogram"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (None if beyond the last)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, cumulative in zip(self.buckets, self.counts):
+            if cumulative >= rank:
+                return bound
+        return None
+
+
+class EndpointStats:
+    """Totals for one endpoint"""
+
+    def __init__(self):
+        self.requests = 0
+        self.server_errors = 0
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.db_seconds = 0.0
+        self.max_duration = 0.0
+        self.max_statements = 0
+
+
+class RequestMetrics:
+    """Thread-safe per-endpoint statistics and the slow query/request logs"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = False
+        self.slow_query_seconds = DEFAULT_SLOW_QUERY_MS / 1000
+        self.slow_request_seconds = DEFAULT_SLOW_REQUEST_MS / 1000
+        self.explain = True
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+            self.slow_queries = deque(maxlen=SLOW_LOG_SIZE)
+            self.slow_requests = deque(maxlen=SLOW_LOG_SIZE)
+            self.slow_query_count = 0
+            self.slow_request_count = 0
+
+    def record_request(self, endpoint, status, duration, statements, db_seconds):
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.requests += 1
+            if status >= 500:
+                stats.server_errors += 1
+            stats.duration.observe(duration)
+            stats.statements.observe(statements)
+            stats.db_seconds += db_seconds
+            stats.max_duration = max(stats.max_duration, duration)
+            stats.max_statements = max(stats.max_statements, statements)
+
+    def record_slow_query(self, slow_query):
+        with self._lock:
+            self.slow_query_count += 1
+            self.slow_queries.appendleft(slow_query)
+
+    def record_slow_request(self, slow_request):
+        with self._lock:
+            self.slow_request_count += 1
+            self.slow_requests.appendleft(slow_request)
+
+    def endpoint_summary(self):
+        """One dict per endpoint, the most total time first"""
+        with self._lock:
+            rows = []
+            for endpoint, stats in self.endpoints.items():
+                p95 = stats.duration.quantile(0.95)
+                rows.append({
+                    'endpoint': endpoint,
+                    'requests': stats.requests,
+                    'server_errors': stats.server_errors,
+                    'total_ms': stats.duration.sum * 1000,
+                    'avg_ms': stats.duration.sum / stats.requests * 1000,
+                    'p95_ms': p95 * 1000 if p95 is not None else None,
+                    'max_ms': stats.max_duration * 1000,
+                    'avg_statements': stats.statements.sum / stats.requests,
+                    'max_statements': stats.max_statements,
+                    'avg_db_ms': stats.db_seconds / stats.requests * 1000,
+                    'db_share': stats.db_seconds / stats.duration.sum if stats.duration.sum else 0.0,
+                })
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+
+metrics = RequestMetrics()
+
+
+def _setting(app, name, default):
+    value = app.config.get(name, os.environ.get(name, default))
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring invalid {name}={value!r}, using {default}")
+        return default
+
+
+def init_app(app):
+    """Configure the thresholds from app config / environment and hook the requests"""
+    metrics.slow_query_seconds = _setting(app, 'SLOW_QUERY_MS', DEFAULT_SLOW_QUERY_MS) / 1000
+    metrics.slow_request_seconds = _setting(app, 'SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS) / 1000
+    metrics.explain = str(app.config.get('SLOW_QUERY_EXPLAIN', os.environ.get('SLOW_QUERY_EXPLAIN', '1'))
+                          ).lower() not in ('0', 'false', 'no', 'off')
+    metrics.enabled = True
+    app.before_request(_start_request)
+    app.after_request(_remember_status)
+    app.teardown_request(_finish_request)
+
+
+def _current_endpoint():
+    if has_request_context():
+        return request.endpoint or 'unmatched'
+    return None
+
+
+def _current_user_id():
+    if has_request_context():
+        return session.get('user_id')
+    return None
+
+
+def _start_request():
+    g.instrumentation_started = time.perf_counter()
+    g.sql_statements = 0
+    g.sql_seconds = 0.0
+
+
+def _remember_status(response):
+    g.instrumentation_status = response.status_code
+    if response.is_streamed and 'instrumentation_started' in g:
+        # Streamed bodies (CSV export) run their queries after teardown;
+        # record the request once the server has sent the whole body
+        request_g = g._get_current_object()
+        request_info = _request_info()
+        response.call_on_close(lambda: _record_request(request_g, request_info))
+        g.instrumentation_deferred = True
+    return response
+
+
+def _finish_request(error=None):
+    if g.get('instrumentation_deferred'):
+        return
+    _record_request(g, _request_info(), error)
+
+
+def _request_info():
+    return _current_endpoint(), request.method, request.full_path.rstrip('?'), _current_user_id()
+
+
+def _record_request(request_g, request_info, error=None):
+    started = request_g.pop('instrumentation_started', None)
+    if started is None:
+        return
+    duration = time.perf_counter() - started
+    endpoint, method, path, user_id = request_info
+    status = request_g.get('instrumentation_status', 500 if error else 200)
+    statements = request_g.get('sql_statements', 0)
+    db_seconds = request_g.get('sql_seconds', 0.0)
+    metrics.record_request(endpoint, status, duration, statements, db_seconds)
+
+    if duration >= metrics.slow_request_seconds:
+        slow_request = SlowRequest(datetime.now(), endpoint, method, path, user_id, status,
+                                   duration * 1000, statements, db_seconds * 1000)
+        metrics.record_slow_request(slow_request)
+        logger.warning(f"Slow request {method} {path} ({endpoint}) for user {user_id}: "
+                       f"{slow_request.duration_ms:.0f} ms, {statements} statements, "
+                       f"{slow_request.db_ms:.0f} ms in the database")
+
+
+def _format_parameters(parameters):
+    text = repr(parameters)
+    if len(text) > MAX_PARAMETERS_LENGTH:
+        text = text[:MAX_PARAMETERS_LENGTH] + '...'
+    return text
+
+
+def explain_plan(cursor, dialect_name, statement, parameters):
+    """EXPLAIN output for a SELECT on the connection that ran it, or None"""
+    prefix = EXPLAIN_PREFIXES.get(dialect_name)
+    if prefix is None or not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    connection = cursor.connection
+    explain_cursor = connection.cursor()
+    # A failed statement aborts a PostgreSQL transaction; keep EXPLAIN out of it
+    savepoint = dialect_name == 'postgresql'
+    try:
+        if savepoint:
+            explain_cursor.execute('SAVEPOINT explain_slow_query')
+        explain_cursor.execute(prefix + statement, parameters)
+        # SQLite's plan detail and PostgreSQL's plan text are the last column
+        plan = '\n'.join(str(row[-1]) for row in explain_cursor.fetchall())
+        if savepoint:
+            explain_cursor.execute('RELEASE SAVEPOINT explain_slow_query')
+        return plan
+    except Exception as e:
+        if savepoint:
+            explain_cursor.execute('ROLLBACK TO SAVEPOINT explain_slow_query')
+        logger.warning(f"Could not EXPLAIN slow query: {e}")
+        return None
+    finally:
+        explain_cursor.close()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if metrics.enabled and context is not None:
+        context._instrumentation_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_instrumentation_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if has_request_context() and 'instrumentation_started' in g:
+        g.sql_statements += 1
+        g.sql_seconds += elapsed
+
+    if elapsed < metrics.slow_query_seconds:
+        return
+    plan = None
+    if metrics.explain and not executemany:
+        plan = explain_plan(cursor, conn.dialect.name, statement, parameters)
+    slow_query = SlowQuery(datetime.now(), _current_endpoint(), _current_user_id(), elapsed * 1000,
+                           statement, _format_parameters(parameters), plan)
+    metrics.record_slow_query(slow_query)
+    logger.warning(f"Slow query ({slow_query.duration_ms:.0f} ms, endpoint {slow_query.endpoint}, "
+                   f"user {slow_query.user_id}): {statement} {slow_query.parameters}"
+                   + (f"\n{plan}" if plan else ''))
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histogram_lines(name, label, stats_histogram):
+    lines = []
+    for bound, cumulative in zip(stats_histogram.buckets, stats_histogram.counts):
+        lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{label},le="+Inf"}} {stats_histogram.count}')
+    lines.append(f'{name}_sum{{{label}}} {stats_histogram.sum}')
+    lines.append(f'{name}_count{{{label}}} {stats_histogram.count}')
+    return lines
+
+
+def render_prometheus(gauges=None, counters=None):
+    """
+    Metrics in the Prometheus text exposition format. gauges and counters map
+    extra metric names to (help text, value) pairs, e.g. the connection pool
+    occupancy and checkout count.
+    """
+    with metrics._lock:
+        endpoints = sorted(metrics.endpoints.items(), key=lambda item: str(item[0]))
+        duration_lines, statement_lines, request_lines, error_lines, db_lines = [], [], [], [], []
+        for endpoint, stats in endpoints:
+            label = f'endpoint="{_escape_label(endpoint)}"'
+            duration_lines.extend(_histogram_lines('timetracker_request_duration_seconds', label, stats.duration))
+            statement_lines.extend(_histogram_lines('timetracker_request_sql_statements', label, stats.statements))
+            request_lines.append(f'timetracker_requests_total{{{label}}} {stats.requests}')
+            error_lines.append(f'timetracker_request_server_errors_total{{{label}}} {stats.server_errors}')
+            db_lines.append(f'timetracker_request_sql_seconds_total{{{label}}} {stats.db_seconds}')
+        slow_queries = metrics.slow_query_count
+        slow_requests = metrics.slow_request_count
+
+    sections = [
+        ('timetracker_requests_total', 'counter', 'Requests handled by this worker', request_lines),
+        ('timetracker_request_server_errors_total', 'counter', 'Requests answered with a 5xx status', error_lines),
+        ('timetracker_request_duration_seconds', 'histogram', 'Request duration', duration_lines),
+        ('timetracker_request_sql_statements', 'histogram', 'SQL statements per request', statement_lines),
+        ('timetracker_request_sql_seconds_total', 'counter', 'Time spent in SQL statements', db_lines),
+        ('timetracker_slow_queries_total', 'counter', 'Statements slower than SLOW_QUERY_MS',
+         [f'timetracker_slow_queries_total {slow_queries}']),
+        ('timetracker_slow_requests_total', 'counter', 'Requests slower than SLOW_REQUEST_MS',
+         [f'timetracker_slow_requests_total {slow_requests}']),
+    ]
+    for metric_type, extra in (('counter', counters), ('gauge', gauges)):
+        for name, (help_text, value) in (extra or {}).items():
+            sections.append((name, metric_type, help_text, [f'{name} {value}']))
+
+    output = []
+    for name, metric_type, help_text, lines in sections:
+        output.append(f'# HELP {name} {help_text}')
+        output.append(f'# TYPE {name} {metric_type}')
+        output.extend(lines)
+    return '\n'.join(output) + '\n'
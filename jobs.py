@@ -0,0 +1,184 @@
+"""
+Background export jobs.
+
+Large CSV and all PDF exports are generated off the request path: the request
+only records an ExportJob row and returns, a small thread pool writes the file
+under instance/exports, and the browser polls the job status until the file can
+be downloaded. The pool size caps how many exports run at once per process,
+and each user may only have a few jobs waiting so the queue stays bounded.
+
+Set EXPORT_JOBS_EAGER in the app config to run jobs inline (used by tests).
+"""
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app, url_for
+
+from app import db
+from models import ExportJob, User
+from queries import EntryScope
+from exports import export_query, write_csv
+from pdf_export import write_pdf
+
+logger = logging.getLogger(__name__)
+
+# Exports generated at the same time in one process
+MAX_CONCURRENT_EXPORT_JOBS = int(os.environ.get('EXPORT_JOB_WORKERS', 2))
+
+# Queued or running jobs a single user may have
+MAX_PENDING_JOBS_PER_USER = 3
+
+# Finished jobs (and their files) are removed after this long
+EXPORT_JOB_RETENTION = timedelta(hours=24)
+
+# Jobs still pending after this long belonged to a process that went away
+EXPORT_JOB_STALE_AFTER = timedelta(hours=1)
+
+EXPORT_FORMATS = ('csv', 'pdf')
+
+_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_EXPORT_JOBS, thread_name_prefix='export-job')
+
+
+def export_dir():
+    """Directory the export files are written to (EXPORT_DIR, default instance/exports)"""
+    path = current_app.config.get('EXPORT_DIR') or os.path.join(current_app.instance_path, 'exports')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def pending_job_count(user_id):
+    """Number of queued or running jobs for a user"""
+    return ExportJob.query.filter(
+        ExportJob.user_id == user_id,
+        ExportJob.status.in_(('queued', 'running'))
+    ).count()
+
+
+def submit_export_job(user_id, export_format, start_date=None, end_date=None, project_ids=None,
+                      include_descriptions=True, include_totals=True, scope=None):
+    """
+    Record an export job and queue it. The export covers the entries of scope
+    (an EntryScope the caller resolved for the user), by default the user's own.
+    Returns the job, or None if the user already has too many pending jobs.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format: {export_format}')
+
+    prune_export_jobs()
+    if pending_job_count(user_id) >= MAX_PENDING_JOBS_PER_USER:
+        return None
+    if scope is None:
+        scope = EntryScope(db.session.get(User, user_id).org_id, user_id)
+
+    params = {
+        'start_date': start_date.isoformat() if start_date else None,
+        'end_date': end_date.isoformat() if end_date else None,
+        'project_ids': [int(project_id) for project_id in project_ids or []],
+        'org_id': scope.org_id,
+        'user_id': scope.user_id,
+        'include_descriptions': include_descriptions,
+        'include_totals': include_totals
+    }
+    job = ExportJob(user_id=user_id, format=export_format, params=json.dumps(params))
+    db.session.add(job)
+    db.session.commit()
+
+    if current_app.config.get('EXPORT_JOBS_EAGER'):
+        run_export_job(job.id)
+        db.session.refresh(job)
+    else:
+        _executor.submit(_run_in_app_context, current_app._get_current_object(), job.id)
+    return job
+
+
+def _run_in_app_context(app, job_id):
+    with app.app_context():
+        run_export_job(job_id)
+
+
+def _job_scope(job, params):
+    """EntryScope of a job's export"""
+    if 'org_id' in params:
+        return EntryScope(params['org_id'], params['user_id'])
+    # Jobs queued before organizations existed cover their owner's organization,
+    # or only the owner's entries if they were queued before exports were scoped
+    owner = db.session.get(User, job.user_id)
+    return EntryScope(owner.org_id, params.get('user_id', job.user_id))
+
+
+def run_export_job(job_id):
+    """Generate the file for one job and record the outcome"""
+    job = db.session.get(ExportJob, job_id)
+    if job is None or job.status != 'queued':
+        return
+    job.status = 'running'
+    job.started_at = datetime.utcnow()
+    db.session.commit()
+
+    params = json.loads(job.params)
+    start_date = datetime.strptime(params['start_date'], '%Y-%m-%d').date() if params['start_date'] else None
+    end_date = datetime.strptime(params['end_date'], '%Y-%m-%d').date() if params['end_date'] else None
+    path = os.path.join(export_dir(), f'export_{job.id}_{uuid.uuid4().hex}.{job.format}')
+    partial_path = path + '.part'
+
+    try:
+        query = export_query(start_date, end_date, params['project_ids'], _job_scope(job, params))
+        if job.format == 'pdf':
+            write_pdf(query, partial_path, start_date, end_date,
+                      params['include_descriptions'], params['include_totals'])
+        else:
+            write_csv(query, partial_path, params['include_descriptions'], params['include_totals'])
+        os.replace(partial_path, path)
+        job.status = 'done'
+        job.file_path = path
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {str(e)}", exc_info=True)
+        db.session.rollback()
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        job = db.session.get(ExportJob, job_id)
+        job.status = 'failed'
+        job.error = str(e)[:500]
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def prune_export_jobs():
+    """Delete expired jobs with their files and fail jobs that were abandoned"""
+    now = datetime.utcnow()
+    ExportJob.query.filter(
+        ExportJob.status.in_(('queued', 'running')),
+        ExportJob.created_at < now - EXPORT_JOB_STALE_AFTER
+    ).update({'status': 'failed', 'error': 'Export was interrupted', 'finished_at': now},
+             synchronize_session=False)
+
+    expired = ExportJob.query.filter(ExportJob.created_at < now - EXPORT_JOB_RETENTION).all()
+    for job in expired:
+        if job.file_path and os.path.exists(job.file_path):
+            os.remove(job.file_path)
+        db.session.delete(job)
+    db.session.commit()
+
+
+def job_to_dict(job):
+    """JSON representation of an export job for status polling"""
+    return {
+        'id': job.id,
+        'format': job.format,
+        'status': job.status,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'status_url': url_for('main.export_job_status', job_id=job.id),
+        'download_url': url_for('main.download_export_job', job_id=job.id) if job.status == 'done' else None
+    }
+
+
+def download_name(job):
+    """File name offered to the browser for a finished job"""
+    created = job.created_at or datetime.utcnow()
+    return f"time_tracking_export_{created.strftime('%Y%m%d_%H%M%S')}.{job.format}"
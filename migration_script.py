@@ -6,19 +6,15 @@ Run this script to add the missing updated_at column to the project table
 
 import os
 import sys
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+
+from db_pool import create_db_engine
 
 def add_updated_at_column():
     """Add updated_at column to project table for production"""
     
-    # Get database URL from environment
-    database_url = os.environ.get("DATABASE_URL", "sqlite:///timetracker.db")
-    
-    # Handle PostgreSQL URL format from Render
-    if database_url.startswith("postgres://"):
-        database_url = database_url.replace("postgres://", "postgresql://", 1)
-    
-    engine = create_engine(database_url)
+    # Database URL from the environment; postgres:// URLs are normalized
+    engine = create_db_engine(os.environ.get("DATABASE_URL", "sqlite:///timetracker.db"), single_use=True)
     
     try:
         with engine.connect() as conn:
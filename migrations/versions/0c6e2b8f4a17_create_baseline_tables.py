@@ -0,0 +1,74 @@
+"""create the original user, project, time_entry and settings tables
+
+Revision ID: 0c6e2b8f4a17
+Revises: 
+Create Date: 2026-10-17 07:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c6e2b8f4a17'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing databases already have these from the first release's db.create_all();
+    # on an empty database this lets `flask db upgrade` build the whole schema
+    op.create_table(
+        'user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=80), nullable=False),
+        sa.Column('password_hash', sa.String(length=128), nullable=False),
+        sa.Column('is_admin', sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username'),
+        if_not_exists=True
+    )
+    op.create_table(
+        'project',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.String(length=255), nullable=True),
+        sa.Column('active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+        if_not_exists=True
+    )
+    op.create_table(
+        'time_entry',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('hours', sa.Float(), nullable=False),
+        sa.Column('description', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['project_id'], ['project.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_table(
+        'settings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.String(length=255), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('key'),
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('settings', if_exists=True)
+    op.drop_table('time_entry', if_exists=True)
+    op.drop_table('project', if_exists=True)
+    op.drop_table('user', if_exists=True)
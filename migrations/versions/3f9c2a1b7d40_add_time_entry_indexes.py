@@ -0,0 +1,42 @@
+"""add composite indexes on time_entry
+
+Revision ID: 3f9c2a1b7d40
+Revises: a1d4c7e2f960
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from contextlib import nullcontext
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a1b7d40'
+down_revision = 'a1d4c7e2f960'
+branch_labels = None
+depends_on = None
+
+
+def _index_block():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    context = op.get_context()
+    if context.dialect.name == 'postgresql':
+        return context.autocommit_block()
+    return nullcontext()
+
+
+def upgrade():
+    # db.create_all() already creates these on a fresh database, so tolerate them existing
+    with _index_block():
+        op.create_index('ix_time_entry_user_date_created', 'time_entry',
+                        ['user_id', 'date', 'created_at'], unique=False,
+                        if_not_exists=True, postgresql_concurrently=True)
+        op.create_index('ix_time_entry_project_date', 'time_entry',
+                        ['project_id', 'date'], unique=False,
+                        if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    op.drop_index('ix_time_entry_project_date', table_name='time_entry', if_exists=True)
+    op.drop_index('ix_time_entry_user_date_created', table_name='time_entry', if_exists=True)
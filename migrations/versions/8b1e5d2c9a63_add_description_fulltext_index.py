@@ -0,0 +1,27 @@
+"""add full-text search index on time_entry.description
+
+Revision ID: 8b1e5d2c9a63
+Revises: 3f9c2a1b7d40
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1e5d2c9a63'
+down_revision = '3f9c2a1b7d40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite: FTS5 table + sync triggers; PostgreSQL: GIN index on to_tsvector(description)
+    from search_index import create_search_index
+    create_search_index(op.get_bind())
+
+
+def downgrade():
+    from search_index import drop_search_index
+    drop_search_index(op.get_bind())
@@ -0,0 +1,47 @@
+"""add daily_rollup table and backfill it from time_entry
+
+Revision ID: a1d4c7e2f960
+Revises: 0c6e2b8f4a17
+Create Date: 2026-10-17 08:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1d4c7e2f960'
+down_revision = '0c6e2b8f4a17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() already creates the table on a fresh database; it is backfilled by `flask init-db`
+    if sa.inspect(op.get_bind()).has_table('daily_rollup'):
+        return
+    op.create_table(
+        'daily_rollup',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('hours', sa.Float(), nullable=False),
+        sa.Column('entry_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['project_id'], ['project.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'project_id', 'date', name='uq_daily_rollup_user_project_date')
+    )
+    op.create_index('ix_daily_rollup_user_date', 'daily_rollup', ['user_id', 'date'], unique=False)
+
+    op.execute(
+        'INSERT INTO daily_rollup (user_id, project_id, date, hours, entry_count) '
+        'SELECT user_id, project_id, date, SUM(hours), COUNT(id) FROM time_entry '
+        'GROUP BY user_id, project_id, date'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_daily_rollup_user_date', table_name='daily_rollup', if_exists=True)
+    op.drop_table('daily_rollup', if_exists=True)
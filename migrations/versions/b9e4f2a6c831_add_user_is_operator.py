@@ -0,0 +1,31 @@
+"""add user.is_operator for deployment-wide diagnostics
+
+Revision ID: b9e4f2a6c831
+Revises: f8d1c6b2a4e9
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e4f2a6c831'
+down_revision = 'f8d1c6b2a4e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() already creates the column on a fresh database
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('user')}
+    if 'is_operator' in columns:
+        return
+    op.add_column('user', sa.Column('is_operator', sa.Boolean(), nullable=False, server_default=sa.false()))
+    if op.get_context().dialect.name != 'sqlite':
+        op.alter_column('user', 'is_operator', server_default=None)
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('is_operator')
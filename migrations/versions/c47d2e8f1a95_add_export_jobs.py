@@ -0,0 +1,58 @@
+"""add export_job table and time_entry list-order index
+
+Revision ID: c47d2e8f1a95
+Revises: 8b1e5d2c9a63
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from contextlib import nullcontext
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47d2e8f1a95'
+down_revision = '8b1e5d2c9a63'
+branch_labels = None
+depends_on = None
+
+
+def _index_block():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    context = op.get_context()
+    if context.dialect.name == 'postgresql':
+        return context.autocommit_block()
+    return nullcontext()
+
+
+def upgrade():
+    op.create_table(
+        'export_job',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('format', sa.String(length=10), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('params', sa.Text(), nullable=False),
+        sa.Column('file_path', sa.String(length=500), nullable=True),
+        sa.Column('error', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_index('ix_export_job_user_created', 'export_job', ['user_id', 'created_at'],
+                    unique=False, if_not_exists=True)
+
+    with _index_block():
+        op.create_index('ix_time_entry_date_created_id', 'time_entry',
+                        ['date', 'created_at', 'id'], unique=False,
+                        if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    op.drop_index('ix_time_entry_date_created_id', table_name='time_entry', if_exists=True)
+    op.drop_index('ix_export_job_user_created', table_name='export_job', if_exists=True)
+    op.drop_table('export_job', if_exists=True)
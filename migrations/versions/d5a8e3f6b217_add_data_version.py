@@ -0,0 +1,30 @@
+"""add data_version table
+
+Revision ID: d5a8e3f6b217
+Revises: c47d2e8f1a95
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a8e3f6b217'
+down_revision = 'c47d2e8f1a95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'data_version',
+        sa.Column('key', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table('data_version', if_exists=True)
@@ -0,0 +1,54 @@
+"""store time_entry and daily_rollup durations as integer minutes
+
+Revision ID: e2b9c4d7a1f3
+Revises: d5a8e3f6b217
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b9c4d7a1f3'
+down_revision = 'd5a8e3f6b217'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table_name):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table_name)}
+
+
+def _add_minutes_column(table_name):
+    # db.create_all() already creates the column on a fresh database
+    if 'minutes' not in _columns(table_name):
+        op.add_column(table_name, sa.Column('minutes', sa.Integer(), nullable=False, server_default='0'))
+        if op.get_context().dialect.name != 'sqlite':
+            op.alter_column(table_name, 'minutes', server_default=None)
+
+
+def upgrade():
+    _add_minutes_column('time_entry')
+    if 'hours' in _columns('time_entry'):
+        op.execute('UPDATE time_entry SET minutes = CAST(ROUND(hours * 60) AS INTEGER)')
+        op.drop_column('time_entry', 'hours')
+
+    # Recompute the rollup from the converted entries rather than rounding its float sums
+    _add_minutes_column('daily_rollup')
+    op.execute(
+        'UPDATE daily_rollup SET minutes = COALESCE(('
+        'SELECT SUM(time_entry.minutes) FROM time_entry '
+        'WHERE time_entry.user_id = daily_rollup.user_id '
+        'AND time_entry.project_id = daily_rollup.project_id '
+        'AND time_entry.date = daily_rollup.date), 0)'
+    )
+    if 'hours' in _columns('daily_rollup'):
+        op.drop_column('daily_rollup', 'hours')
+
+
+def downgrade():
+    for table_name in ('time_entry', 'daily_rollup'):
+        op.add_column(table_name, sa.Column('hours', sa.Float(), nullable=False, server_default='0'))
+        op.execute(f'UPDATE {table_name} SET hours = minutes / 60.0')
+        op.drop_column(table_name, 'minutes')
@@ -0,0 +1,150 @@
+"""add organizations and org_id-leading indexes on tenant data
+
+Revision ID: f8d1c6b2a4e9
+Revises: e2b9c4d7a1f3
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from contextlib import nullcontext
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8d1c6b2a4e9'
+down_revision = 'e2b9c4d7a1f3'
+branch_labels = None
+depends_on = None
+
+DEFAULT_ORG_ID = 1
+
+# Every existing row belongs to the default organization
+TENANT_TABLES = ['user', 'project', 'settings', 'time_entry', 'daily_rollup']
+
+# (name, table, columns) replaced by org_id-leading versions
+OLD_INDEXES = [
+    ('ix_time_entry_user_date_created', 'time_entry', ['user_id', 'date', 'created_at']),
+    ('ix_time_entry_date_created_id', 'time_entry', ['date', 'created_at', 'id']),
+    ('ix_daily_rollup_user_date', 'daily_rollup', ['user_id', 'date']),
+]
+NEW_INDEXES = [
+    ('ix_time_entry_org_user_date_created', 'time_entry', ['org_id', 'user_id', 'date', 'created_at']),
+    ('ix_time_entry_org_date_created_id', 'time_entry', ['org_id', 'date', 'created_at', 'id']),
+    ('ix_daily_rollup_org_user_date', 'daily_rollup', ['org_id', 'user_id', 'date']),
+    ('ix_daily_rollup_org_date', 'daily_rollup', ['org_id', 'date']),
+    ('ix_user_org_id', 'user', ['org_id']),
+]
+
+# Names unique per organization instead of globally: (table, column, new constraint)
+ORG_UNIQUE = [
+    ('project', 'name', 'uq_project_org_name'),
+    ('settings', 'key', 'uq_settings_org_key'),
+]
+
+
+def _index_block():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    context = op.get_context()
+    if context.dialect.name == 'postgresql':
+        return context.autocommit_block()
+    return nullcontext()
+
+
+def _is_sqlite():
+    return op.get_context().dialect.name == 'sqlite'
+
+
+def _columns(table_name):
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table_name)}
+
+
+def _unique_constraints(table_name):
+    return sa.inspect(op.get_bind()).get_unique_constraints(table_name)
+
+
+def _add_org_id(table_name):
+    # db.create_all() already creates the column on a fresh database
+    if 'org_id' in _columns(table_name):
+        return
+    op.add_column(table_name, sa.Column('org_id', sa.Integer(), nullable=False,
+                                        server_default=str(DEFAULT_ORG_ID)))
+    # SQLite cannot add a constraint to an existing table; the models declare it for new databases
+    if not _is_sqlite():
+        op.create_foreign_key(f'fk_{table_name}_org_id', table_name, 'organization', ['org_id'], ['id'])
+        op.alter_column(table_name, 'org_id', server_default=None)
+
+
+def _replace_unique(table_name, old_columns, new_name, new_columns):
+    """Drop the unique constraint on old_columns and add new_name on new_columns"""
+    if _is_sqlite():
+        # The old constraint may be unnamed; rebuild the table from its reflection without it
+        table = sa.Table(table_name, sa.MetaData(), autoload_with=op.get_bind())
+        for constraint in list(table.constraints):
+            if isinstance(constraint, sa.UniqueConstraint) and \
+                    [column.name for column in constraint.columns] == old_columns:
+                table.constraints.discard(constraint)
+        with op.batch_alter_table(table_name, copy_from=table, recreate='always') as batch_op:
+            batch_op.create_unique_constraint(new_name, new_columns)
+        return
+    for constraint in _unique_constraints(table_name):
+        if constraint['column_names'] == old_columns:
+            op.drop_constraint(constraint['name'], table_name, type_='unique')
+    op.create_unique_constraint(new_name, table_name, new_columns)
+
+
+def upgrade():
+    op.create_table(
+        'organization',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+        if_not_exists=True
+    )
+    bind = op.get_bind()
+    if bind.execute(sa.text('SELECT 1 FROM organization WHERE id = :id'), {'id': DEFAULT_ORG_ID}).first() is None:
+        organization = sa.table('organization', sa.column('id'), sa.column('name'), sa.column('created_at'))
+        op.bulk_insert(organization, [{'id': DEFAULT_ORG_ID, 'name': 'Default', 'created_at': datetime.utcnow()}])
+        if op.get_context().dialect.name == 'postgresql':
+            op.execute("SELECT setval(pg_get_serial_sequence('organization', 'id'), "
+                       "(SELECT MAX(id) FROM organization))")
+
+    for table_name in TENANT_TABLES:
+        _add_org_id(table_name)
+
+    for table_name, column_name, constraint_name in ORG_UNIQUE:
+        if not any(constraint['name'] == constraint_name for constraint in _unique_constraints(table_name)):
+            _replace_unique(table_name, [column_name], constraint_name, ['org_id', column_name])
+
+    with _index_block():
+        for name, table_name, _ in OLD_INDEXES:
+            op.drop_index(name, table_name=table_name, if_exists=True, postgresql_concurrently=True)
+        for name, table_name, columns in NEW_INDEXES:
+            op.create_index(name, table_name, columns, unique=False,
+                            if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    # Fails if two organizations use the same project name or setting key.
+    # On SQLite, run `flask init-db` afterwards to recreate the search triggers.
+    with _index_block():
+        for name, table_name, _ in NEW_INDEXES:
+            op.drop_index(name, table_name=table_name, if_exists=True, postgresql_concurrently=True)
+        for name, table_name, columns in OLD_INDEXES:
+            op.create_index(name, table_name, columns, unique=False,
+                            if_not_exists=True, postgresql_concurrently=True)
+
+    for table_name, column_name, constraint_name in ORG_UNIQUE:
+        _replace_unique(table_name, ['org_id', column_name], f'uq_{table_name}_{column_name}', [column_name])
+
+    for table_name in reversed(TENANT_TABLES):
+        foreign_keys = sa.inspect(op.get_bind()).get_foreign_keys(table_name)
+        with op.batch_alter_table(table_name) as batch_op:
+            for foreign_key in foreign_keys:
+                if foreign_key['constrained_columns'] == ['org_id'] and foreign_key['name']:
+                    batch_op.drop_constraint(foreign_key['name'], type_='foreignkey')
+            batch_op.drop_column('org_id')
+    op.drop_table('organization', if_exists=True)
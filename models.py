@@ -1,12 +1,43 @@
 from app import db
 from datetime import datetime, date
-from sqlalchemy import func
+from flask import g, has_request_context
+from sqlalchemy import func, cast, event
+from sqlalchemy.orm import Session, column_property
 from werkzeug.security import generate_password_hash, check_password_hash
+from utils import minutes_to_hours, minutes_to_hours_minutes
+from db_pool import retry_on_locked
+
+# Organizations
+#
+# Every user, project and setting belongs to one organization (a client firm
+# hosted on the deployment), and time entries and rollup rows carry their
+# user's org_id so tenant queries filter on it first: the composite indexes
+# below lead with org_id, and on PostgreSQL time_entry can be list-partitioned
+# by it (see partitioning.py). Signup creates a new organization; rows created
+# without an explicit one (the maintenance scripts) land in the default organization.
+DEFAULT_ORG_ID = 1
+
+class Organization(db.Model):
+    """A tenant: owns its users, projects and settings"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    users = db.relationship('User', backref='organization', lazy=True)
+    projects = db.relationship('Project', lazy=True)
+
+    def __repr__(self):
+        return f'<Organization {self.name}>'
 
 class Project(db.Model):
     """Model for storing project information"""
+    __table_args__ = (
+        # Names are unique within an organization; also serves org_id lookups
+        db.UniqueConstraint('org_id', 'name', name='uq_project_org_name'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False, unique=True)
+    org_id = db.Column(db.Integer, db.ForeignKey('organization.id'), nullable=False, default=DEFAULT_ORG_ID)
+    name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.String(255))
     active = db.Column(db.Boolean, default=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -14,6 +45,7 @@ class Project(db.Model):
     
     # Relationship to time entries
     time_entries = db.relationship('TimeEntry', backref='project', lazy=True, cascade='all, delete-orphan')
+    daily_rollups = db.relationship('DailyRollup', lazy=True, cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<Project {self.name}>'
@@ -32,58 +64,206 @@ class Project(db.Model):
     
     def save(self):
         """Save project with error handling"""
-        try:
+        def commit():
             db.session.add(self)
             db.session.commit()
+        
+        try:
+            retry_on_locked(db.session, commit)
         except Exception as e:
             db.session.rollback()
             # Log error but continue
             print(f"Database save error: {e}")
             # Try basic save without updated_at
             try:
-                db.session.add(self)
-                db.session.commit()
+                commit()
             except:
                 db.session.rollback()
                 raise
 
 class TimeEntry(db.Model):
     """Model for storing time entry records"""
+    __table_args__ = (
+        # Per-user listings/totals: WHERE org_id = ? AND user_id = ? AND date BETWEEN ... ORDER BY date, created_at
+        db.Index('ix_time_entry_org_user_date_created', 'org_id', 'user_id', 'date', 'created_at'),
+        # Per-project filters over a date range (reports, export, search)
+        db.Index('ix_time_entry_project_date', 'project_id', 'date'),
+        # Keyset batches over an organization's entries in list order (exports, admin views)
+        db.Index('ix_time_entry_org_date_created_id', 'org_id', 'date', 'created_at', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
+    # Always the user's organization; set explicitly by every writer
+    org_id = db.Column(db.Integer, db.ForeignKey('organization.id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    hours = db.Column(db.Float, nullable=False)  # Store as decimal hours (e.g., 1.5 for 1h 30m)
+    # Previous owner kept in the attribute history when an entry is reassigned (see _entry_user_ids)
+    user_id = column_property(db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False), active_history=True)
+    minutes = db.Column(db.Integer, nullable=False)  # Whole minutes (e.g., 90 for 1h 30m)
     description = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
-        return f'<TimeEntry {self.date} - {self.hours}h>'
+        return f'<TimeEntry {self.date} - {self.minutes}m>'
+    
+    @property
+    def hours(self):
+        """Duration in decimal hours, for display"""
+        return minutes_to_hours(self.minutes)
     
     @property
     def hours_minutes_display(self):
-        """Convert decimal hours to hours:minutes format for display"""
-        total_minutes = int(self.hours * 60)
-        hours = total_minutes // 60
-        minutes = total_minutes % 60
-        return f"{hours}:{minutes:02d}"
+        """Duration in hours:minutes format for display"""
+        return minutes_to_hours_minutes(self.minutes)
+
+class DailyRollup(db.Model):
+    """Per-user, per-project daily totals maintained alongside TimeEntry writes"""
+    __tablename__ = 'daily_rollup'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'project_id', 'date', name='uq_daily_rollup_user_project_date'),
+        db.Index('ix_daily_rollup_org_user_date', 'org_id', 'user_id', 'date'),
+        db.Index('ix_daily_rollup_org_date', 'org_id', 'date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    org_id = db.Column(db.Integer, db.ForeignKey('organization.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    minutes = db.Column(db.Integer, nullable=False, default=0)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DailyRollup {self.user_id}/{self.project_id} {self.date} - {self.minutes}m>'
+
+def apply_rollup_deltas(deltas, org_id):
+    """
+    Apply {(user_id, project_id, date): (minutes, count)} changes for users of
+    one organization to the rollup; the caller commits with the entry changes.
+    The totals are incremented in SQL rather than read and written back, so
+    concurrent writers to the same day never lose each other's changes.
+    """
+    if not deltas:
+        return
+    connection = db.session.connection()
+    table = DailyRollup.__table__
+    # Sorted so concurrent transactions lock the rows in the same order
+    rows = [
+        {'org_id': org_id, 'user_id': user_id, 'project_id': project_id, 'date': entry_date,
+         'minutes': minutes, 'entry_count': count}
+        for (user_id, project_id, entry_date), (minutes, count) in sorted(deltas.items())
+    ]
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        insert = dialect_insert(table)
+        connection.execute(insert.on_conflict_do_update(
+            index_elements=['user_id', 'project_id', 'date'],
+            set_={'minutes': table.c.minutes + insert.excluded.minutes,
+                  'entry_count': table.c.entry_count + insert.excluded.entry_count}
+        ), rows)
+    else:
+        for row in rows:
+            increment = table.update().where(
+                table.c.user_id == row['user_id'],
+                table.c.project_id == row['project_id'],
+                table.c.date == row['date']
+            ).values(minutes=table.c.minutes + row['minutes'],
+                     entry_count=table.c.entry_count + row['entry_count'])
+            if connection.execute(increment).rowcount == 0:
+                connection.execute(table.insert(), row)
+
+    # Days whose last entry was removed (or moved away) drop out of the rollup
+    removed = [row for row in rows if row['entry_count'] <= 0]
+    if removed:
+        connection.execute(table.delete().where(
+            table.c.org_id == org_id,
+            table.c.user_id.in_({row['user_id'] for row in removed}),
+            table.c.project_id.in_({row['project_id'] for row in removed}),
+            table.c.date.between(min(row['date'] for row in removed), max(row['date'] for row in removed)),
+            table.c.entry_count <= 0
+        ))
+
+def add_rollup_delta(deltas, user_id, project_id, entry_date, minutes, count):
+    """Accumulate one entry's change into a deltas dict for apply_rollup_deltas()"""
+    key = (user_id, project_id, entry_date)
+    current_minutes, current_count = deltas.get(key, (0, 0))
+    deltas[key] = (current_minutes + minutes, current_count + count)
+
+def apply_rollup_delta(org_id, user_id, project_id, entry_date, minutes, count):
+    """Add minutes/count to a single rollup row; the caller commits with the entry change"""
+    apply_rollup_deltas({(user_id, project_id, entry_date): (minutes, count)}, org_id)
+
+def record_entry_added(entry):
+    """Update the rollup for a newly added entry"""
+    apply_rollup_delta(entry.org_id, entry.user_id, entry.project_id, entry.date, entry.minutes, 1)
+
+def record_entry_removed(entry):
+    """Update the rollup for an entry that is being deleted"""
+    apply_rollup_delta(entry.org_id, entry.user_id, entry.project_id, entry.date, -entry.minutes, -1)
+
+def rebuild_daily_rollups():
+    """Recompute the whole rollup table from time_entry (backfill/repair)"""
+    DailyRollup.query.delete(synchronize_session=False)
+    rows = db.session.query(
+        TimeEntry.org_id,
+        TimeEntry.user_id,
+        TimeEntry.project_id,
+        TimeEntry.date,
+        func.sum(TimeEntry.minutes),
+        func.count(TimeEntry.id)
+    ).group_by(TimeEntry.org_id, TimeEntry.user_id, TimeEntry.project_id, TimeEntry.date).all()
+    db.session.add_all([
+        DailyRollup(org_id=org_id, user_id=user_id, project_id=project_id, date=entry_date,
+                    minutes=minutes or 0, entry_count=count)
+        for org_id, user_id, project_id, entry_date, minutes, count in rows
+    ])
+    # Every cached page depends on its organization's config, so this invalidates them all
+    bump_data_versions([org_config_version_key(org_id) for (org_id,) in db.session.query(Organization.id)])
+    db.session.commit()
+    return len(rows)
 
 class Settings(db.Model):
-    """Model for storing application settings"""
+    """Model for storing an organization's settings"""
+    __table_args__ = (
+        db.UniqueConstraint('org_id', 'key', name='uq_settings_org_key'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    key = db.Column(db.String(50), unique=True, nullable=False)
+    org_id = db.Column(db.Integer, db.ForeignKey('organization.id'), nullable=False, default=DEFAULT_ORG_ID)
+    key = db.Column(db.String(50), nullable=False)
     value = db.Column(db.String(255), nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
         return f'<Setting {self.key}={self.value}>'
 
-def initialize_default_data():
-    """Initialize default projects and settings if they don't exist"""
+def ensure_default_organization():
+    """Create the default organization if it is missing; the caller commits"""
+    if db.session.get(Organization, DEFAULT_ORG_ID) is None:
+        db.session.add(Organization(id=DEFAULT_ORG_ID, name='Default'))
+        db.session.flush()
+
+def create_organization(name, admin):
+    """
+    Add an organization with admin (a new User) as its first admin; the caller
+    commits, then loads its defaults with initialize_default_data(org.id)
+    """
+    organization = Organization(name=name)
+    db.session.add(organization)
+    db.session.flush()
+    admin.org_id = organization.id
+    admin.is_admin = True
+    db.session.add(admin)
+    return organization
+
+def initialize_default_data(org_id):
+    """Initialize an organization's default projects and settings if they don't exist"""
     
     # Check if projects already exist
-    if Project.query.count() == 0:
+    if Project.query.filter_by(org_id=org_id).count() == 0:
         default_projects = [
             {'name': 'Client A - Development', 'description': 'Software development work for Client A'},
             {'name': 'Client B - Consulting', 'description': 'Business consulting for Client B'},
@@ -93,11 +273,11 @@ def initialize_default_data():
         ]
         
         for project_data in default_projects:
-            project = Project(**project_data)
+            project = Project(org_id=org_id, **project_data)
             db.session.add(project)
     
     # Check if settings already exist
-    if Settings.query.count() == 0:
+    if Settings.query.filter_by(org_id=org_id).count() == 0:
         default_settings = [
             {'key': 'monthly_goal_hours', 'value': '160'},
             {'key': 'currency_symbol', 'value': '$'},
@@ -105,7 +285,7 @@ def initialize_default_data():
         ]
         
         for setting_data in default_settings:
-            setting = Settings(**setting_data)
+            setting = Settings(org_id=org_id, **setting_data)
             db.session.add(setting)
     
     try:
@@ -114,40 +294,109 @@ def initialize_default_data():
         db.session.rollback()
         print(f"Error initializing default data: {e}")
 
-def get_setting(key, default_value=None):
-    """Helper function to get a setting value"""
-    setting = Settings.query.filter_by(key=key).first()
-    return setting.value if setting else default_value
-
-def set_setting(key, value):
-    """Helper function to set a setting value"""
-    setting = Settings.query.filter_by(key=key).first()
-    if setting:
-        setting.value = str(value)
-        setting.updated_at = datetime.utcnow()
+def current_org_id():
+    """
+    Organization of the logged-in user. Outside a request with a loaded user
+    there is no current organization: CLI commands and jobs pass org_id
+    explicitly, so this raises RuntimeError rather than guessing one.
+    """
+    user = g.get('current_user') if has_request_context() else None
+    if user is None:
+        raise RuntimeError('No logged-in user to take the organization from; pass org_id explicitly')
+    return user.org_id
+
+# Settings are read on nearly every request but change a few times a year, so each
+# organization's rows are cached in-process. A version row per organization, bumped
+# in the same transaction as every change, tells each gunicorn worker when its copy
+# is stale; it is checked at most once per request.
+SETTINGS_VERSION_KEY = '_settings_version'
+_settings_cache = {}  # org_id -> (version, values)
+
+def _load_settings(org_id):
+    """Return an organization's cached settings dict, reloading it if another worker changed a setting"""
+    cached = _settings_cache.get(org_id)
+    checked = g.get('_settings_checked', frozenset()) if has_request_context() else frozenset()
+    if cached is not None and org_id in checked:
+        return cached[1]
+    
+    version = db.session.query(Settings.value).filter_by(org_id=org_id, key=SETTINGS_VERSION_KEY).scalar()
+    if cached is None or version != cached[0]:
+        values = {setting.key: setting.value for setting in Settings.query.filter_by(org_id=org_id)}
+        version = values.pop(SETTINGS_VERSION_KEY, None)
+        cached = _settings_cache[org_id] = (version, values)
+    
+    if has_request_context():
+        g._settings_checked = checked | {org_id}
+    return cached[1]
+
+def invalidate_settings_cache(org_id=None):
+    """Drop this worker's cached settings of one organization (None: all of them)"""
+    if org_id is None:
+        _settings_cache.clear()
     else:
-        setting = Settings()
-        setting.key = key
-        setting.value = str(value)
-        db.session.add(setting)
+        _settings_cache.pop(org_id, None)
+
+def _bump_settings_version(org_id):
+    """Advance an organization's shared settings version so every worker reloads its cache"""
+    updated = Settings.query.filter_by(org_id=org_id, key=SETTINGS_VERSION_KEY).update(
+        {Settings.value: cast(cast(Settings.value, db.Integer) + 1, db.String)},
+        synchronize_session=False
+    )
+    if not updated:
+        db.session.add(Settings(org_id=org_id, key=SETTINGS_VERSION_KEY, value='1'))
+
+def get_setting(key, default_value=None, org_id=None):
+    """Helper function to get a setting value of an organization (default: the current user's)"""
+    if org_id is None:
+        org_id = current_org_id()
+    return _load_settings(org_id).get(key, default_value)
+
+def set_setting(key, value, org_id=None):
+    """Helper function to set a setting value of an organization (default: the current user's)"""
+    if org_id is None:
+        org_id = current_org_id()
     
-    try:
+    def save():
+        setting = Settings.query.filter_by(org_id=org_id, key=key).first()
+        if setting:
+            setting.value = str(value)
+            setting.updated_at = datetime.utcnow()
+        else:
+            setting = Settings()
+            setting.org_id = org_id
+            setting.key = key
+            setting.value = str(value)
+            db.session.add(setting)
+        _bump_settings_version(org_id)
         db.session.commit()
+    
+    try:
+        retry_on_locked(db.session, save)
         return True
     except Exception as e:
         db.session.rollback()
         print(f"Error setting {key}: {e}")
         return False
+    finally:
+        invalidate_settings_cache(org_id)
 
 class User(db.Model):
     """Model for storing user authentication information"""
+    __table_args__ = (
+        db.Index('ix_user_org_id', 'org_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
+    org_id = db.Column(db.Integer, db.ForeignKey('organization.id'), nullable=False, default=DEFAULT_ORG_ID)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
     is_admin = db.Column(db.Boolean, nullable=False, default=False)
+    # Runs the deployment: sees its cross-tenant diagnostics (metrics, slow queries, pool)
+    is_operator = db.Column(db.Boolean, nullable=False, default=False)
     
     # Relationships
     time_entries = db.relationship('TimeEntry', backref='user', lazy=True, cascade='all, delete-orphan')
+    daily_rollups = db.relationship('DailyRollup', lazy=True, cascade='all, delete-orphan')
+    export_jobs = db.relationship('ExportJob', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
         """Hash and set the user's password"""
@@ -159,3 +408,126 @@ class User(db.Model):
     
     def __repr__(self):
         return f'<User {self.username}>'
+
+class ExportJob(db.Model):
+    """Export generated in the background; the finished file is kept on disk"""
+    __tablename__ = 'export_job'
+    __table_args__ = (
+        db.Index('ix_export_job_user_created', 'user_id', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    format = db.Column(db.String(10), nullable=False)  # csv or pdf
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    params = db.Column(db.Text, nullable=False, default='{}')  # JSON export options
+    file_path = db.Column(db.String(500))
+    error = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    @property
+    def is_pending(self):
+        return self.status in ('queued', 'running')
+
+    def __repr__(self):
+        return f'<ExportJob {self.id} {self.format} {self.status}>'
+
+# Data versions
+#
+# Counters that change whenever data a cached page depends on changes, so a
+# cached response (see response_cache.py) can be validated with one indexed
+# lookup. Keys are per organization: 'entries:org:<org id>' covers all of an
+# organization's entries, 'entries:<user id>' one user's entries, and
+# 'config:<org id>' its projects, users and settings, so writes in one tenant
+# never invalidate another's pages. ORM writes bump them from the after_flush
+# hook below; bulk statements must call bump_data_versions().
+ENTRIES_VERSION_KEY = 'entries'
+CONFIG_VERSION_KEY = 'config'
+
+class DataVersion(db.Model):
+    """Change counter used to validate cached responses"""
+    __tablename__ = 'data_version'
+
+    key = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DataVersion {self.key}={self.version}>'
+
+def user_entries_version_key(user_id):
+    """Data version key for one user's entries"""
+    return f'{ENTRIES_VERSION_KEY}:{user_id}'
+
+def org_entries_version_key(org_id):
+    """Data version key for all of an organization's entries"""
+    return f'{ENTRIES_VERSION_KEY}:org:{org_id}'
+
+def org_config_version_key(org_id):
+    """Data version key for an organization's projects, users and settings"""
+    return f'{CONFIG_VERSION_KEY}:{org_id}'
+
+def entry_version_keys(org_id, user_ids):
+    """Keys to bump after writing entries of the given users of one organization"""
+    return {org_entries_version_key(org_id)} | {user_entries_version_key(user_id) for user_id in user_ids}
+
+def bump_data_versions(keys, connection=None):
+    """Increment the given data versions in the current transaction"""
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    if connection is None:
+        connection = db.session.connection()
+    table = DataVersion.__table__
+    increment = table.update().where(table.c.key.in_(keys)).values(version=table.c.version + 1)
+    if connection.execute(increment).rowcount == len(keys):
+        return
+
+    # First change for some key: create the missing rows, tolerating a concurrent creator
+    dialect = connection.dialect.name
+    rows = [{'key': key, 'version': 0} for key in keys]
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        connection.execute(dialect_insert(table).on_conflict_do_nothing(index_elements=['key']), rows)
+    else:
+        existing = {key for (key,) in connection.execute(
+            db.select(table.c.key).where(table.c.key.in_(keys)))}
+        missing = [row for row in rows if row['key'] not in existing]
+        if missing:
+            connection.execute(table.insert(), missing)
+    connection.execute(increment)
+
+def get_data_versions(keys):
+    """{key: version} for the given keys in one query; missing keys read as 0"""
+    keys = list(keys)
+    versions = dict.fromkeys(keys, 0)
+    versions.update(db.session.query(DataVersion.key, DataVersion.version)
+                    .filter(DataVersion.key.in_(keys)).all())
+    return versions
+
+def _entry_user_ids(entry):
+    """Users whose entries a flushed entry changes: its owner, and the previous one if it moved"""
+    previous = db.inspect(entry).attrs.user_id.history.deleted
+    return {user_id for user_id in (entry.user_id, *previous) if user_id}
+
+def _changed_data_version_keys(session):
+    keys = set()
+    for obj in list(session.new) + list(session.deleted) + list(session.dirty):
+        if isinstance(obj, TimeEntry):
+            keys.update(entry_version_keys(obj.org_id, _entry_user_ids(obj)))
+        elif isinstance(obj, (Project, Settings, User)):
+            keys.add(org_config_version_key(obj.org_id))
+        elif isinstance(obj, Organization):
+            keys.add(org_config_version_key(obj.id))
+    return keys
+
+@event.listens_for(Session, 'after_flush')
+def _bump_versions_after_flush(session, flush_context):
+    """Bump the data versions touched by an ORM flush, in the same transaction"""
+    keys = _changed_data_version_keys(session)
+    if keys:
+        bump_data_versions(keys, session.connection())
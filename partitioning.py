@@ -0,0 +1,119 @@
+"""
+Optional PostgreSQL layout: time_entry list-partitioned by organization.
+
+Every entry query filters on org_id (see queries.scoped), so once time_entry
+is declared PARTITION BY LIST (org_id) the planner prunes each query to one
+organization's partition: a firm's scans, index depth and VACUUM work follow
+its own history instead of the whole deployment's, and a firm that leaves can
+be detached and dropped without touching the others.
+
+The conversion is opt-in and one-way. `flask partition-time-entry` prints the
+statements; with --apply it runs them in one transaction, holding an
+exclusive lock on time_entry while the rows are copied, so schedule it like
+any other long migration. Afterwards:
+
+    - every organization has a partition time_entry_org_<id>; `flask create-org`
+      adds one for each new organization, and entries of an organization
+      without one land in time_entry_default;
+    - the primary key is (org_id, id), because unique constraints on a
+      partitioned table must include the partition key. Ids still come from
+      the original sequence, so they stay unique and the ORM keeps mapping id
+      alone;
+    - the indexes are defined on the parent, so each partition gets its own.
+
+SQLite keeps the plain table; the org_id-leading indexes give it the same
+access paths.
+"""
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+
+from models import TimeEntry
+from search_index import PG_FTS_DDL
+
+DEFAULT_PARTITION = 'time_entry_default'
+UNPARTITIONED_TABLE = 'time_entry_unpartitioned'
+
+# Index names that may still exist on an unpartitioned table from older revisions
+LEGACY_INDEXES = ['ix_time_entry_user_date_created', 'ix_time_entry_date_created_id']
+
+
+def partition_name(org_id):
+    """Name of an organization's time_entry partition"""
+    return f'time_entry_org_{int(org_id)}'
+
+
+def is_partitioned(connection):
+    """True if time_entry is already a partitioned table"""
+    if connection.dialect.name != 'postgresql':
+        return False
+    return connection.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'time_entry'::regclass"
+    )).first() is not None
+
+
+def _partition_ddl(org_id):
+    return (f'CREATE TABLE IF NOT EXISTS {partition_name(org_id)} '
+            f'PARTITION OF time_entry FOR VALUES IN ({int(org_id)})')
+
+
+def conversion_statements(connection):
+    """Statements that turn the current time_entry into the partitioned layout"""
+    org_ids = [org_id for (org_id,) in connection.execute(text('SELECT id FROM organization ORDER BY id'))]
+    sequence = connection.execute(text("SELECT pg_get_serial_sequence('time_entry', 'id')")).scalar()
+    if sequence is None:
+        raise RuntimeError('time_entry.id is not backed by a serial sequence')
+    index_names = sorted(index.name for index in TimeEntry.__table__.indexes)
+
+    statements = [
+        'LOCK TABLE time_entry IN ACCESS EXCLUSIVE MODE',
+        f'ALTER TABLE time_entry RENAME TO {UNPARTITIONED_TABLE}',
+        f'ALTER TABLE {UNPARTITIONED_TABLE} RENAME CONSTRAINT time_entry_pkey TO {UNPARTITIONED_TABLE}_pkey',
+    ]
+    # Index names are schema-wide; the old table is dropped at the end, so free them now
+    statements += [f'DROP INDEX IF EXISTS {name}' for name in index_names + LEGACY_INDEXES]
+    statements.append('DROP INDEX IF EXISTS ix_time_entry_description_fts')
+    statements += [
+        f'CREATE TABLE time_entry (LIKE {UNPARTITIONED_TABLE} INCLUDING DEFAULTS INCLUDING STORAGE) '
+        'PARTITION BY LIST (org_id)',
+        'ALTER TABLE time_entry ADD CONSTRAINT time_entry_pkey PRIMARY KEY (org_id, id)',
+        'ALTER TABLE time_entry ADD FOREIGN KEY (org_id) REFERENCES organization (id)',
+        'ALTER TABLE time_entry ADD FOREIGN KEY (project_id) REFERENCES project (id)',
+        'ALTER TABLE time_entry ADD FOREIGN KEY (user_id) REFERENCES "user" (id)',
+    ]
+    statements += [_partition_ddl(org_id) for org_id in org_ids]
+    statements.append(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF time_entry DEFAULT')
+    statements += [str(CreateIndex(index).compile(dialect=connection.dialect))
+                   for index in sorted(TimeEntry.__table__.indexes, key=lambda index: index.name)]
+    statements += PG_FTS_DDL
+    statements += [
+        f'INSERT INTO time_entry SELECT * FROM {UNPARTITIONED_TABLE}',
+        # The id default still draws from the old table's sequence; keep it when that table goes
+        f'ALTER SEQUENCE {sequence} OWNED BY time_entry.id',
+        f'DROP TABLE {UNPARTITIONED_TABLE}',
+        'ANALYZE time_entry',
+    ]
+    return statements
+
+
+def partition_time_entry(connection, apply=False):
+    """
+    Convert time_entry to the partitioned layout (PostgreSQL only). Returns the
+    statements; they are only executed with apply.
+    """
+    if connection.dialect.name != 'postgresql':
+        raise RuntimeError('Partitioning time_entry requires PostgreSQL')
+    if is_partitioned(connection):
+        return []
+    statements = conversion_statements(connection)
+    if apply:
+        for statement in statements:
+            connection.execute(text(statement))
+    return statements
+
+
+def create_org_partition(connection, org_id):
+    """Add an organization's partition if time_entry is partitioned; returns whether it did"""
+    if not is_partitioned(connection):
+        return False
+    connection.execute(text(_partition_ddl(org_id)))
+    return True
@@ -0,0 +1,210 @@
+"""
+PDF export.
+
+The document is built with reportlab platypus. The page layout (column
+positions, row height, rows per page) is worked out once per export and the
+entries are fed in page-sized chunks, each a flowable that draws its columns
+as whole text objects. Project names and descriptions that are wider than
+their column are wrapped onto extra lines, measured with the font metrics;
+the chunks are cut by line count, so platypus never has to measure cells or
+split a table and rendering time grows linearly with the number of rows. The project totals
+come from one aggregate query and are rendered as a regular Table.
+
+reportlab is imported when a PDF is built, not when the app starts.
+"""
+from exports import iter_export_rows, project_totals, hours_cells
+
+PAGE_MARGIN = 54  # points (0.75 inch)
+FONT_NAME = 'Helvetica'
+FONT_SIZE = 8
+ROW_HEIGHT = 13
+CELL_PADDING = 6
+
+
+def date_range_label(start_date, end_date):
+    """Human readable description of an export date range"""
+    if start_date and end_date:
+        return f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
+    if start_date:
+        return f"From {start_date.strftime('%Y-%m-%d')}"
+    if end_date:
+        return f"Until {end_date.strftime('%Y-%m-%d')}"
+    return "All Data"
+
+
+def wrap_text(value, width):
+    """
+    Lines of value that are at most width points wide, broken between words;
+    a word wider than a whole line is broken between characters.
+    """
+    from reportlab.lib.utils import simpleSplit
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    if '\n' not in value and stringWidth(value, FONT_NAME, FONT_SIZE) <= width:
+        return [value]
+    lines = []
+    for line in simpleSplit(value, FONT_NAME, FONT_SIZE, width):
+        while len(line) > 1 and stringWidth(line, FONT_NAME, FONT_SIZE) > width:
+            cut = len(line) - 1
+            while cut > 1 and stringWidth(line[:cut], FONT_NAME, FONT_SIZE) > width:
+                cut -= 1
+            lines.append(line[:cut])
+            line = line[cut:]
+        lines.append(line)
+    return lines or ['']
+
+
+class PdfLayout:
+    """Column positions and text widths shared by every chunk of one export"""
+
+    def __init__(self, frame_width, include_descriptions):
+        widths = [58, 0, 52, 44]  # Date, Project, Hours, HH:MM
+        if include_descriptions:
+            widths[1] = 130
+            widths.append(frame_width - sum(widths))
+        else:
+            widths[1] = frame_width - sum(widths)
+        self.col_widths = widths
+        self.col_offsets = [sum(widths[:index]) for index in range(len(widths))]
+        self.text_widths = [width - CELL_PADDING for width in widths]
+
+        self.headers = ['Date', 'Project', 'Hours', 'HH:MM']
+        if include_descriptions:
+            self.headers.append('Description')
+
+    def lines(self, value, column):
+        """The lines a cell takes in the column"""
+        return wrap_text(value, self.text_widths[column])
+
+
+def _entry_rows_flowable():
+    from reportlab.platypus import Flowable
+
+    class EntryRows(Flowable):
+        """
+        One page worth of entry rows under a header row. Each row is a list
+        of cells, each cell a list of lines. Each column is drawn as a single
+        PDF text object with a fixed leading, cells padded to the line count
+        of their row, which is far cheaper than positioning every cell the
+        way Table does.
+        """
+
+        def __init__(self, layout, rows):
+            Flowable.__init__(self)
+            self.layout = layout
+            self.rows = rows
+            self.line_count = sum(row_lines(row) for row in rows)
+
+        def wrap(self, available_width, available_height):
+            self.width = sum(self.layout.col_widths)
+            self.height = (self.line_count + 1) * ROW_HEIGHT
+            return self.width, self.height
+
+        def draw(self):
+            canvas = self.canv
+            layout = self.layout
+            baseline = self.height - ROW_HEIGHT + 3
+            canvas.setFont(FONT_NAME + '-Bold', FONT_SIZE)
+            for header, offset in zip(layout.headers, layout.col_offsets):
+                canvas.drawString(offset, baseline, header)
+            canvas.setLineWidth(0.5)
+            canvas.line(0, self.height - ROW_HEIGHT, self.width, self.height - ROW_HEIGHT)
+
+            for column, offset in enumerate(layout.col_offsets):
+                text = canvas.beginText(offset, baseline - ROW_HEIGHT)
+                text.setFont(FONT_NAME, FONT_SIZE, ROW_HEIGHT)
+                for row in self.rows:
+                    lines = row[column]
+                    for line in lines:
+                        text.textLine(line)
+                    for _ in range(row_lines(row) - len(lines)):
+                        text.textLine('')
+                canvas.drawText(text)
+
+    return EntryRows
+
+
+def row_lines(row):
+    """Lines taken by a row of wrapped cells"""
+    return max(len(lines) for lines in row)
+
+
+def _draw_page_number(canvas, doc):
+    canvas.saveState()
+    canvas.setFont(FONT_NAME, FONT_SIZE)
+    canvas.drawRightString(doc.pagesize[0] - PAGE_MARGIN, PAGE_MARGIN / 2, f"Page {doc.page}")
+    canvas.restoreState()
+
+
+def write_pdf(query, target, start_date=None, end_date=None, include_descriptions=True, include_totals=True):
+    """
+    Write the PDF export for an entry query (joined to Project) to target,
+    a file path or a binary file object.
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+
+    doc = SimpleDocTemplate(target, pagesize=letter, leftMargin=PAGE_MARGIN, rightMargin=PAGE_MARGIN,
+                            topMargin=PAGE_MARGIN, bottomMargin=PAGE_MARGIN,
+                            title='Time Tracking Export')
+    styles = getSampleStyleSheet()
+    # The default frame has 6 points of padding on every side
+    frame_width = doc.width - 12
+    frame_height = doc.height - 12
+    layout = PdfLayout(frame_width, include_descriptions)
+    EntryRows = _entry_rows_flowable()
+
+    story = [
+        Paragraph('Time Tracking Export', styles['Title']),
+        Paragraph(f"Date Range: {date_range_label(start_date, end_date)}", styles['Normal']),
+        Spacer(1, 12),
+    ]
+    heading_height = sum(
+        flowable.wrap(frame_width, frame_height)[1] + flowable.getSpaceBefore() + flowable.getSpaceAfter()
+        for flowable in story
+    )
+
+    # Lines per page, minus the repeated header row; the first page also holds the title
+    lines_per_page = int(frame_height // ROW_HEIGHT) - 1
+    chunk_lines = int((frame_height - heading_height) // ROW_HEIGHT) - 1
+
+    rows = []
+    line_count = 0
+    for entry_date, project_name, minutes, description, created_at, updated_at in iter_export_rows(query):
+        row = [[entry_date.strftime('%Y-%m-%d')], layout.lines(project_name, 1)]
+        row.extend([cell] for cell in hours_cells(minutes))
+        if include_descriptions:
+            row.append(layout.lines(description or '', 4))
+        height = row_lines(row)
+        if rows and line_count + height > chunk_lines:
+            story.append(EntryRows(layout, rows))
+            rows = []
+            line_count = 0
+            chunk_lines = lines_per_page
+        rows.append(row)
+        line_count += height
+    if rows:
+        story.append(EntryRows(layout, rows))
+
+    if include_totals:
+        totals = project_totals(query)
+        if totals:
+            total_minutes = sum(minutes or 0 for _, minutes in totals)
+            summary = [['Project', 'Hours', 'HH:MM']]
+            summary.extend([name] + hours_cells(minutes) for name, minutes in totals)
+            summary.append(['All Projects'] + hours_cells(total_minutes))
+            story.extend([
+                Spacer(1, 18),
+                Paragraph('Summary', styles['Heading2']),
+                Table(summary, colWidths=[frame_width - 120, 60, 60], style=[
+                    ('FONT', (0, 0), (-1, -1), FONT_NAME, FONT_SIZE + 1),
+                    ('FONT', (0, 0), (-1, 0), FONT_NAME + '-Bold', FONT_SIZE + 1),
+                    ('FONT', (0, -1), (-1, -1), FONT_NAME + '-Bold', FONT_SIZE + 1),
+                    ('LINEBELOW', (0, 0), (-1, 0), 0.5, (0, 0, 0)),
+                    ('LINEABOVE', (0, -1), (-1, -1), 0.5, (0, 0, 0)),
+                    ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+                ], repeatRows=1),
+            ])
+
+    doc.build(story, onFirstPage=_draw_page_number, onLaterPages=_draw_page_number)
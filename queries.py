@@ -0,0 +1,158 @@
+"""
+Shared query builders for time entry list views.
+
+Every view that renders or exports entries needs entry.project; building the
+query here guarantees the project is loaded from the same joined SELECT
+instead of one lazy SELECT per project (or per row) afterwards.
+
+Entries are private to the user who logged them: every view that reads
+entries or rollups narrows its query with scoped(), so the query starts from
+the (org_id, user_id)-leading indexes and its cost follows one person's
+history rather than the size of the whole table. Admins can ask for
+?scope=all to see every user's entries of their own organization; no scope
+ever crosses organizations, and because org_id is always in the WHERE
+clause a time_entry partitioned by organization is pruned to one partition.
+"""
+import base64
+from collections import namedtuple
+from datetime import date, datetime
+
+from sqlalchemy import func, and_, or_
+from sqlalchemy.orm import contains_eager
+
+from models import TimeEntry, Project
+
+# Value of the scope request parameter that lets admins see every user's entries
+ALL_USERS_SCOPE = 'all'
+
+
+def entry_query():
+    """TimeEntry query joined to Project with entry.project populated from the join"""
+    return TimeEntry.query.join(TimeEntry.project).options(contains_eager(TimeEntry.project))
+
+
+# Entries a request covers: one organization, and one user of it unless user_id is None
+EntryScope = namedtuple('EntryScope', ['org_id', 'user_id'])
+
+
+def entry_scope_for(user, requested_scope=None):
+    """
+    Scope of the entry queries of a request: the user's own entries, or their
+    whole organization's when an admin asked for ALL_USERS_SCOPE
+    """
+    if requested_scope == ALL_USERS_SCOPE and user.is_admin:
+        return EntryScope(user.org_id, None)
+    return EntryScope(user.org_id, user.id)
+
+
+def scoped(query, scope, model=TimeEntry):
+    """Limit a TimeEntry (or DailyRollup, via model) query to an EntryScope; None leaves it unscoped"""
+    if scope is None:
+        return query
+    query = query.filter(model.org_id == scope.org_id)
+    if scope.user_id is not None:
+        query = query.filter(model.user_id == scope.user_id)
+    return query
+
+
+def scoped_entry_query(scope):
+    """entry_query() limited to an EntryScope's entries (None: every organization's)"""
+    return scoped(entry_query(), scope)
+
+
+# Entries written before created_at was filled in have NULL there. They sort and
+# page as if created at the epoch, i.e. after every other entry of their day; a
+# plain created_at comparison would never match them and skip them between pages.
+LEGACY_CREATED_AT = datetime(1970, 1, 1)
+created_key = func.coalesce(TimeEntry.created_at, LEGACY_CREATED_AT)
+
+
+def newest_first(query):
+    """Apply the standard list ordering (newest date, then newest created, then id)"""
+    return query.order_by(TimeEntry.date.desc(), created_key.desc(), TimeEntry.id.desc())
+
+
+# Keyset pagination
+#
+# List pages are ordered newest first on (date, created_at, id) and paged by
+# remembering the last row shown instead of an OFFSET, so fetching any page is
+# an index range scan on date whose cost does not depend on how deep the user
+# scrolls.
+
+PAGE_SIZE = 50
+
+
+def position_of(row):
+    """(date, created key, id) of an entry or entry row, as after_position() takes it"""
+    return row.date, row.created_at or LEGACY_CREATED_AT, row.id
+
+
+def encode_cursor(entry):
+    """Opaque cursor pointing just after the given entry"""
+    entry_date, created, entry_id = position_of(entry)
+    raw = f"{entry_date.isoformat()}|{created.isoformat()}|{entry_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (date, created_at, id) for a cursor, or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        date_str, created_str, entry_id = raw.split('|')
+        return date.fromisoformat(date_str), datetime.fromisoformat(created_str), int(entry_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def after_position(query, last_date, last_created, last_id):
+    """Restrict a newest-first entry query to the rows after a position_of() (date, created key, id)"""
+    return query.filter(TimeEntry.date <= last_date, or_(
+        TimeEntry.date < last_date,
+        and_(TimeEntry.date == last_date, created_key < last_created),
+        and_(TimeEntry.date == last_date, created_key == last_created, TimeEntry.id < last_id)
+    ))
+
+
+def keyset_page(query, cursor=None, page_size=PAGE_SIZE):
+    """
+    Return (entries, next_cursor) for one page of an entry query, newest first.
+    next_cursor is None on the last page.
+    """
+    position = decode_cursor(cursor)
+    if position:
+        query = after_position(query, *position)
+    entries = newest_first(query).limit(page_size + 1).all()
+    if len(entries) > page_size:
+        entries = entries[:page_size]
+        return entries, encode_cursor(entries[-1])
+    return entries, None
+
+
+def entry_totals(query):
+    """(total minutes, distinct days) over the full, unpaged filter"""
+    total_minutes, day_count = query.order_by(None).with_entities(
+        func.sum(TimeEntry.minutes),
+        func.count(func.distinct(TimeEntry.date))
+    ).one()
+    return total_minutes or 0, day_count or 0
+
+
+def day_totals(query, dates):
+    """Minutes per day over the full filter, for the days shown on a page"""
+    if not dates:
+        return {}
+    rows = query.order_by(None).with_entities(
+        TimeEntry.date,
+        func.sum(TimeEntry.minutes)
+    ).filter(TimeEntry.date.in_(set(dates))).group_by(TimeEntry.date).all()
+    return {entry_date: minutes or 0 for entry_date, minutes in rows}
+
+
+def group_by_date(entries):
+    """Group an already ordered list of entries into {date: [entries]}"""
+    entries_by_date = {}
+    for entry in entries:
+        entries_by_date.setdefault(entry.date, []).append(entry)
+    return entries_by_date
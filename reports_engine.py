@@ -0,0 +1,218 @@
+"""
+Reports engine.
+
+Builds every series shown on the reports page from a single grouped query at
+the finest grain the charts need (day x project, read from the daily rollup),
+instead of one GROUP BY per chart. The hour-of-day distribution depends on
+TimeEntry.created_at, which the rollup does not carry, so it is the one
+series that still needs its own grouped query.
+
+The trends report buckets the rollup into billing cycles inside the GROUP BY,
+so any number of cycles costs one query.
+
+Every builder takes the EntryScope the report covers (one user, or an admin's
+whole organization) and filters on it first, so the queries use the
+(org_id, user_id, date) and (org_id, date) indexes.
+
+Durations are summed as integer minutes, in SQL and here, so totals are exact;
+they are converted to hours only when the report tuples are built.
+"""
+from collections import namedtuple
+from datetime import date
+
+from sqlalchemy import func, and_, case, cast, extract, Integer
+
+from app import db
+from models import DailyRollup, Project, TimeEntry
+from queries import scoped
+from utils import cycle_id_for_date, cycle_table, get_cycle_start_day, minutes_to_hours
+
+ProjectStat = namedtuple('ProjectStat', ['name', 'total_hours', 'entry_count', 'avg_hours'])
+WeeklyStat = namedtuple('WeeklyStat', ['day_of_week', 'avg_hours', 'total_hours'])
+HourlyStat = namedtuple('HourlyStat', ['hour', 'entries', 'total_hours'])
+DailyTotal = namedtuple('DailyTotal', ['date', 'total_hours'])
+CycleTrend = namedtuple('CycleTrend', ['cycle_id', 'cycle', 'total_hours', 'entry_count', 'goal_hours',
+                                       'attainment', 'year_ago_hours', 'projects'])
+
+# Longest trend the reports page and API will compute
+MAX_TREND_CYCLES = 36
+
+
+class ReportData:
+    """All aggregates rendered by reports.html for one date range"""
+
+    def __init__(self, project_stats, weekly_stats, hourly_stats, daily_totals, project_daily_totals,
+                 total_minutes=0):
+        self.project_stats = project_stats
+        self.weekly_stats = weekly_stats
+        self.hourly_stats = hourly_stats
+        self.daily_totals = daily_totals
+        self.project_daily_totals = project_daily_totals
+        self.total_minutes = total_minutes
+        self.total_hours = minutes_to_hours(total_minutes)
+
+    def __repr__(self):
+        return (f'<ReportData projects={len(self.project_stats)} days={len(self.daily_totals)} '
+                f'total={self.total_hours}h>')
+
+
+def _fetch_daily_project_rows(start_date, end_date, scope=None):
+    """One grouped query: (date, project name, minutes, entry_count) per day and project"""
+    query = db.session.query(
+        DailyRollup.date,
+        Project.name,
+        func.sum(DailyRollup.minutes),
+        func.sum(DailyRollup.entry_count)
+    ).join(Project, DailyRollup.project_id == Project.id).filter(
+        and_(
+            DailyRollup.date >= start_date,
+            DailyRollup.date <= end_date
+        )
+    )
+    return scoped(query, scope, DailyRollup) \
+        .group_by(DailyRollup.date, Project.name).order_by(DailyRollup.date).all()
+
+
+def _fetch_hourly_stats(start_date, end_date, scope=None):
+    """Entry count and hours by hour of creation"""
+    hour = func.extract('hour', TimeEntry.created_at)
+    query = db.session.query(
+        hour,
+        func.count(TimeEntry.id),
+        func.sum(TimeEntry.minutes)
+    ).filter(
+        and_(
+            TimeEntry.date >= start_date,
+            TimeEntry.date <= end_date
+        )
+    )
+    rows = scoped(query, scope).group_by(hour).all()
+    return [HourlyStat(int(h), count, minutes_to_hours(minutes)) for h, count, minutes in rows if h is not None]
+
+
+def build_report(start_date, end_date, scope=None):
+    """Compute every reports-page series for the given date range and EntryScope"""
+    project_totals = {}   # name -> [minutes, entries]
+    weekday_totals = {}   # day of week (0 = Sunday, as SQL 'dow') -> [minutes, entries]
+    daily = {}            # date -> minutes
+    project_daily_totals = []
+
+    for entry_date, project_name, minutes, count in _fetch_daily_project_rows(start_date, end_date, scope):
+        minutes = int(minutes or 0)
+        count = int(count or 0)
+
+        totals = project_totals.setdefault(project_name, [0, 0])
+        totals[0] += minutes
+        totals[1] += count
+
+        dow = entry_date.isoweekday() % 7
+        totals = weekday_totals.setdefault(dow, [0, 0])
+        totals[0] += minutes
+        totals[1] += count
+
+        daily[entry_date] = daily.get(entry_date, 0) + minutes
+
+        project_daily_totals.append({
+            'date': entry_date.strftime('%Y-%m-%d'),
+            'name': project_name,
+            'total_hours': minutes_to_hours(minutes)
+        })
+
+    project_stats = sorted(
+        (ProjectStat(name, minutes_to_hours(minutes), count, minutes_to_hours(minutes) / count if count else 0.0)
+         for name, (minutes, count) in project_totals.items()),
+        key=lambda stat: stat.total_hours,
+        reverse=True
+    )
+    weekly_stats = [
+        WeeklyStat(dow, minutes_to_hours(minutes) / count if count else 0.0, minutes_to_hours(minutes))
+        for dow, (minutes, count) in sorted(weekday_totals.items())
+    ]
+    daily_totals = [DailyTotal(entry_date, minutes_to_hours(minutes)) for entry_date, minutes in daily.items()]
+
+    return ReportData(
+        project_stats=project_stats,
+        weekly_stats=weekly_stats,
+        hourly_stats=_fetch_hourly_stats(start_date, end_date, scope),
+        daily_totals=daily_totals,
+        project_daily_totals=project_daily_totals,
+        total_minutes=sum(minutes for minutes, _ in project_totals.values())
+    )
+
+
+def cycle_id_column(date_column, start_day):
+    """SQL expression with the same cycle id as utils.cycle_id_for_date"""
+    month_index = cast(extract('year', date_column), Integer) * 12 + cast(extract('month', date_column), Integer) - 1
+    return month_index - case((cast(extract('day', date_column), Integer) < start_day, 1), else_=0)
+
+
+def build_trends(num_cycles, monthly_goal, start_day=None, today=None, scope=None):
+    """
+    Totals for the last num_cycles billing cycles (oldest first), each with its
+    goal attainment, per-project hours and the hours of the same cycle a year
+    earlier. Every cycle comes from one grouped query over the daily rollup.
+    """
+    if start_day is None:
+        start_day = get_cycle_start_day(scope.org_id if scope else None)
+    current_id = cycle_id_for_date(today or date.today(), start_day)
+    first_id = current_id - num_cycles + 1
+    # Reach back a further year for the year-over-year comparison
+    cycles = cycle_table(first_id - 12, current_id, start_day)
+
+    cycle_id = cycle_id_column(DailyRollup.date, start_day).label('cycle_id')
+    query = db.session.query(
+        cycle_id,
+        Project.name,
+        func.sum(DailyRollup.minutes),
+        func.sum(DailyRollup.entry_count)
+    ).join(Project, DailyRollup.project_id == Project.id).filter(
+        and_(
+            DailyRollup.date >= cycles[first_id - 12].start_date,
+            DailyRollup.date <= cycles[current_id].end_date
+        )
+    )
+    rows = scoped(query, scope, DailyRollup).group_by(cycle_id, Project.name).all()
+
+    minutes_by_cycle = {}
+    counts_by_cycle = {}
+    projects_by_cycle = {}
+    for row_cycle_id, project_name, minutes, count in rows:
+        row_cycle_id = int(row_cycle_id)
+        minutes = int(minutes or 0)
+        minutes_by_cycle[row_cycle_id] = minutes_by_cycle.get(row_cycle_id, 0) + minutes
+        counts_by_cycle[row_cycle_id] = counts_by_cycle.get(row_cycle_id, 0) + int(count or 0)
+        projects_by_cycle.setdefault(row_cycle_id, {})[project_name] = minutes
+
+    trends = []
+    for trend_cycle_id in range(first_id, current_id + 1):
+        total_hours = minutes_to_hours(minutes_by_cycle.get(trend_cycle_id, 0))
+        projects = sorted(((name, minutes_to_hours(minutes))
+                           for name, minutes in projects_by_cycle.get(trend_cycle_id, {}).items()),
+                          key=lambda item: item[1], reverse=True)
+        trends.append(CycleTrend(
+            cycle_id=trend_cycle_id,
+            cycle=cycles[trend_cycle_id],
+            total_hours=total_hours,
+            entry_count=counts_by_cycle.get(trend_cycle_id, 0),
+            goal_hours=monthly_goal,
+            attainment=(total_hours / monthly_goal * 100) if monthly_goal > 0 else 0.0,
+            year_ago_hours=minutes_to_hours(minutes_by_cycle.get(trend_cycle_id - 12, 0)),
+            projects=projects
+        ))
+    return trends
+
+
+def trend_to_dict(trend):
+    """JSON representation of a CycleTrend"""
+    return {
+        'cycle_id': trend.cycle_id,
+        'name': trend.cycle.name,
+        'start_date': trend.cycle.start_date.strftime('%Y-%m-%d'),
+        'end_date': trend.cycle.end_date.strftime('%Y-%m-%d'),
+        'total_hours': trend.total_hours,
+        'entry_count': trend.entry_count,
+        'goal_hours': trend.goal_hours,
+        'attainment_percentage': trend.attainment,
+        'year_ago_hours': trend.year_ago_hours,
+        'projects': [{'name': name, 'hours': hours} for name, hours in trend.projects]
+    }
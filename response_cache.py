@@ -0,0 +1,130 @@
+"""
+Conditional GET and render cache for read-heavy views.
+
+A cached view's ETag is derived from the data versions it depends on (see
+models.DataVersion), the user, the URL and today's date. Validating it costs
+one indexed lookup of those versions: if the browser already has the page the
+answer is 304 Not Modified, otherwise a copy rendered earlier by this worker
+is served from an in-process LRU cache, and only on a miss does the view run.
+Because the ETag changes whenever a version changes, cached copies never need
+explicit invalidation; stale ones simply fall out of the LRU.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+
+from flask import request, session, g, make_response, Response
+
+from models import (
+    get_data_versions, user_entries_version_key, org_entries_version_key, org_config_version_key
+)
+from queries import entry_scope_for
+
+# Rendered responses kept per worker
+RENDER_CACHE_SIZE = 256
+
+# Dependency scopes a view can declare
+USER_ENTRIES = 'user_entries'  # the current user's entries
+SCOPED_ENTRIES = 'scoped'      # the user's entries, or the organization's for an admin's ?scope=all
+CONFIG = 'config'              # the organization's projects, users and settings
+
+
+class RenderCache:
+    """Thread-safe LRU of rendered responses keyed by ETag"""
+
+    def __init__(self, max_size=RENDER_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+render_cache = RenderCache()
+
+
+def _version_keys(scopes, user):
+    keys = []
+    for scope in scopes:
+        if scope == SCOPED_ENTRIES:
+            user_id = entry_scope_for(user, request.args.get('scope')).user_id
+            keys.append(org_entries_version_key(user.org_id) if user_id is None
+                        else user_entries_version_key(user_id))
+        elif scope == USER_ENTRIES:
+            keys.append(user_entries_version_key(user.id))
+        elif scope == CONFIG:
+            keys.append(org_config_version_key(user.org_id))
+        else:
+            raise ValueError(f'Unknown cache scope: {scope}')
+    return keys
+
+
+def response_etag(scopes, user):
+    """ETag for the current request given the data it depends on"""
+    versions = get_data_versions(_version_keys(scopes, user))
+    parts = [request.endpoint, request.full_path, str(user.id), date.today().isoformat()]
+    parts.extend(f'{key}={version}' for key, version in sorted(versions.items()))
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+
+def _finish(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cached_view(*scopes):
+    """
+    Serve a GET view through the ETag check and render cache. Place it below
+    login_required; scopes name the data the page depends on.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            user = g.get('current_user')
+            # Pages with pending flash messages are one-off renders
+            if request.method != 'GET' or user is None or session.get('_flashes'):
+                return f(*args, **kwargs)
+
+            etag = response_etag(scopes, user)
+            if etag in request.if_none_match:
+                return _finish(Response(status=304), etag)
+
+            cached = render_cache.get(etag)
+            if cached is not None:
+                body, content_type = cached
+                return _finish(Response(body, content_type=content_type), etag)
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed and not session.get('_flashes'):
+                render_cache.put(etag, (response.get_data(), response.content_type))
+                _finish(response, etag)
+            return response
+        return decorated_function
+    return decorator
@@ -1,35 +1,120 @@
-from flask import render_template, request, redirect, url_for, flash, jsonify, Response, make_response, session, abort
-from app import app, db
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response, session, abort, stream_with_context, g, send_file
+from app import db
 import logging
 from functools import wraps
-from app import app, db
-from models import TimeEntry, Project, Settings, get_setting, set_setting, User
+from models import (
+    TimeEntry, Project, Settings, DailyRollup, get_setting, set_setting, User, Organization,
+    record_entry_added, record_entry_removed, ExportJob, create_organization, initialize_default_data
+)
 from utils import (
     get_current_monthly_cycle, 
     get_monthly_cycle_for_date, 
-    hours_to_decimal, 
     decimal_to_hours_minutes,
+    minutes_to_hours,
+    minutes_to_hours_minutes,
     get_previous_cycles,
     format_date_for_input,
-    parse_date_from_input
+    parse_date_from_input,
+    get_cycle_start_day,
+    cycle_boundary_label,
+    MAX_CYCLE_START_DAY
+)
+from response_cache import cached_view, render_cache, USER_ENTRIES, SCOPED_ENTRIES, CONFIG
+from reports_engine import build_report, build_trends, trend_to_dict, MAX_TREND_CYCLES
+from search_index import search_filter, ranked_search
+from partitioning import create_org_partition
+from db_pool import pool_status, retry_on_locked
+from instrumentation import metrics, render_prometheus
+from system_stats import get_system_stats, SYSTEM_STATS_TTL
+from validation import validate_entry_fields
+from queries import (
+    scoped, scoped_entry_query, entry_scope_for, newest_first, keyset_page, entry_totals,
+    day_totals, group_by_date, ALL_USERS_SCOPE
 )
 from datetime import date, datetime, timedelta
-from sqlalchemy import func, and_, or_
-import csv
+from sqlalchemy import func, and_
+import hmac
 import io
+import os
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+bp = Blueprint('main', __name__)
+
 # Helper functions for authentication
+def get_current_user():
+    """Get the current logged-in user, loaded at most once per request"""
+    if 'current_user' not in g:
+        g.current_user = None
+        user_id = session.get('user_id')
+        if user_id is None and 'username' in session:
+            # Sessions created before the user id was stored in the session
+            user = User.query.filter_by(username=session['username']).first()
+            if user:
+                session['user_id'] = user.id
+            g.current_user = user
+        elif user_id is not None:
+            g.current_user = db.session.get(User, user_id)
+        if g.current_user is None:
+            session.pop('user_id', None)
+            session.pop('username', None)
+    return g.current_user
+
+@bp.app_context_processor
+def inject_cycle_boundary():
+    """Billing cycle boundary text (e.g. '25th to 24th') for templates"""
+    return {'cycle_boundary': cycle_boundary_label}
+
+def entry_scope():
+    """EntryScope of this request: the user's entries, or their organization's for an admin's ?scope=all"""
+    return entry_scope_for(get_current_user(), request.values.get('scope'))
+
+def org_projects():
+    """Project query limited to the current user's organization"""
+    return Project.query.filter_by(org_id=get_current_user().org_id)
+
+def get_org_project_or_404(project_id):
+    """Project of the current user's organization, or 404"""
+    return org_projects().filter_by(id=project_id).first_or_404()
+
+def org_users():
+    """User query limited to the current user's organization"""
+    return User.query.filter_by(org_id=get_current_user().org_id)
+
+def get_org_user_or_404(user_id):
+    """User of the current user's organization, or 404"""
+    return org_users().filter_by(id=user_id).first_or_404()
+
+@bp.app_context_processor
+def inject_scope_url():
+    """
+    current_user and scope_url(scope) for templates: the current page with
+    ?scope= set (None: the user's own entries)
+    """
+    def scope_url(scope=None):
+        args = request.args.to_dict()
+        args.pop('scope', None)
+        args.pop('cursor', None)
+        if scope:
+            args['scope'] = scope
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+    return {'scope_url': scope_url, 'current_user': g.get('current_user')}
+
+def get_own_entry_or_404(entry_id):
+    """Entry that the current user may change: their own, or any of their organization's for admins"""
+    entry = db.session.get(TimeEntry, entry_id)
+    user = get_current_user()
+    if entry is None or entry.org_id != user.org_id or (entry.user_id != user.id and not user.is_admin):
+        abort(404)
+    return entry
+
 def login_required(f):
     """Decorator to require login for routes"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'username' not in session:
+        if get_current_user() is None:
             flash('Please login to access this page', 'error')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -37,32 +122,42 @@ def admin_required(f):
     """Decorator to require admin privileges for routes"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'username' not in session:
+        user = get_current_user()
+        if user is None:
             flash('Please login to access this page', 'error')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         
-        user = User.query.filter_by(username=session['username']).first()
-        if not user or not user.is_admin:
+        if not user.is_admin:
             flash('Admin access required', 'error')
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('main.dashboard'))
         return f(*args, **kwargs)
     return decorated_function
 
-def get_current_user():
-    """Get the current logged-in user"""
-    if 'username' not in session:
-        return None
-    return User.query.filter_by(username=session['username']).first()
+def operator_required(f):
+    """Decorator for deployment-wide pages, which show data of every organization"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        user = get_current_user()
+        if user is None:
+            flash('Please login to access this page', 'error')
+            return redirect(url_for('main.login'))
+        
+        if not user.is_operator:
+            flash('Operator access required', 'error')
+            return redirect(url_for('main.dashboard'))
+        return f(*args, **kwargs)
+    return decorated_function
 
 def require_login():
     """Check if user is logged in, redirect to login if not"""
-    if 'username' not in session:
+    if get_current_user() is None:
         flash('Please login to access this page', 'error')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     return None
 
-@app.route('/')
+@bp.route('/')
 @login_required
+@cached_view(USER_ENTRIES, CONFIG)
 def dashboard():
     """Main dashboard showing current cycle statistics with date range filter"""
     start_date_str = request.args.get('start_date')
@@ -75,7 +170,7 @@ def dashboard():
             cycle_name = f"{start_date.strftime('%b %d, %Y')} - {end_date.strftime('%b %d, %Y')}"
         except ValueError:
             flash('Invalid date format. Please use YYYY-MM-DD.', 'error')
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('main.dashboard'))
     else:
         start_date, end_date, cycle_name = get_current_monthly_cycle()
     
@@ -85,15 +180,16 @@ def dashboard():
     # Calculate total billable hours for current cycle
     current_user = get_current_user()
     if not current_user:
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     
-    total_hours = db.session.query(func.sum(TimeEntry.hours)).filter(
+    own_entries = entry_scope_for(current_user)
+    total_minutes = scoped(db.session.query(func.sum(DailyRollup.minutes)).filter(
         and_(
-            TimeEntry.date >= start_date,
-            TimeEntry.date <= end_date,
-            TimeEntry.user_id == current_user.id
+            DailyRollup.date >= start_date,
+            DailyRollup.date <= end_date
         )
-    ).scalar() or 0.0
+    ), own_entries, DailyRollup).scalar() or 0
+    total_hours = minutes_to_hours(total_minutes)
     
     # Calculate remaining hours
     remaining_hours = max(0, monthly_goal - total_hours)
@@ -102,25 +198,23 @@ def dashboard():
     progress_percentage = min(100, (total_hours / monthly_goal) * 100) if monthly_goal > 0 else 0
     
     # Get recent entries (last 10)
-    recent_entries = TimeEntry.query.filter(
+    recent_entries = newest_first(scoped_entry_query(own_entries).filter(
         and_(
             TimeEntry.date >= start_date,
-            TimeEntry.date <= end_date,
-            TimeEntry.user_id == current_user.id
+            TimeEntry.date <= end_date
         )
-    ).order_by(TimeEntry.date.desc(), TimeEntry.created_at.desc()).limit(10).all()
+    )).limit(10).all()
     
     # Get daily totals for current cycle
-    daily_totals = db.session.query(
-        TimeEntry.date,
-        func.sum(TimeEntry.hours).label('total_hours')
+    daily_totals = scoped(db.session.query(
+        DailyRollup.date,
+        func.sum(DailyRollup.minutes).label('total_minutes')
     ).filter(
         and_(
-            TimeEntry.date >= start_date,
-            TimeEntry.date <= end_date,
-            TimeEntry.user_id == current_user.id
+            DailyRollup.date >= start_date,
+            DailyRollup.date <= end_date
         )
-    ).group_by(TimeEntry.date).order_by(TimeEntry.date.desc()).all()
+    ), own_entries, DailyRollup).group_by(DailyRollup.date).order_by(DailyRollup.date.desc()).all()
     
     # Calculate working days in cycle and working days completed
     total_days = (end_date - start_date).days + 1
@@ -137,6 +231,7 @@ def dashboard():
                          start_date=start_date,
                          end_date=end_date,
                          total_hours=total_hours,
+                         total_minutes=total_minutes,
                          monthly_goal=monthly_goal,
                          remaining_hours=remaining_hours,
                          progress_percentage=progress_percentage,
@@ -145,12 +240,13 @@ def dashboard():
                          days_completed=days_completed,
                          total_days=total_days,
                          decimal_to_hours_minutes=decimal_to_hours_minutes,
+                         minutes_to_hours_minutes=minutes_to_hours_minutes,
                          available_cycles=available_cycles,
                          current_month=current_month)
 
 
-@app.route('/entries')
-@app.route('/entries/<cycle_date>')
+@bp.route('/entries')
+@bp.route('/entries/<cycle_date>')
 @login_required
 def entries(cycle_date=None):
     """View all entries with filters for cycle, week, and project"""
@@ -169,7 +265,7 @@ def entries(cycle_date=None):
                 cycle_name = f"Week {week_num}, {year}"
             except ValueError:
                 flash('Invalid week format. Use YYYY-WNN (e.g. 2023-W05)', 'error')
-                return redirect(url_for('entries'))
+                return redirect(url_for('main.entries'))
         elif cycle_date_param:
             try:
                 target_date = datetime.strptime(cycle_date_param, '%Y-%m-%d').date()
@@ -185,7 +281,7 @@ def entries(cycle_date=None):
             except (ValueError, TypeError) as e:
                 logger.error(f"Date processing error: {e}")
                 flash('Invalid date format or cycle data', 'error')
-                return redirect(url_for('entries'))
+                return redirect(url_for('main.entries'))
         else:
             cycle_data = get_current_monthly_cycle()
             # Handle both tuple and object returns
@@ -199,64 +295,87 @@ def entries(cycle_date=None):
         # Build query
         current_user = get_current_user()
         if not current_user:
-            return redirect(url_for('login'))
-            
-        query = TimeEntry.query.filter(
-            and_(
-                TimeEntry.date.between(start_date, end_date),
-                TimeEntry.user_id == current_user.id
-            )
-        ).order_by(TimeEntry.date.desc(), TimeEntry.created_at.desc())
+            return redirect(url_for('main.login'))
         
-        # Apply project filter if specified
-        if project_id_param and project_id_param.isdigit():
-            query = query.filter(TimeEntry.project_id == int(project_id_param))
+        query = _entries_filter_query(current_user, start_date, end_date, project_id_param)
         
-        # Execute query
-        entries = query.all()
+        # First page only; the rest is fetched by entries_page()
+        entries, next_cursor = keyset_page(query)
+        entries_by_date = group_by_date(entries)
         
-        # Group entries by date
-        entries_by_date = {}
-        for entry in entries:
-            if entry.date not in entries_by_date:
-                entries_by_date[entry.date] = []
-            entries_by_date[entry.date].append(entry)
+        # Totals cover the whole filter, not just the page shown
+        total_minutes, day_count = entry_totals(query)
         
-        # Calculate total hours
-        total_hours = sum(entry.hours for entry in entries)
+        next_page_url = None
+        if next_cursor:
+            next_page_url = url_for('main.entries_page',
+                                    start_date=format_date_for_input(start_date),
+                                    end_date=format_date_for_input(end_date),
+                                    project_id=project_id_param or None,
+                                    cursor=next_cursor)
         
-        # Get available cycles - convert Cycle objects to tuples if needed
-        available_cycles = []
-        for cycle in get_previous_cycles(12):
-            if hasattr(cycle, 'start_date'):  # It's a Cycle object
-                available_cycles.append((
-                    cycle.start_date,
-                    cycle.end_date,
-                    cycle.name
-                ))
-            else:  # It's already a tuple
-                available_cycles.append(cycle)
+        # Cycle tuples unpack as (start_date, end_date, name) in the template
+        available_cycles = get_previous_cycles(12)
         
-        projects = Project.query.filter_by(active=True).order_by(Project.name).all()
+        projects = org_projects().filter_by(active=True).order_by(Project.name).all()
         
         return render_template('entries.html',
                             entries_by_date=entries_by_date,
+                            day_totals=day_totals(query, entries_by_date.keys()),
+                            day_count=day_count,
+                            next_page_url=next_page_url,
                             cycle_name=cycle_name,
                             start_date=start_date,
                             end_date=end_date,
-                            total_hours=total_hours,
+                            total_minutes=total_minutes,
                             available_cycles=available_cycles,
                             current_cycle_date=start_date,
-                            decimal_to_hours_minutes=decimal_to_hours_minutes,
+                            minutes_to_hours_minutes=minutes_to_hours_minutes,
                             projects=projects)
         
     except Exception as e:
         logger.error(f"Error in entries route: {str(e)}", exc_info=True)
         flash(f'An error occurred while loading entries: {str(e)}', 'error')
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
+
 
+def _entries_filter_query(user, start_date, end_date, project_id_param=None):
+    """Entry query for the entries view filters (date range and optional project)"""
+    query = scoped_entry_query(entry_scope_for(user)).filter(TimeEntry.date.between(start_date, end_date))
+    if project_id_param and project_id_param.isdigit():
+        query = query.filter(TimeEntry.project_id == int(project_id_param))
+    return query
 
-@app.route('/add_entry', methods=['GET', 'POST'])
+@bp.route('/entries/page')
+@login_required
+def entries_page():
+    """Next page of the entries view as rendered HTML for the "Load more" button"""
+    start_date = parse_date_from_input(request.args.get('start_date'))
+    end_date = parse_date_from_input(request.args.get('end_date'))
+    if not start_date or not end_date:
+        return jsonify({'error': 'start_date and end_date are required'}), 400
+    project_id_param = request.args.get('project_id')
+    
+    query = _entries_filter_query(get_current_user(), start_date, end_date, project_id_param)
+    entries, next_cursor = keyset_page(query, request.args.get('cursor'))
+    entries_by_date = group_by_date(entries)
+    
+    next_page_url = None
+    if next_cursor:
+        next_page_url = url_for('main.entries_page',
+                                start_date=format_date_for_input(start_date),
+                                end_date=format_date_for_input(end_date),
+                                project_id=project_id_param or None,
+                                cursor=next_cursor)
+    
+    html = render_template('partials/entry_days.html',
+                           entries_by_date=entries_by_date,
+                           day_totals=day_totals(query, entries_by_date.keys()),
+                           minutes_to_hours_minutes=minutes_to_hours_minutes)
+    return jsonify({'html': html, 'next_url': next_page_url})
+
+
+@bp.route('/add_entry', methods=['GET', 'POST'])
 @login_required
 def add_entry():
     """Add a new time entry"""
@@ -270,52 +389,41 @@ def add_entry():
         stay_on_page = request.form.get('stay_on_page') == 'true'
         
         # Validate data
-        errors = []
-        
-        # Validate date
-        entry_date = parse_date_from_input(date_str)
-        if not entry_date:
-            errors.append('Please provide a valid date')
-        
-        # Validate project
-        if not project_id:
-            errors.append('Please select a project')
-        else:
-            project = Project.query.get(project_id)
-            if not project:
-                errors.append('Invalid project selected')
-        
-        # Validate hours
-        hours = hours_to_decimal(hours_str)
-        if hours <= 0:
-            errors.append('Please provide valid hours (greater than 0)')
-        if hours > 24:
-            errors.append('Hours cannot exceed 24 per day')
+        values, errors = validate_entry_fields(date_str, project_id, hours_str, description)
+        entry_date = values['date']
+        minutes = values['minutes']
+        description = values['description']
         
         if errors:
             for error in errors:
                 flash(error, 'error')
         else:
             # Create new time entry
-            try:
+            def save_entry():
                 new_entry = TimeEntry()
                 new_entry.date = entry_date
                 new_entry.project_id = int(project_id) if project_id else None
-                new_entry.hours = hours
+                new_entry.user_id = get_current_user().id
+                new_entry.org_id = get_current_user().org_id
+                new_entry.minutes = minutes
                 new_entry.description = description
                 db.session.add(new_entry)
+                record_entry_added(new_entry)
                 db.session.commit()
+            
+            try:
+                retry_on_locked(db.session, save_entry)
                 flash('Time entry added successfully!', 'success')
                 if stay_on_page:
-                    return redirect(url_for('add_entry', stay='true'))
+                    return redirect(url_for('main.add_entry', stay='true'))
                 else:
-                    return redirect(url_for('entries'))
+                    return redirect(url_for('main.entries'))
             except Exception as e:
                 db.session.rollback()
                 flash(f'Error adding entry: {str(e)}', 'error')
     
     # Get active projects for the form
-    projects = Project.query.filter_by(active=True).order_by(Project.name).all()
+    projects = org_projects().filter_by(active=True).order_by(Project.name).all()
     
     # Default to today's date
     default_date = format_date_for_input(date.today())
@@ -324,11 +432,11 @@ def add_entry():
                          projects=projects, 
                          default_date=default_date)
 
-@app.route('/edit_entry/<int:entry_id>', methods=['GET', 'POST'])
+@bp.route('/edit_entry/<int:entry_id>', methods=['GET', 'POST'])
 @login_required
 def edit_entry(entry_id):
     """Edit an existing time entry"""
-    entry = TimeEntry.query.get_or_404(entry_id)
+    entry = get_own_entry_or_404(entry_id)
     
     if request.method == 'POST':
         # Get form data
@@ -338,62 +446,50 @@ def edit_entry(entry_id):
         description = request.form.get('description', '').strip()
         
         # Validate data
-        errors = []
-        
-        # Validate date
-        entry_date = parse_date_from_input(date_str)
-        if not entry_date:
-            errors.append('Please provide a valid date')
-        
-        # Validate project
-        if not project_id:
-            errors.append('Please select a project')
-        else:
-            project = Project.query.get(project_id)
-            if not project:
-                errors.append('Invalid project selected')
-        
-        # Validate hours
-        hours = hours_to_decimal(hours_str)
-        if hours <= 0:
-            errors.append('Please provide valid hours (greater than 0)')
-        if hours > 24:
-            errors.append('Hours cannot exceed 24 per day')
+        values, errors = validate_entry_fields(date_str, project_id, hours_str, description)
+        entry_date = values['date']
+        minutes = values['minutes']
+        description = values['description']
         
         if errors:
             for error in errors:
                 flash(error, 'error')
         else:
             # Update the entry
-            try:
+            def save_entry():
+                record_entry_removed(entry)
                 entry.date = entry_date
                 entry.project_id = int(project_id) if project_id else None
-                entry.hours = hours
+                entry.minutes = minutes
                 entry.description = description
                 entry.updated_at = datetime.utcnow()
+                record_entry_added(entry)
                 db.session.commit()
+            
+            try:
+                retry_on_locked(db.session, save_entry)
                 flash('Time entry updated successfully!', 'success')
-                return redirect(url_for('entries'))
+                return redirect(url_for('main.entries'))
             except Exception as e:
                 db.session.rollback()
                 flash(f'Error updating entry: {str(e)}', 'error')
     
     # Get active projects for the form
-    projects = Project.query.filter_by(active=True).order_by(Project.name).all()
+    projects = org_projects().filter_by(active=True).order_by(Project.name).all()
     
     return render_template('edit_entry.html', 
                          entry=entry, 
                          projects=projects,
-                         format_date_for_input=format_date_for_input,
-                         decimal_to_hours_minutes=decimal_to_hours_minutes)
+                         format_date_for_input=format_date_for_input)
 
-@app.route('/delete_entry/<int:entry_id>', methods=['POST'])
+@bp.route('/delete_entry/<int:entry_id>', methods=['POST'])
 @login_required
 def delete_entry(entry_id):
     """Delete a time entry"""
-    entry = TimeEntry.query.get_or_404(entry_id)
+    entry = get_own_entry_or_404(entry_id)
     
     try:
+        record_entry_removed(entry)
         db.session.delete(entry)
         db.session.commit()
         flash('Time entry deleted successfully!', 'success')
@@ -401,44 +497,52 @@ def delete_entry(entry_id):
         db.session.rollback()
         flash(f'Error deleting entry: {str(e)}', 'error')
     
-    return redirect(url_for('entries'))
+    return redirect(url_for('main.entries'))
 
-@app.route('/settings', methods=['GET', 'POST'])
+@bp.route('/settings', methods=['GET', 'POST'])
 @login_required
 def settings():
     """Application settings page"""
     if request.method == 'POST':
         # Update settings
         monthly_goal = request.form.get('monthly_goal_hours')
+        cycle_start = request.form.get('cycle_start_day')
         
         try:
-            # Validate monthly goal
+            # Validate monthly goal and cycle start day
             goal_hours = float(monthly_goal) if monthly_goal else 0.0
+            start_day = int(cycle_start) if cycle_start else get_cycle_start_day()
             if goal_hours <= 0:
                 flash('Monthly goal must be greater than 0', 'error')
+            elif not 1 <= start_day <= MAX_CYCLE_START_DAY:
+                flash(f'Cycle start day must be between 1 and {MAX_CYCLE_START_DAY}', 'error')
             else:
                 set_setting('monthly_goal_hours', str(goal_hours))
+                if start_day != get_cycle_start_day():
+                    set_setting('cycle_start_day', str(start_day))
                 flash('Settings updated successfully!', 'success')
         except ValueError:
-            flash('Please provide a valid number for monthly goal', 'error')
+            flash('Please provide valid numbers for the monthly goal and cycle start day', 'error')
         
-        return redirect(url_for('settings'))
+        return redirect(url_for('main.settings'))
     
     # Get current settings
     current_goal = get_setting('monthly_goal_hours', '160')
     
     # Get projects for management
-    projects = Project.query.order_by(Project.name).all()
+    projects = org_projects().order_by(Project.name).all()
     
     return render_template('settings.html', 
                          monthly_goal=current_goal,
+                         cycle_start_day=get_cycle_start_day(),
+                         max_cycle_start_day=MAX_CYCLE_START_DAY,
                          projects=projects)
 
-@app.route('/toggle_project/<int:project_id>', methods=['POST'])
+@bp.route('/toggle_project/<int:project_id>', methods=['POST'])
 @login_required
 def toggle_project(project_id):
     """Toggle project active status"""
-    project = Project.query.get_or_404(project_id)
+    project = get_org_project_or_404(project_id)
     
     try:
         project.active = not project.active
@@ -449,9 +553,9 @@ def toggle_project(project_id):
         db.session.rollback()
         flash(f'Error updating project: {str(e)}', 'error')
     
-    return redirect(url_for('settings'))
+    return redirect(url_for('main.settings'))
 
-@app.route('/add_project', methods=['POST'])
+@bp.route('/add_project', methods=['POST'])
 @login_required
 def add_project():
     """Add a new project"""
@@ -460,16 +564,17 @@ def add_project():
     
     if not name:
         flash('Project name is required', 'error')
-        return redirect(url_for('settings'))
+        return redirect(url_for('main.settings'))
     
     # Check if project already exists
-    existing_project = Project.query.filter_by(name=name).first()
+    existing_project = org_projects().filter_by(name=name).first()
     if existing_project:
         flash('A project with this name already exists', 'error')
-        return redirect(url_for('settings'))
+        return redirect(url_for('main.settings'))
     
     try:
         new_project = Project()
+        new_project.org_id = get_current_user().org_id
         new_project.name = name
         new_project.description = description
         db.session.add(new_project)
@@ -479,13 +584,13 @@ def add_project():
         db.session.rollback()
         flash(f'Error adding project: {str(e)}', 'error')
     
-    return redirect(url_for('settings'))
+    return redirect(url_for('main.settings'))
 
-@app.route('/delete_project/<int:project_id>', methods=['POST'])
+@bp.route('/delete_project/<int:project_id>', methods=['POST'])
 @login_required
 def delete_project(project_id):
     """Delete a project and its associated time entries"""
-    project = Project.query.get_or_404(project_id)
+    project = get_org_project_or_404(project_id)
 
     try:
         # The 'delete-orphan' cascade will handle deleting associated time entries
@@ -496,25 +601,26 @@ def delete_project(project_id):
         db.session.rollback()
         flash(f'Error deleting project: {str(e)}', 'error')
 
-    return redirect(url_for('settings'))
+    return redirect(url_for('main.settings'))
 
-@app.route('/edit_project/<int:project_id>', methods=['POST'])
+@bp.route('/edit_project/<int:project_id>', methods=['POST'])
+@login_required
 def edit_project(project_id):
     """Edit an existing project"""
-    project = Project.query.get_or_404(project_id)
+    project = get_org_project_or_404(project_id)
 
     name = request.form.get('name', '').strip()
     description = request.form.get('description', '').strip()
 
     if not name:
         flash('Project name is required', 'error')
-        return redirect(url_for('settings'))
+        return redirect(url_for('main.settings'))
 
     # Check if another project with the same name already exists
-    existing_project = Project.query.filter(Project.name == name, Project.id != project_id).first()
+    existing_project = org_projects().filter(Project.name == name, Project.id != project_id).first()
     if existing_project:
         flash('A project with this name already exists', 'error')
-        return redirect(url_for('settings'))
+        return redirect(url_for('main.settings'))
 
     try:
         project.name = name
@@ -526,31 +632,63 @@ def edit_project(project_id):
         db.session.rollback()
         flash(f'Error updating project: {str(e)}', 'error')
 
-    return redirect(url_for('settings'))
+    return redirect(url_for('main.settings'))
 
-@app.route('/export')
+@bp.route('/export')
 @login_required
 def export_page():
     """Export data page"""
     # Get all projects for filter
-    projects = Project.query.order_by(Project.name).all()
+    projects = org_projects().order_by(Project.name).all()
     
     # Get current cycle dates as defaults
     start_date, end_date, cycle_name = get_current_monthly_cycle()
     
+    # The user's recent background exports
+    export_jobs = ExportJob.query.filter_by(user_id=get_current_user().id) \
+        .order_by(ExportJob.created_at.desc()).limit(10).all()
+    
     return render_template('export.html', 
                          projects=projects,
+                         export_jobs=export_jobs,
+                         cycle_start_day=get_cycle_start_day(),
                          start_date=format_date_for_input(start_date),
                          end_date=format_date_for_input(end_date))
 
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
+def _get_owned_export_job(job_id):
+    """Export job by id, or 404 unless it belongs to the current user"""
+    job = db.session.get(ExportJob, job_id)
+    if job is None or job.user_id != get_current_user().id:
+        abort(404)
+    return job
 
-@app.route('/export_data', methods=['GET', 'POST'])
+@bp.route('/export/jobs/<int:job_id>')
+@login_required
+def export_job_status(job_id):
+    """Status of a background export, polled by the export page"""
+    from jobs import job_to_dict
+    return jsonify(job_to_dict(_get_owned_export_job(job_id)))
+
+@bp.route('/export/jobs/<int:job_id>/download')
+@login_required
+def download_export_job(job_id):
+    """Download the file produced by a finished export job"""
+    from jobs import download_name
+    job = _get_owned_export_job(job_id)
+    if job.status != 'done' or not job.file_path or not os.path.exists(job.file_path):
+        flash('That export is not available for download.', 'error')
+        return redirect(url_for('main.export_page'))
+    mimetype = 'application/pdf' if job.format == 'pdf' else 'text/csv'
+    return send_file(job.file_path, mimetype=mimetype, as_attachment=True, download_name=download_name(job))
+
+@bp.route('/export_data', methods=['GET', 'POST'])
 @login_required
 def export_data():
     """Export time tracking data to CSV or PDF"""
+    # Export code (and the job pool) is only loaded once someone exports
+    from exports import iter_csv, export_query
+    from jobs import submit_export_job, job_to_dict
+    scope = entry_scope()
     
     # Handle quick export via GET
     if request.method == 'GET':
@@ -570,7 +708,7 @@ def export_data():
             include_totals = True
             export_format = 'csv'
         else:
-            return redirect(url_for('export_page'))
+            return redirect(url_for('main.export_page'))
     else:
         # Handle form submission via POST
         start_date_str = request.form.get('start_date')
@@ -583,178 +721,25 @@ def export_data():
         start_date = parse_date_from_input(start_date_str) if start_date_str else None
         end_date = parse_date_from_input(end_date_str) if end_date_str else None
     
-    # Build query
-    query = TimeEntry.query.join(Project)
-    
-    # Apply date filters
-    if start_date:
-        query = query.filter(TimeEntry.date >= start_date)
-    if end_date:
-        query = query.filter(TimeEntry.date <= end_date)
-    
-    # Apply project filters
-    if project_ids:
-        query = query.filter(TimeEntry.project_id.in_(project_ids))
-    
-    # Get entries ordered by date
-    entries = query.order_by(TimeEntry.date.desc(), TimeEntry.created_at.desc()).all()
-    
-    if export_format == 'pdf':
-        # Generate PDF
-        buffer = io.BytesIO()
-        p = canvas.Canvas(buffer, pagesize=letter)
-        width, height = letter
-        
-        # Title
-        p.setFont("Helvetica-Bold", 16)
-        p.drawString(inch, height - inch, "Time Tracking Export")
-        
-        # Date range info
-        date_range_str = "All Data"
-        if start_date and end_date:
-            date_range_str = f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
-        elif start_date:
-            date_range_str = f"From {start_date.strftime('%Y-%m-%d')}"
-        elif end_date:
-            date_range_str = f"Until {end_date.strftime('%Y-%m-%d')}"
-        p.setFont("Helvetica", 12)
-        p.drawString(inch, height - inch - 20, f"Date Range: {date_range_str}")
-        
-        # Table headers
-        y = height - inch - 50
-        p.setFont("Helvetica-Bold", 10)
-        headers = ['Date', 'Project', 'Hours (Decimal)', 'Hours (HH:MM)']
-        if include_descriptions:
-            headers.append('Description')
-        for i, header in enumerate(headers):
-            p.drawString(inch + i*100, y, header)
-        
-        # Table rows
-        p.setFont("Helvetica", 10)
-        y -= 15
-        for entry in entries:
-            if y < inch:
-                p.showPage()
-                y = height - inch
-            row = [
-                entry.date.strftime('%Y-%m-%d'),
-                entry.project.name,
-                f"{entry.hours:.2f}",
-                entry.hours_minutes_display
-            ]
-            if include_descriptions:
-                row.append(entry.description or '')
-            for i, cell in enumerate(row):
-                p.drawString(inch + i*100, y, str(cell))
-            y -= 15
-        
-        # Totals if requested
-        if include_totals and entries:
-            if y < inch + 40:
-                p.showPage()
-                y = height - inch
-            y -= 10
-            p.setFont("Helvetica-Bold", 12)
-            p.drawString(inch, y, "SUMMARY")
-            y -= 15
-            
-            project_totals = {}
-            total_hours = 0
-            for entry in entries:
-                project_name = entry.project.name
-                if project_name not in project_totals:
-                    project_totals[project_name] = 0
-                project_totals[project_name] += entry.hours
-                total_hours += entry.hours
-            
-            p.setFont("Helvetica", 10)
-            for project_name, hours in project_totals.items():
-                if y < inch:
-                    p.showPage()
-                    y = height - inch
-                p.drawString(inch, y, f"TOTAL - {project_name}: {hours:.2f} ({decimal_to_hours_minutes(hours)})")
-                y -= 15
-            
-            if y < inch:
-                p.showPage()
-                y = height - inch
-            p.drawString(inch, y, f"GRAND TOTAL - All Projects: {total_hours:.2f} ({decimal_to_hours_minutes(total_hours)})")
-            y -= 15
-        
-        p.save()
-        buffer.seek(0)
-        
-        response = make_response(buffer.read())
-        response.headers['Content-Type'] = 'application/pdf'
-        filename = f"time_tracking_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+    query = export_query(start_date, end_date, project_ids, scope)
+    
+    # PDFs, and CSVs the user asked to have prepared, are generated in the background
+    if export_format == 'pdf' or (request.method == 'POST' and 'background' in request.form):
+        job = submit_export_job(get_current_user().id, 'pdf' if export_format == 'pdf' else 'csv',
+                                start_date, end_date, project_ids,
+                                include_descriptions, include_totals, scope=scope)
+        if job is None:
+            message = 'You already have exports in progress. Please wait for them to finish.'
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify({'error': message}), 429
+            flash(message, 'error')
+            return redirect(url_for('main.export_page'))
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(job_to_dict(job)), 202
+        flash('Your export is being prepared. It will appear under Recent Exports when ready.', 'success')
+        return redirect(url_for('main.export_page'))
     
     else:
-        # Create CSV content
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write headers
-        headers = ['Date', 'Project', 'Hours (Decimal)', 'Hours (HH:MM)']
-        if include_descriptions:
-            headers.append('Description')
-        headers.extend(['Created At', 'Updated At'])
-        writer.writerow(headers)
-        
-        # Write data rows
-        for entry in entries:
-            row = [
-                entry.date.strftime('%Y-%m-%d'),
-                entry.project.name,
-                f"{entry.hours:.2f}",
-                entry.hours_minutes_display
-            ]
-            if include_descriptions:
-                row.append(entry.description or '')
-            row.extend([
-                entry.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                entry.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-            ])
-            writer.writerow(row)
-        
-        # Add totals if requested
-        if include_totals and entries:
-            writer.writerow([])  # Empty row
-            writer.writerow(['SUMMARY'])
-            
-            # Calculate project totals
-            project_totals = {}
-            total_hours = 0
-            
-            for entry in entries:
-                project_name = entry.project.name
-                if project_name not in project_totals:
-                    project_totals[project_name] = 0
-                project_totals[project_name] += entry.hours
-                total_hours += entry.hours
-            
-            # Write project totals
-            for project_name, hours in project_totals.items():
-                writer.writerow([
-                    'TOTAL',
-                    project_name,
-                    f"{hours:.2f}",
-                    decimal_to_hours_minutes(hours)
-                ])
-            
-            # Write grand total
-            writer.writerow([
-                'GRAND TOTAL',
-                'All Projects',
-                f"{total_hours:.2f}",
-                decimal_to_hours_minutes(total_hours)
-            ])
-        
-        # Create response
-        csv_content = output.getvalue()
-        output.close()
-        
         # Generate filename
         date_range = ""
         if start_date and end_date:
@@ -766,32 +751,22 @@ def export_data():
         
         filename = f"time_tracking_export{date_range}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         
-        response = make_response(csv_content)
-        response.headers['Content-Type'] = 'text/csv'
+        # Stream the CSV so large exports are never held in memory
+        response = Response(
+            stream_with_context(iter_csv(query, include_descriptions, include_totals)),
+            mimetype='text/csv'
+        )
         response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
         
         return response
 
-@app.route('/search')
-@login_required
-def search_entries():
-    """Search and filter time entries"""
-    query_text = request.args.get('q', '').strip()
-    project_filter = request.args.get('project', '')
-    date_from = request.args.get('date_from', '')
-    date_to = request.args.get('date_to', '')
-    
-    # Start with base query
-    query = TimeEntry.query.join(Project)
+def _search_filter_query(scope, query_text, project_filter, date_from, date_to):
+    """Entry query for the search view filters, limited to an EntryScope's entries"""
+    query = scoped_entry_query(scope)
     
-    # Apply text search
+    # Apply text search (full-text index on descriptions, substring on project names)
     if query_text:
-        query = query.filter(
-            or_(
-                TimeEntry.description.ilike(f'%{query_text}%'),
-                Project.name.ilike(f'%{query_text}%')
-            )
-        )
+        query = query.filter(search_filter(query_text, scope.org_id))
     
     # Apply project filter
     if project_filter:
@@ -808,35 +783,112 @@ def search_entries():
         if end_date:
             query = query.filter(TimeEntry.date <= end_date)
     
-    # Get results
-    entries = query.order_by(TimeEntry.date.desc(), TimeEntry.created_at.desc()).limit(100).all()
+    return query
+
+@bp.route('/import', methods=['GET', 'POST'])
+@login_required
+def import_page():
+    """Import time entries from a CSV file in the export layout"""
+    from imports import import_csv, ImportFormatError
+    result = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Please choose a CSV file to import', 'error')
+            return redirect(url_for('main.import_page'))
+        
+        create_projects = 'create_projects' in request.form
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        try:
+            result = import_csv(stream, get_current_user(), create_projects=create_projects)
+        except (ImportFormatError, UnicodeDecodeError) as e:
+            db.session.rollback()
+            flash(f'Could not read the file: {str(e)}', 'error')
+            return redirect(url_for('main.import_page'))
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error importing CSV: {str(e)}", exc_info=True)
+            flash(f'Error importing entries: {str(e)}', 'error')
+            return redirect(url_for('main.import_page'))
+        
+        flash(f'Imported {result.imported} entries.', 'success' if not result.error_count else 'warning')
+        if result.error_count:
+            flash(f'{result.error_count} rows could not be imported.', 'error')
+    
+    return render_template('import.html', result=result)
+
+@bp.route('/search')
+@login_required
+def search_entries():
+    """Search and filter time entries"""
+    query_text = request.args.get('q', '').strip()
+    project_filter = request.args.get('project', '')
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
     
-    # Calculate total hours for results
-    total_hours = sum(entry.hours for entry in entries)
+    scope = entry_scope()
+    query = _search_filter_query(scope, query_text, project_filter, date_from, date_to)
     
-    # Get all projects for filter dropdown
-    projects = Project.query.filter_by(active=True).order_by(Project.name).all()
+    # First page only; the rest is fetched by search_page()
+    entries, next_cursor = keyset_page(query)
+    entries_by_date = group_by_date(entries)
+    
+    # Totals cover every match, not just the page shown
+    total_minutes, day_count = entry_totals(query)
     
-    # Group entries by date
-    entries_by_date = {}
-    for entry in entries:
-        date_key = entry.date
-        if date_key not in entries_by_date:
-            entries_by_date[date_key] = []
-        entries_by_date[date_key].append(entry)
+    next_page_url = None
+    if next_cursor:
+        next_page_url = url_for('main.search_page', q=query_text or None, project=project_filter or None,
+                                date_from=date_from or None, date_to=date_to or None,
+                                scope=ALL_USERS_SCOPE if scope.user_id is None else None, cursor=next_cursor)
+    
+    # Get all projects for filter dropdown
+    projects = org_projects().filter_by(active=True).order_by(Project.name).all()
     
     return render_template('search.html',
                          entries_by_date=entries_by_date,
-                         total_hours=total_hours,
+                         day_totals=day_totals(query, entries_by_date.keys()),
+                         day_count=day_count,
+                         next_page_url=next_page_url,
+                         total_minutes=total_minutes,
                          projects=projects,
                          query_text=query_text,
                          project_filter=project_filter,
                          date_from=date_from,
                          date_to=date_to,
-                         decimal_to_hours_minutes=decimal_to_hours_minutes)
+                         all_users=scope.user_id is None,
+                         minutes_to_hours_minutes=minutes_to_hours_minutes)
 
-@app.route('/reports')
+@bp.route('/search/page')
 @login_required
+def search_page():
+    """Next page of search results as rendered HTML for the "Load more" button"""
+    query_text = request.args.get('q', '').strip()
+    project_filter = request.args.get('project', '')
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+    
+    scope = entry_scope()
+    query = _search_filter_query(scope, query_text, project_filter, date_from, date_to)
+    entries, next_cursor = keyset_page(query, request.args.get('cursor'))
+    entries_by_date = group_by_date(entries)
+    
+    next_page_url = None
+    if next_cursor:
+        next_page_url = url_for('main.search_page', q=query_text or None, project=project_filter or None,
+                                date_from=date_from or None, date_to=date_to or None,
+                                scope=ALL_USERS_SCOPE if scope.user_id is None else None, cursor=next_cursor)
+    
+    html = render_template('partials/search_days.html',
+                           entries_by_date=entries_by_date,
+                           day_totals=day_totals(query, entries_by_date.keys()),
+                           query_text=query_text,
+                           minutes_to_hours_minutes=minutes_to_hours_minutes)
+    return jsonify({'html': html, 'next_url': next_page_url})
+
+@bp.route('/reports')
+@login_required
+@cached_view(SCOPED_ENTRIES, CONFIG)
 def reports():
     """Advanced reports and analytics"""
     start_date_str = request.args.get('start_date')
@@ -849,111 +901,74 @@ def reports():
             cycle_name = f"{start_date.strftime('%b %d, %Y')} - {end_date.strftime('%b %d, %Y')}"
         except ValueError:
             flash('Invalid date format. Please use YYYY-MM-DD.', 'error')
-            return redirect(url_for('reports'))
+            return redirect(url_for('main.reports'))
     else:
         start_date, end_date, cycle_name = get_current_monthly_cycle()
     
-    # Get project statistics
-    project_stats = db.session.query(
-        Project.name,
-        func.sum(TimeEntry.hours).label('total_hours'),
-        func.count(TimeEntry.id).label('entry_count'),
-        func.avg(TimeEntry.hours).label('avg_hours')
-    ).join(TimeEntry).filter(
-        and_(
-            TimeEntry.date >= start_date,
-            TimeEntry.date <= end_date
-        )
-    ).group_by(Project.name).order_by(func.sum(TimeEntry.hours).desc()).all()
-    
-    # Get hourly distribution
-    hourly_stats = db.session.query(
-        func.extract('hour', TimeEntry.created_at).label('hour'),
-        func.count(TimeEntry.id).label('entries'),
-        func.sum(TimeEntry.hours).label('total_hours')
-    ).filter(
-        and_(
-            TimeEntry.date >= start_date,
-            TimeEntry.date <= end_date
-        )
-    ).group_by(func.extract('hour', TimeEntry.created_at)).all()
-    
-    # Get weekly patterns
-    weekly_stats = db.session.query(
-        func.extract('dow', TimeEntry.date).label('day_of_week'),
-        func.avg(TimeEntry.hours).label('avg_hours'),
-        func.sum(TimeEntry.hours).label('total_hours')
-    ).filter(
-        and_(
-            TimeEntry.date >= start_date,
-            TimeEntry.date <= end_date
-        )
-    ).group_by(func.extract('dow', TimeEntry.date)).all()
-    
-    # Additional data for new charts
-    # Get daily totals for heatmap (date and total hours)
-    daily_totals = db.session.query(
-        TimeEntry.date,
-        func.sum(TimeEntry.hours).label('total_hours')
-    ).filter(
-        and_(
-            TimeEntry.date >= start_date,
-            TimeEntry.date <= end_date
-        )
-    ).group_by(TimeEntry.date).order_by(TimeEntry.date).all()
-    
-    # Get project totals by date for stacked bar chart
-    project_daily_totals = db.session.query(
-        TimeEntry.date,
-        Project.name,
-        func.sum(TimeEntry.hours).label('total_hours')
-    ).join(Project).filter(
-        and_(
-            TimeEntry.date >= start_date,
-            TimeEntry.date <= end_date
-        )
-    ).group_by(TimeEntry.date, Project.name).order_by(TimeEntry.date).all()
-
-    # Convert project_daily_totals to list of dicts for JSON serialization
-    project_daily_totals = [
-        {
-            'date': item.date.strftime('%Y-%m-%d') if hasattr(item.date, 'strftime') else str(item.date),
-            'name': item.name,
-            'total_hours': float(item.total_hours) if item.total_hours is not None else 0.0
-        }
-        for item in project_daily_totals
-    ]
-    
-    # Calculate efficiency metrics
-    total_hours = sum(stat.total_hours for stat in project_stats)
+    scope = entry_scope()
+    report = build_report(start_date, end_date, scope)
     monthly_goal = float(get_setting('monthly_goal_hours', '160'))
 
-    # Debug logging for data counts
-    logger.debug(f"Reports data counts - Projects: {len(project_stats)}, Hourly: {len(hourly_stats)}, Weekly: {len(weekly_stats)}, Daily: {len(daily_totals)}, Project Daily: {len(project_daily_totals)}")
+    logger.debug("Reports data counts - projects: %d, days: %d",
+                 len(report.project_stats), len(report.daily_totals))
     
     return render_template('reports.html',
                          cycle_name=cycle_name,
-                         project_stats=project_stats,
-                         hourly_stats=hourly_stats,
-                         weekly_stats=weekly_stats,
-                         daily_totals=daily_totals,
-                         project_daily_totals=project_daily_totals,
-                         total_hours=total_hours,
+                         report=report,
                          monthly_goal=monthly_goal,
+                         all_users=scope.user_id is None,
                          decimal_to_hours_minutes=decimal_to_hours_minutes)
 
-@app.route('/projects')
+def _trend_cycle_count():
+    """Number of cycles requested with ?cycles=, clamped to 1..MAX_TREND_CYCLES"""
+    try:
+        num_cycles = int(request.args.get('cycles', 12))
+    except ValueError:
+        num_cycles = 12
+    return min(max(num_cycles, 1), MAX_TREND_CYCLES)
+
+@bp.route('/reports/trends')
+@login_required
+@cached_view(SCOPED_ENTRIES, CONFIG)
+def trends():
+    """Per-cycle totals and goal attainment for the last N billing cycles"""
+    num_cycles = _trend_cycle_count()
+    monthly_goal = float(get_setting('monthly_goal_hours', '160'))
+    scope = entry_scope()
+    cycle_trends = build_trends(num_cycles, monthly_goal, scope=scope)
+    
+    return render_template('trends.html',
+                         trends=cycle_trends,
+                         num_cycles=num_cycles,
+                         max_cycles=MAX_TREND_CYCLES,
+                         monthly_goal=monthly_goal,
+                         all_users=scope.user_id is None,
+                         decimal_to_hours_minutes=decimal_to_hours_minutes)
+
+@bp.route('/api/trends')
+@login_required
+@cached_view(SCOPED_ENTRIES, CONFIG)
+def api_trends():
+    """API endpoint with per-cycle totals, goal attainment and project breakdown"""
+    monthly_goal = float(get_setting('monthly_goal_hours', '160'))
+    cycle_trends = build_trends(_trend_cycle_count(), monthly_goal, scope=entry_scope())
+    return jsonify({
+        'monthly_goal': monthly_goal,
+        'cycles': [trend_to_dict(trend) for trend in cycle_trends]
+    })
+
+@bp.route('/projects')
 @login_required
 def projects():
     """List all projects for management"""
-    projects = Project.query.order_by(Project.created_at.desc()).all()
+    projects = org_projects().order_by(Project.created_at.desc()).all()
     return render_template('projects.html', projects=projects)
 
-@app.route('/project/edit/<int:project_id>', methods=['GET', 'POST'])
+@bp.route('/project/edit/<int:project_id>', methods=['GET', 'POST'])
 @login_required
 def edit_project_page(project_id):
     """Render and process editing a project"""
-    project = Project.query.get_or_404(project_id)
+    project = get_org_project_or_404(project_id)
     
     if request.method == 'POST':
         name = request.form.get('name', '').strip()
@@ -961,13 +976,13 @@ def edit_project_page(project_id):
         
         if not name:
             flash('Project name is required.', 'error')
-            return redirect(url_for('edit_project_page', project_id=project_id))
+            return redirect(url_for('main.edit_project_page', project_id=project_id))
         
         # Check for duplicate names
-        existing_project = Project.query.filter(Project.name == name, Project.id != project_id).first()
+        existing_project = org_projects().filter(Project.name == name, Project.id != project_id).first()
         if existing_project:
             flash('A project with this name already exists.', 'error')
-            return redirect(url_for('edit_project_page', project_id=project_id))
+            return redirect(url_for('main.edit_project_page', project_id=project_id))
         
     try:
         project.name = name
@@ -977,15 +992,16 @@ def edit_project_page(project_id):
             project.updated_at = datetime.utcnow()
         db.session.commit()
         flash('Project updated successfully!', 'success')
-        return redirect(url_for('projects'))
+        return redirect(url_for('main.projects'))
     except Exception as e:
         db.session.rollback()
         flash(f'Error updating project: {str(e)}', 'error')
-        return redirect(url_for('edit_project_page', project_id=project_id))
+        return redirect(url_for('main.edit_project_page', project_id=project_id))
     
     return render_template('edit_project.html', project=project)
 
-@app.route('/project/add', methods=['GET', 'POST'])
+@bp.route('/project/add', methods=['GET', 'POST'])
+@login_required
 def add_project_page():
     """Add a new project via dedicated page"""
     if request.method == 'POST':
@@ -994,38 +1010,39 @@ def add_project_page():
         
         if not name:
             flash('Project name is required.', 'error')
-            return redirect(url_for('add_project_page'))
+            return redirect(url_for('main.add_project_page'))
         
         # Check if project already exists
-        existing_project = Project.query.filter_by(name=name).first()
+        existing_project = org_projects().filter_by(name=name).first()
         if existing_project:
             flash('A project with this name already exists.', 'error')
-            return redirect(url_for('add_project_page'))
+            return redirect(url_for('main.add_project_page'))
         
         try:
             new_project = Project()
+            new_project.org_id = get_current_user().org_id
             new_project.name = name
             new_project.description = description
             db.session.add(new_project)
             db.session.commit()
             flash(f'Project "{name}" added successfully!', 'success')
-            return redirect(url_for('projects'))
+            return redirect(url_for('main.projects'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error adding project: {str(e)}', 'error')
-            return redirect(url_for('add_project_page'))
+            return redirect(url_for('main.add_project_page'))
     
     return render_template('add_project.html')
 
 # Admin Routes
-@app.route('/admin/users')
+@bp.route('/admin/users')
 @admin_required
 def admin_users():
     """Admin page to manage users"""
-    users = User.query.all()
+    users = org_users().all()
     return render_template('admin/users.html', users=users)
 
-@app.route('/admin/users/create', methods=['GET', 'POST'])
+@bp.route('/admin/users/create', methods=['GET', 'POST'])
 @admin_required
 def admin_create_user():
     """Create a new user (admin only)"""
@@ -1036,33 +1053,33 @@ def admin_create_user():
         
         if not username or not password:
             flash('Username and password are required', 'error')
-            return redirect(url_for('admin_create_user'))
+            return redirect(url_for('main.admin_create_user'))
         
         # Check if user already exists
         existing_user = User.query.filter_by(username=username).first()
         if existing_user:
             flash('Username already exists', 'error')
-            return redirect(url_for('admin_create_user'))
+            return redirect(url_for('main.admin_create_user'))
         
         try:
-            new_user = User(username=username, is_admin=is_admin)
+            new_user = User(username=username, is_admin=is_admin, org_id=get_current_user().org_id)
             new_user.set_password(password)
             db.session.add(new_user)
             db.session.commit()
             flash('User created successfully!', 'success')
-            return redirect(url_for('admin_users'))
+            return redirect(url_for('main.admin_users'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error creating user: {str(e)}', 'error')
-            return redirect(url_for('admin_create_user'))
+            return redirect(url_for('main.admin_create_user'))
     
     return render_template('admin/create_user.html')
 
-@app.route('/admin/users/<int:user_id>/edit', methods=['GET', 'POST'])
+@bp.route('/admin/users/<int:user_id>/edit', methods=['GET', 'POST'])
 @admin_required
 def admin_edit_user(user_id):
     """Edit user details (admin only)"""
-    user = User.query.get_or_404(user_id)
+    user = get_org_user_or_404(user_id)
     
     if request.method == 'POST':
         username = request.form.get('username', '').strip()
@@ -1071,13 +1088,13 @@ def admin_edit_user(user_id):
         
         if not username:
             flash('Username is required', 'error')
-            return redirect(url_for('admin_edit_user', user_id=user_id))
+            return redirect(url_for('main.admin_edit_user', user_id=user_id))
         
         # Check if username already exists (excluding current user)
         existing_user = User.query.filter(User.username == username, User.id != user_id).first()
         if existing_user:
             flash('Username already exists', 'error')
-            return redirect(url_for('admin_edit_user', user_id=user_id))
+            return redirect(url_for('main.admin_edit_user', user_id=user_id))
         
         try:
             user.username = username
@@ -1086,24 +1103,24 @@ def admin_edit_user(user_id):
                 user.set_password(password)
             db.session.commit()
             flash('User updated successfully!', 'success')
-            return redirect(url_for('admin_users'))
+            return redirect(url_for('main.admin_users'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error updating user: {str(e)}', 'error')
-            return redirect(url_for('admin_edit_user', user_id=user_id))
+            return redirect(url_for('main.admin_edit_user', user_id=user_id))
     
     return render_template('admin/edit_user.html', user=user)
 
-@app.route('/admin/users/<int:user_id>/delete', methods=['POST'])
+@bp.route('/admin/users/<int:user_id>/delete', methods=['POST'])
 @admin_required
 def admin_delete_user(user_id):
     """Delete user (admin only)"""
-    user = User.query.get_or_404(user_id)
+    user = get_org_user_or_404(user_id)
     
-    # Prevent deleting the last admin
-    if user.is_admin and User.query.filter_by(is_admin=True).count() <= 1:
+    # Prevent deleting the organization's last admin
+    if user.is_admin and org_users().filter_by(is_admin=True).count() <= 1:
         flash('Cannot delete the last admin user', 'error')
-        return redirect(url_for('admin_users'))
+        return redirect(url_for('main.admin_users'))
     
     try:
         db.session.delete(user)
@@ -1113,47 +1130,87 @@ def admin_delete_user(user_id):
         db.session.rollback()
         flash(f'Error deleting user: {str(e)}', 'error')
     
-    return redirect(url_for('admin_users'))
+    return redirect(url_for('main.admin_users'))
 
-@app.route('/admin/dashboard')
+@bp.route('/admin/dashboard')
 @admin_required
 def admin_dashboard():
     """Admin dashboard with statistics"""
-    # Get user statistics
-    total_users = User.query.count()
-    admin_users = User.query.filter_by(is_admin=True).count()
-    regular_users = total_users - admin_users
-    
-    # Get time entry statistics
-    total_entries = TimeEntry.query.count()
-    total_projects = Project.query.count()
-    
-    # Get recent users
-    recent_users = User.query.order_by(User.id.desc()).limit(5).all()
-    
     return render_template('admin/dashboard.html',
-                         total_users=total_users,
-                         admin_users=admin_users,
-                         regular_users=regular_users,
-                         total_entries=total_entries,
-                         total_projects=total_projects,
-                         recent_users=recent_users)
-
-@app.route('/api/cycle_stats/<cycle_date>')
+                         stats=get_system_stats(get_current_user().org_id),
+                         stats_ttl=SYSTEM_STATS_TTL,
+                         minutes_to_hours_minutes=minutes_to_hours_minutes)
+
+@bp.route('/admin/db_pool')
+@operator_required
+def admin_db_pool():
+    """Connection pool occupancy and checkout wait times for this worker"""
+    return jsonify(pool_status(db.engine))
+
+@bp.route('/admin/metrics')
+@operator_required
+def admin_metrics():
+    """Per-endpoint timings, slow requests and slow queries for this worker"""
+    return render_template('admin/metrics.html',
+                         endpoints=metrics.endpoint_summary(),
+                         slow_requests=list(metrics.slow_requests),
+                         slow_queries=list(metrics.slow_queries),
+                         slow_query_ms=metrics.slow_query_seconds * 1000,
+                         slow_request_ms=metrics.slow_request_seconds * 1000,
+                         pool=pool_status(db.engine),
+                         render_cache_hits=render_cache.hits,
+                         render_cache_misses=render_cache.misses)
+
+@bp.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint: bearer METRICS_TOKEN if set, otherwise an operator session"""
+    token = os.environ.get('METRICS_TOKEN')
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            abort(401)
+    else:
+        user = get_current_user()
+        if user is None or not user.is_operator:
+            abort(403)
+
+    pool = pool_status(db.engine)
+    counters = {
+        'timetracker_db_pool_checkouts_total': ('Connections checked out of the pool', pool['checkouts']),
+        'timetracker_db_pool_timeouts_total': ('Checkouts that timed out waiting for a connection', pool['timeouts']),
+        'timetracker_render_cache_hits_total': ('Pages served from the render cache', render_cache.hits),
+        'timetracker_render_cache_misses_total': ('Render cache lookups that ran the view', render_cache.misses),
+    }
+    gauges = {
+        'timetracker_db_pool_max_wait_seconds': ('Longest wait for a pooled connection', pool['max_wait_ms'] / 1000),
+    }
+    pool_gauges = {
+        'size': 'Connections the pool keeps open',
+        'checked_out': 'Pooled connections in use',
+        'idle': 'Pooled connections waiting to be used',
+        'overflow': 'Connections opened beyond the pool size',
+    }
+    for key, help_text in pool_gauges.items():
+        if key in pool:
+            gauges[f'timetracker_db_pool_{key}'] = (help_text, pool[key])
+    return Response(render_prometheus(gauges, counters), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/api/cycle_stats/<cycle_date>')
 @login_required
+@cached_view(SCOPED_ENTRIES, CONFIG)
 def api_cycle_stats(cycle_date):
     """API endpoint to get cycle statistics"""
     try:
         target_date = datetime.strptime(cycle_date, '%Y-%m-%d').date()
         start_date, end_date, cycle_name = get_monthly_cycle_for_date(target_date)
         
-        # Calculate total hours for the cycle
-        total_hours = db.session.query(func.sum(TimeEntry.hours)).filter(
+        # Calculate total hours for the cycle from the daily rollup
+        total_minutes = scoped(db.session.query(func.sum(DailyRollup.minutes)).filter(
             and_(
-                TimeEntry.date >= start_date,
-                TimeEntry.date <= end_date
+                DailyRollup.date >= start_date,
+                DailyRollup.date <= end_date
             )
-        ).scalar() or 0.0
+        ), entry_scope(), DailyRollup).scalar() or 0
+        total_hours = minutes_to_hours(total_minutes)
         
         # Get monthly goal
         monthly_goal = float(get_setting('monthly_goal_hours', '160'))
@@ -1161,6 +1218,7 @@ def api_cycle_stats(cycle_date):
         return jsonify({
             'cycle_name': cycle_name,
             'total_hours': total_hours,
+            'total_minutes': total_minutes,
             'monthly_goal': monthly_goal,
             'remaining_hours': max(0, monthly_goal - total_hours),
             'progress_percentage': min(100, (total_hours / monthly_goal) * 100) if monthly_goal > 0 else 0
@@ -1168,20 +1226,49 @@ def api_cycle_stats(cycle_date):
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
-@app.errorhandler(404)
+@bp.route('/api/search')
+@login_required
+def api_search():
+    """API endpoint returning entries ranked by description relevance"""
+    query_text = request.args.get('q', '').strip()
+    if not query_text:
+        return jsonify({'error': 'q is required'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    
+    results = ranked_search(scoped_entry_query(entry_scope()), query_text, limit=limit)
+    return jsonify({
+        'query': query_text,
+        'results': [
+            {
+                'id': entry.id,
+                'date': entry.date.strftime('%Y-%m-%d'),
+                'project': entry.project.name,
+                'minutes': entry.minutes,
+                'hours': entry.hours,
+                'description': entry.description or '',
+                'score': score
+            }
+            for entry, score in results
+        ]
+    })
+
+@bp.app_errorhandler(404)
 def not_found_error(error):
     logger.warning(f"404 Not Found: {request.path}")
     if request.path.startswith('/entries'):
-        return redirect(url_for('entries'))
+        return redirect(url_for('main.entries'))
     return render_template('base.html'), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_error(error):
     db.session.rollback()
     logger.error(f"500 Internal Server Error: {error}")
     return render_template('base.html'), 500
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     """Handle user login"""
     if request.method == 'POST':
@@ -1190,64 +1277,78 @@ def login():
         
         if not username or not password:
             flash('Username and password are required', 'error')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         
         # Find user
         user = User.query.filter_by(username=username).first()
         
         if user and user.check_password(password):
-            session['username'] = username
+            session['user_id'] = user.id
+            session['username'] = user.username
             flash('Logged in successfully!', 'success')
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('main.dashboard'))
         else:
             flash('Invalid username or password', 'error')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
     
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
     """Handle user logout"""
+    session.pop('user_id', None)
     session.pop('username', None)
     flash('Logged out successfully!', 'success')
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
-@app.route('/signup', methods=['GET', 'POST'])
+@bp.route('/signup', methods=['GET', 'POST'])
 def signup():
     """Handle user registration"""
     if request.method == 'POST':
         username = request.form.get('username', '').strip()
         password = request.form.get('password', '')
+        organization_name = request.form.get('organization', '').strip() or username
         
         if not username or not password:
             flash('Username and password are required', 'error')
-            return redirect(url_for('signup'))
+            return redirect(url_for('main.signup'))
         
         if len(username) < 3:
             flash('Username must be at least 3 characters', 'error')
-            return redirect(url_for('signup'))
+            return redirect(url_for('main.signup'))
         
         if len(password) < 6:
             flash('Password must be at least 6 characters', 'error')
-            return redirect(url_for('signup'))
+            return redirect(url_for('main.signup'))
         
         # Check if user already exists
         existing_user = User.query.filter_by(username=username).first()
         if existing_user:
             flash('Username already exists', 'error')
-            return redirect(url_for('signup'))
+            return redirect(url_for('main.signup'))
+        
+        if len(organization_name) > 100:
+            flash('Organization name cannot exceed 100 characters', 'error')
+            return redirect(url_for('main.signup'))
         
-        # Create new user
+        if Organization.query.filter_by(name=organization_name).first():
+            flash('Organization name already exists', 'error')
+            return redirect(url_for('main.signup'))
+        
+        # Self-registered accounts get an organization of their own, as its admin;
+        # existing organizations add members through their admins
         try:
             new_user = User(username=username)
             new_user.set_password(password)
-            db.session.add(new_user)
+            organization = create_organization(organization_name, new_user)
+            create_org_partition(db.session.connection(), organization.id)
             db.session.commit()
+            initialize_default_data(organization.id)
             flash('Account created successfully! Please login.', 'success')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         except Exception as e:
             db.session.rollback()
             flash(f'Error creating account: {str(e)}', 'error')
-            return redirect(url_for('signup'))
+            return redirect(url_for('main.signup'))
     
     return render_template('signup.html')
@@ -0,0 +1,184 @@
+"""
+Full-text search over TimeEntry.description.
+
+SQLite:     an external-content FTS5 table (time_entry_fts) kept in sync with
+            time_entry by triggers, so every write path (forms, API, bulk
+            inserts) updates the index without application code.
+PostgreSQL: a GIN index on to_tsvector(description), queried with to_tsquery.
+
+Both backends do prefix matching on every search word (all words must match)
+and can order results by relevance. Any other database, or a SQLite build
+without FTS5, falls back to the original ILIKE filter.
+"""
+import logging
+import re
+
+from sqlalchemy import text, func, or_, column
+
+from app import db
+from models import TimeEntry, Project
+
+logger = logging.getLogger(__name__)
+
+# Text search configuration used for the PostgreSQL tsvector; 'simple' does not
+# stem, which keeps prefix matching predictable for short task descriptions
+PG_TS_CONFIG = 'simple'
+
+SQLITE_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS time_entry_fts USING fts5(
+        description, content='time_entry', content_rowid='id', tokenize='unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS time_entry_fts_ai AFTER INSERT ON time_entry BEGIN
+        INSERT INTO time_entry_fts(rowid, description) VALUES (new.id, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS time_entry_fts_ad AFTER DELETE ON time_entry BEGIN
+        INSERT INTO time_entry_fts(time_entry_fts, rowid, description) VALUES ('delete', old.id, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS time_entry_fts_au AFTER UPDATE OF description ON time_entry BEGIN
+        INSERT INTO time_entry_fts(time_entry_fts, rowid, description) VALUES ('delete', old.id, old.description);
+        INSERT INTO time_entry_fts(rowid, description) VALUES (new.id, new.description);
+    END""",
+]
+
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS time_entry_fts_au",
+    "DROP TRIGGER IF EXISTS time_entry_fts_ad",
+    "DROP TRIGGER IF EXISTS time_entry_fts_ai",
+    "DROP TABLE IF EXISTS time_entry_fts",
+]
+
+PG_FTS_DDL = [
+    f"""CREATE INDEX IF NOT EXISTS ix_time_entry_description_fts ON time_entry
+        USING GIN (to_tsvector('{PG_TS_CONFIG}', coalesce(description, '')))""",
+]
+
+PG_FTS_DROP = [
+    "DROP INDEX IF EXISTS ix_time_entry_description_fts",
+]
+
+# Backend detected for the current engine: 'sqlite', 'postgresql' or None (ILIKE fallback)
+_backend = {}
+
+
+def create_search_index(connection):
+    """Create the full-text index objects for this connection's database; returns the backend name"""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'time_entry_fts'"
+        )).first() is not None
+        try:
+            for statement in SQLITE_FTS_DDL:
+                connection.execute(text(statement))
+        except Exception as e:
+            logger.warning(f"SQLite FTS5 unavailable, search falls back to LIKE: {e}")
+            return None
+        if not exists:
+            # Index the entries that were written before the FTS table existed
+            connection.execute(text("INSERT INTO time_entry_fts(time_entry_fts) VALUES ('rebuild')"))
+        return 'sqlite'
+    if dialect == 'postgresql':
+        for statement in PG_FTS_DDL:
+            connection.execute(text(statement))
+        return 'postgresql'
+    return None
+
+
+def drop_search_index(connection):
+    """Remove the full-text index objects"""
+    statements = {'sqlite': SQLITE_FTS_DROP, 'postgresql': PG_FTS_DROP}.get(connection.dialect.name, [])
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def init_search_index():
+    """Create the index (if needed) on the app database and remember which backend is active"""
+    with db.engine.begin() as connection:
+        _backend['name'] = create_search_index(connection)
+    return _backend['name']
+
+
+def search_backend():
+    """Active full-text backend name, or None when searching falls back to ILIKE"""
+    if 'name' not in _backend:
+        init_search_index()
+    return _backend['name']
+
+
+def _search_terms(query_text):
+    return re.findall(r'\w+', query_text or '', flags=re.UNICODE)
+
+
+def _sqlite_match(terms):
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _pg_tsquery(terms):
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def _pg_document():
+    return func.to_tsvector(PG_TS_CONFIG, func.coalesce(TimeEntry.description, ''))
+
+
+def description_matches(query_text):
+    """
+    Filter clause for entries whose description matches every word of
+    query_text as a prefix, or None when there is nothing indexable to search for.
+    """
+    terms = _search_terms(query_text)
+    backend = search_backend()
+    if not terms or backend is None:
+        return None
+    if backend == 'sqlite':
+        matching_ids = text("SELECT rowid FROM time_entry_fts WHERE time_entry_fts MATCH :fts_query") \
+            .bindparams(fts_query=_sqlite_match(terms)).columns(column('rowid'))
+        return TimeEntry.id.in_(matching_ids)
+    return _pg_document().op('@@')(func.to_tsquery(PG_TS_CONFIG, _pg_tsquery(terms)))
+
+
+def search_filter(query_text, org_id):
+    """
+    Filter clause for the search view: the description matches (through the
+    full-text index) or the name of one of org_id's projects contains the text.
+    """
+    # Project names are few; resolve them first so the entry side stays index-driven
+    project_ids = [
+        project_id for (project_id,) in
+        db.session.query(Project.id).filter(Project.org_id == org_id, Project.name.ilike(f'%{query_text}%')).all()
+    ]
+    description_clause = description_matches(query_text)
+    if description_clause is None:
+        description_clause = TimeEntry.description.ilike(f'%{query_text}%')
+    if project_ids:
+        return or_(description_clause, TimeEntry.project_id.in_(project_ids))
+    return description_clause
+
+
+def ranked_search(query, query_text, limit=50):
+    """
+    Order an entry query by description relevance to query_text (best first)
+    and return [(entry, score)]. Without a full-text backend every score is 0.
+    """
+    terms = _search_terms(query_text)
+    backend = search_backend()
+    if not terms or backend is None:
+        entries = query.filter(TimeEntry.description.ilike(f'%{query_text}%')).limit(limit).all()
+        return [(entry, 0.0) for entry in entries]
+
+    if backend == 'sqlite':
+        fts = text(
+            "SELECT rowid AS entry_id, -bm25(time_entry_fts) AS score "
+            "FROM time_entry_fts WHERE time_entry_fts MATCH :fts_query"
+        ).bindparams(fts_query=_sqlite_match(terms)) \
+            .columns(column('entry_id'), column('score')).subquery('fts')
+        rows = query.join(fts, fts.c.entry_id == TimeEntry.id) \
+            .add_columns(fts.c.score).order_by(fts.c.score.desc(), TimeEntry.id.desc()) \
+            .limit(limit).all()
+    else:
+        tsquery = func.to_tsquery(PG_TS_CONFIG, _pg_tsquery(terms))
+        score = func.ts_rank(_pg_document(), tsquery)
+        rows = query.filter(_pg_document().op('@@')(tsquery)) \
+            .add_columns(score.label('score')).order_by(score.desc(), TimeEntry.id.desc()) \
+            .limit(limit).all()
+    return [(entry, float(score or 0.0)) for entry, score in rows]
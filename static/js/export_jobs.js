@@ -0,0 +1,45 @@
+/**
+ * Status polling for background exports on the export page.
+ * Rows still queued or running are re-checked every few seconds until the
+ * file is ready (a download button is added) or the job fails.
+ */
+const EXPORT_POLL_INTERVAL = 3000;
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('[data-export-job]').forEach(row => {
+        if (row.dataset.status === 'queued' || row.dataset.status === 'running') {
+            setTimeout(() => pollExportJob(row), EXPORT_POLL_INTERVAL);
+        }
+    });
+});
+
+function pollExportJob(row) {
+    fetch(row.dataset.exportJob, { headers: { 'Accept': 'application/json' } })
+        .then(response => {
+            if (!response.ok) throw new Error('Failed to check export status');
+            return response.json();
+        })
+        .then(job => {
+            row.dataset.status = job.status;
+            const status = row.querySelector('.job-status');
+            if (job.status === 'done') {
+                status.innerHTML = '<span class="badge bg-success">Ready</span>';
+                const link = document.createElement('a');
+                link.href = job.download_url;
+                link.className = 'btn btn-outline-primary btn-sm';
+                link.textContent = 'Download';
+                row.querySelector('.job-download').appendChild(link);
+            } else if (job.status === 'failed') {
+                const badge = document.createElement('span');
+                badge.className = 'badge bg-danger';
+                badge.title = job.error || '';
+                badge.textContent = 'Failed';
+                status.replaceChildren(badge);
+            } else {
+                status.innerHTML = '<span class="badge bg-secondary">' +
+                    job.status.charAt(0).toUpperCase() + job.status.slice(1) + '</span>';
+                setTimeout(() => pollExportJob(row), EXPORT_POLL_INTERVAL);
+            }
+        })
+        .catch(error => console.error(error));
+}
@@ -0,0 +1,53 @@
+/**
+ * "Load more" buttons for keyset-paginated entry lists.
+ * The server returns the next page as rendered day cards plus the URL of the
+ * page after it; a day split across two pages is merged into one card.
+ */
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('[data-load-more]').forEach(button => {
+        button.addEventListener('click', () => loadMoreEntries(button));
+    });
+});
+
+function loadMoreEntries(button) {
+    const container = document.getElementById(button.dataset.target);
+    if (!container) return;
+    
+    button.disabled = true;
+    fetch(button.dataset.loadMore, { headers: { 'Accept': 'application/json' } })
+        .then(response => {
+            if (!response.ok) throw new Error('Failed to load more entries');
+            return response.json();
+        })
+        .then(data => {
+            const page = document.createElement('div');
+            page.innerHTML = data.html;
+            
+            const days = container.querySelectorAll('.entry-day');
+            const lastDay = days[days.length - 1];
+            const firstDay = page.querySelector('.entry-day');
+            if (lastDay && firstDay && lastDay.dataset.date === firstDay.dataset.date) {
+                // Same day continues from the previous page: move its entries across
+                const body = lastDay.querySelector('.entry-day-body');
+                firstDay.querySelectorAll('.time-entry-card').forEach(card => body.appendChild(card));
+                firstDay.remove();
+            }
+            while (page.firstChild) {
+                container.appendChild(page.firstChild);
+            }
+            
+            if (data.next_url) {
+                button.dataset.loadMore = data.next_url;
+                button.disabled = false;
+            } else {
+                button.parentElement.remove();
+            }
+            if (typeof feather !== 'undefined') {
+                feather.replace();
+            }
+        })
+        .catch(error => {
+            button.disabled = false;
+            alert(error.message);
+        });
+}
@@ -0,0 +1,176 @@
+"""
+System statistics for the admin dashboard.
+
+Statistics cover the admin's own organization only; every query filters on
+org_id first (ix_user_org_id, uq_project_org_name, ix_daily_rollup_org_date).
+Entry counts and hours are read from the daily rollup, which holds one row per
+user, project and day instead of one per entry, so the admin page never
+counts time_entry itself. Everything is computed by a fixed number of grouped
+queries (no per-user or per-project loops):
+
+    - user, admin and project counts plus the overall entry count in one query
+      of scalar subqueries;
+    - hours and entries per user for the current billing cycle;
+    - the top projects of the current cycle;
+    - entries and hours per cycle for the last GROWTH_CYCLES cycles.
+
+The result is cached per worker and organization for SYSTEM_STATS_TTL seconds
+(default 60). The cache key includes the organization's config data version,
+so adding or removing users and projects shows up at once; entry totals may
+lag by up to the TTL.
+"""
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import date, datetime
+
+from sqlalchemy import func, select, and_
+
+from app import db
+from models import User, Project, DailyRollup, get_data_versions, org_config_version_key
+from reports_engine import cycle_id_column
+from utils import cycle_id_for_date, cycle_table, get_cycle_start_day
+
+SYSTEM_STATS_TTL = int(os.environ.get('SYSTEM_STATS_TTL', 60))
+
+# Rows shown in the dashboard tables
+USER_ROWS = 50
+TOP_PROJECTS = 5
+GROWTH_CYCLES = 12
+RECENT_USERS = 5
+
+SystemStats = namedtuple('SystemStats', [
+    'total_users', 'admin_users', 'regular_users', 'total_projects', 'active_projects', 'total_entries',
+    'cycle', 'cycle_minutes', 'cycle_entries', 'user_cycle_totals', 'top_projects', 'entry_growth',
+    'recent_users', 'computed_at'
+])
+UserCycleTotal = namedtuple('UserCycleTotal', ['user_id', 'username', 'minutes', 'entry_count'])
+ProjectTotal = namedtuple('ProjectTotal', ['project_id', 'name', 'minutes', 'entry_count'])
+CycleGrowth = namedtuple('CycleGrowth', ['cycle', 'minutes', 'entry_count', 'change'])
+RecentUser = namedtuple('RecentUser', ['id', 'username', 'is_admin'])
+
+_cache = {}  # org_id -> (key, computed at, stats)
+_cache_lock = threading.Lock()
+
+
+def _counts(org_id):
+    """(users, admins, projects, active projects, entries) in one statement"""
+    users = select(func.count(User.id)).where(User.org_id == org_id)
+    projects = select(func.count(Project.id)).where(Project.org_id == org_id)
+    return db.session.query(
+        users.scalar_subquery(),
+        users.where(User.is_admin.is_(True)).scalar_subquery(),
+        projects.scalar_subquery(),
+        projects.where(Project.active.is_(True)).scalar_subquery(),
+        select(func.coalesce(func.sum(DailyRollup.entry_count), 0))
+        .where(DailyRollup.org_id == org_id).scalar_subquery(),
+    ).one()
+
+
+def _user_cycle_totals(org_id, cycle):
+    """Every user's minutes and entries in the cycle (users without time included), busiest first"""
+    minutes = func.coalesce(func.sum(DailyRollup.minutes), 0)
+    rows = db.session.query(
+        User.id, User.username, minutes, func.coalesce(func.sum(DailyRollup.entry_count), 0)
+    ).outerjoin(DailyRollup, and_(
+        DailyRollup.org_id == org_id,
+        DailyRollup.user_id == User.id,
+        DailyRollup.date >= cycle.start_date,
+        DailyRollup.date <= cycle.end_date
+    )).filter(User.org_id == org_id).group_by(User.id, User.username).order_by(minutes.desc(), User.username).limit(USER_ROWS).all()
+    return [UserCycleTotal(user_id, username, int(total), int(count)) for user_id, username, total, count in rows]
+
+
+def _top_projects(org_id, cycle):
+    minutes = func.sum(DailyRollup.minutes)
+    rows = db.session.query(
+        Project.id, Project.name, minutes, func.sum(DailyRollup.entry_count)
+    ).join(Project, DailyRollup.project_id == Project.id).filter(
+        DailyRollup.org_id == org_id,
+        DailyRollup.date >= cycle.start_date,
+        DailyRollup.date <= cycle.end_date
+    ).group_by(Project.id, Project.name).order_by(minutes.desc()).limit(TOP_PROJECTS).all()
+    return [ProjectTotal(project_id, name, int(total or 0), int(count or 0))
+            for project_id, name, total, count in rows]
+
+
+def _entry_growth(org_id, current_id, start_day):
+    """Entries and minutes for each of the last GROWTH_CYCLES cycles, oldest first"""
+    first_id = current_id - GROWTH_CYCLES + 1
+    cycles = cycle_table(first_id, current_id, start_day)
+    cycle_id = cycle_id_column(DailyRollup.date, start_day).label('cycle_id')
+    rows = db.session.query(
+        cycle_id, func.sum(DailyRollup.minutes), func.sum(DailyRollup.entry_count)
+    ).filter(
+        DailyRollup.org_id == org_id,
+        DailyRollup.date >= cycles[first_id].start_date,
+        DailyRollup.date <= cycles[current_id].end_date
+    ).group_by(cycle_id).all()
+    totals = {int(row_cycle_id): (int(total or 0), int(count or 0)) for row_cycle_id, total, count in rows}
+
+    growth = []
+    previous_count = None
+    for growth_cycle_id in range(first_id, current_id + 1):
+        total, count = totals.get(growth_cycle_id, (0, 0))
+        change = (count - previous_count) / previous_count * 100 if previous_count else None
+        growth.append(CycleGrowth(cycles[growth_cycle_id], total, count, change))
+        previous_count = count
+    return growth
+
+
+def _recent_users(org_id):
+    rows = db.session.query(User.id, User.username, User.is_admin).filter(User.org_id == org_id) \
+        .order_by(User.id.desc()).limit(RECENT_USERS)
+    return [RecentUser(*row) for row in rows]
+
+
+def compute_system_stats(org_id, today=None):
+    """Run the dashboard queries for one organization; use get_system_stats() for the cached result"""
+    start_day = get_cycle_start_day(org_id)
+    current_id = cycle_id_for_date(today or date.today(), start_day)
+    cycle = cycle_table(current_id, current_id, start_day)[current_id]
+
+    total_users, admin_users, total_projects, active_projects, total_entries = _counts(org_id)
+    user_cycle_totals = _user_cycle_totals(org_id, cycle)
+    top_projects = _top_projects(org_id, cycle)
+    entry_growth = _entry_growth(org_id, current_id, start_day)
+    current = entry_growth[-1]
+    return SystemStats(
+        total_users=total_users,
+        admin_users=admin_users,
+        regular_users=total_users - admin_users,
+        total_projects=total_projects,
+        active_projects=active_projects,
+        total_entries=int(total_entries or 0),
+        cycle=cycle,
+        cycle_minutes=current.minutes,
+        cycle_entries=current.entry_count,
+        user_cycle_totals=user_cycle_totals,
+        top_projects=top_projects,
+        entry_growth=entry_growth,
+        recent_users=_recent_users(org_id),
+        computed_at=datetime.now()
+    )
+
+
+def get_system_stats(org_id, ttl=None):
+    """An organization's dashboard statistics, recomputed at most every ttl seconds or when its users/projects change"""
+    ttl = SYSTEM_STATS_TTL if ttl is None else ttl
+    version_key = org_config_version_key(org_id)
+    key = (date.today(), get_data_versions([version_key])[version_key])
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(org_id)
+        if cached is not None and cached[0] == key and now - cached[1] < ttl:
+            return cached[2]
+
+    stats = compute_system_stats(org_id)
+    with _cache_lock:
+        _cache[org_id] = (key, now, stats)
+    return stats
+
+
+def clear_system_stats_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,55 @@
+"""
+JSON API: batch create, edit and delete, and the daily rollup they maintain.
+
+Run with pytest.
+"""
+from datetime import date, timedelta
+
+from app import db
+from models import DEFAULT_ORG_ID, DailyRollup, Project, TimeEntry
+
+TODAY = date.today()
+
+
+def test_api_round_trip_maintains_rollup(app, make_user, login):
+    user_id = make_user('api')
+    with app.app_context():
+        projects = [Project(name='Api A', org_id=DEFAULT_ORG_ID), Project(name='Api B', org_id=DEFAULT_ORG_ID)]
+        db.session.add_all(projects)
+        db.session.commit()
+        project_a, project_b = (project.id for project in projects)
+
+    def rollup():
+        with app.app_context():
+            return {(row.project_id, row.date): (row.minutes, row.entry_count)
+                    for row in DailyRollup.query.filter_by(user_id=user_id)}
+
+    client = login('api')
+    yesterday = TODAY - timedelta(days=1)
+    items = [
+        {'date': TODAY.isoformat(), 'project_id': project_b, 'hours': '2', 'description': 'api first'},
+        {'date': TODAY.isoformat(), 'project_id': project_a, 'hours': '0:30', 'description': 'api second'},
+        {'date': yesterday.isoformat(), 'project_id': project_a, 'hours': '1', 'description': 'api third'},
+    ]
+    response = client.post('/api/entries', json=items)
+    assert response.status_code == 201
+    ids = response.get_json()['ids']
+    # ids are in the order of the request items
+    with app.app_context():
+        assert [db.session.get(TimeEntry, entry_id).description for entry_id in ids] == \
+            [item['description'] for item in items]
+    assert rollup() == {(project_b, TODAY): (120, 1), (project_a, TODAY): (30, 1), (project_a, yesterday): (60, 1)}
+
+    # An edit moves the entry's minutes to its new project
+    response = client.patch('/api/entries', json={'id': ids[1], 'project_id': project_b, 'hours': '1:15'})
+    assert response.status_code == 200
+    assert response.get_json()['entries'][0]['minutes'] == 75
+    assert rollup() == {(project_b, TODAY): (195, 2), (project_a, yesterday): (60, 1)}
+
+    response = client.delete('/api/entries', json={'ids': [ids[0], ids[2]]})
+    assert response.get_json()['deleted'] == 2
+    assert rollup() == {(project_b, TODAY): (75, 1)}
+    assert [entry['id'] for entry in client.get('/api/entries').get_json()['entries']] == [ids[1]]
+
+    client.delete('/api/entries', json=[ids[1]])
+    assert rollup() == {}
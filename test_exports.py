@@ -0,0 +1,73 @@
+"""
+CSV exports larger than one keyset batch, including legacy rows.
+
+Run with pytest.
+"""
+import csv
+import io
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+
+from app import db
+from exports import EXPORT_BATCH_SIZE
+from models import DEFAULT_ORG_ID, Project, TimeEntry
+
+TODAY = date.today()
+
+
+def test_csv_export_spans_batches_with_entries_without_created_at(app, make_user, login):
+    user_id = make_user('exporter')
+    # One day, so the first batch ends among the legacy rows that sort last
+    count, legacy_count = EXPORT_BATCH_SIZE + 150, 300
+    created = datetime.utcnow()
+    with app.app_context():
+        project = Project(name='Export Project', org_id=DEFAULT_ORG_ID)
+        db.session.add(project)
+        db.session.flush()
+        db.session.execute(insert(TimeEntry), [
+            {'date': TODAY, 'project_id': project.id, 'user_id': user_id, 'org_id': DEFAULT_ORG_ID,
+             'minutes': 15, 'description': f'exported {i}', 'created_at': created - timedelta(seconds=i)}
+            for i in range(count)
+        ])
+        # As older releases left them
+        TimeEntry.query.filter(TimeEntry.description.in_([f'exported {i}' for i in range(legacy_count)])).update(
+            {TimeEntry.created_at: None}, synchronize_session=False)
+        db.session.commit()
+
+    client = login('exporter')
+    response = client.get('/export_data?quick=all_data')
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    descriptions = [row[4] for row in rows[1:] if len(row) > 4 and row[4].startswith('exported ')]
+    assert sorted(descriptions) == sorted(f'exported {i}' for i in range(count))
+
+
+def test_pdf_wraps_long_text_instead_of_truncating(app, make_user, monkeypatch):
+    from reportlab import rl_config
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    from exports import export_query
+    from pdf_export import FONT_NAME, FONT_SIZE, wrap_text, write_pdf
+
+    description = ' '.join(f'word{i}' for i in range(80)) + ' ' + 'x' * 120
+    lines = wrap_text(description, 200)
+    assert len(lines) > 1
+    assert all(stringWidth(line, FONT_NAME, FONT_SIZE) <= 200 for line in lines)
+    assert ''.join(lines).replace(' ', '') == description.replace(' ', '')
+
+    user_id = make_user('pdf')
+    with app.app_context():
+        project = Project(name='A project name far too long to fit into the project column', org_id=DEFAULT_ORG_ID)
+        db.session.add(project)
+        db.session.flush()
+        db.session.add(TimeEntry(date=TODAY, project_id=project.id, user_id=user_id, org_id=DEFAULT_ORG_ID,
+                                 minutes=60, description=description))
+        db.session.commit()
+        target = io.BytesIO()
+        # Plain content streams, so the drawn text can be searched
+        monkeypatch.setattr(rl_config, 'pageCompression', 0)
+        write_pdf(export_query(), target)
+    pdf = target.getvalue()
+    assert b'...' not in pdf
+    for word in ('word0', 'word79', 'column'):
+        assert word.encode() in pdf
@@ -0,0 +1,73 @@
+"""
+CSV import: batching, rejected rows and the daily rollup.
+
+Run with pytest.
+"""
+import io
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from app import db
+from imports import import_csv
+from models import DEFAULT_ORG_ID, DailyRollup, Project, User
+
+TODAY = date.today()
+YESTERDAY = TODAY - timedelta(days=1)
+
+
+def import_rows():
+    """CSV in the export layout: two bad rows, two for a project that may not exist, and the totals block"""
+    return '\n'.join([
+        'Date,Project,Hours (Decimal),Hours (HH:MM),Description',
+        f'{TODAY.isoformat()},Import Known,1.50,1:30,first',
+        ',Import Known,1.00,1:00,no date',
+        f'{TODAY.isoformat()},Import New,2.00,2:00,new project',
+        f'{TODAY.isoformat()},Import Known,0.00,0:00,zero hours',
+        f'{TODAY.isoformat()},Import Known,0.25,0:15,second',
+        f'{YESTERDAY.isoformat()},Import New,1.00,1:00,third',
+        '',
+        'SUMMARY',
+        'Total Hours,,5.75,5:45,',
+    ]) + '\n'
+
+
+def test_csv_import_batches_rows_and_maintains_rollup(app, make_user, login):
+    user_id = make_user('importer')
+    with app.app_context():
+        known_project = Project(name='Import Known', org_id=DEFAULT_ORG_ID)
+        db.session.add(known_project)
+        db.session.commit()
+        importer = db.session.get(User, user_id)
+
+        commits = []
+
+        def count_commit(conn):
+            commits.append(conn)
+
+        event.listen(db.engine, 'commit', count_commit)
+        try:
+            result = import_csv(io.StringIO(import_rows()), importer, batch_size=1)
+        finally:
+            event.remove(db.engine, 'commit', count_commit)
+        # One commit per batch; rejected rows keep their line numbers
+        assert result.imported == 2 and len(commits) == 2
+        assert [line_number for line_number, _ in result.errors] == [3, 4, 5, 7]
+        assert result.errors[1][1] == 'Unknown project "Import New"'
+        assert result.created_projects == []
+
+        result = import_csv(io.StringIO(import_rows()), importer, create_projects=True)
+        assert result.imported == 4 and result.created_projects == ['Import New']
+        assert [line_number for line_number, _ in result.errors] == [3, 5]
+        new_project = Project.query.filter_by(name='Import New', org_id=DEFAULT_ORG_ID).first()
+        rollup = {(row.project_id, row.date): (row.minutes, row.entry_count)
+                  for row in DailyRollup.query.filter_by(user_id=user_id)}
+        assert rollup == {(known_project.id, TODAY): (210, 4), (new_project.id, TODAY): (120, 1),
+                          (new_project.id, YESTERDAY): (60, 1)}
+
+    # The web upload renders its report with the logged-in user still attached to the session
+    client = login('importer')
+    response = client.post('/import', data={'file': (io.BytesIO(import_rows().encode()), 'entries.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert '<strong>4</strong> entries imported' in response.get_data(as_text=True)
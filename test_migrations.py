@@ -0,0 +1,141 @@
+"""
+Schema migrations against a database created before they existed.
+
+Builds a SQLite database with the original schema (durations in decimal hours,
+no rollup, no organizations), runs the deploy commands (`flask db upgrade`,
+then `flask init-db --defaults`) on it in subprocesses and checks the
+converted data; an empty database must come up the same way.
+
+Run with pytest or directly: python test_migrations.py
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Tables as the first release's db.create_all() created them
+BASELINE_SCHEMA = """
+CREATE TABLE project (
+    id INTEGER NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    description VARCHAR(255),
+    active BOOLEAN NOT NULL,
+    created_at DATETIME,
+    PRIMARY KEY (id),
+    UNIQUE (name)
+);
+CREATE TABLE settings (
+    id INTEGER NOT NULL,
+    "key" VARCHAR(50) NOT NULL,
+    value VARCHAR(255) NOT NULL,
+    updated_at DATETIME,
+    PRIMARY KEY (id),
+    UNIQUE ("key")
+);
+CREATE TABLE user (
+    id INTEGER NOT NULL,
+    username VARCHAR(80) NOT NULL,
+    password_hash VARCHAR(128) NOT NULL,
+    is_admin BOOLEAN NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (username)
+);
+CREATE TABLE time_entry (
+    id INTEGER NOT NULL,
+    date DATE NOT NULL,
+    project_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    hours FLOAT NOT NULL,
+    description VARCHAR(500),
+    created_at DATETIME,
+    updated_at DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(project_id) REFERENCES project (id),
+    FOREIGN KEY(user_id) REFERENCES user (id)
+);
+INSERT INTO user (id, username, password_hash, is_admin) VALUES (1, 'legacy', 'x', 1);
+INSERT INTO project (id, name, active) VALUES (1, 'Legacy Project', 1);
+INSERT INTO settings (id, "key", value) VALUES (1, 'monthly_goal_hours', '120');
+INSERT INTO time_entry (date, project_id, user_id, hours, description) VALUES
+    ('2026-10-01', 1, 1, 1.5, 'legacy one'),
+    ('2026-10-01', 1, 1, 0.25, 'legacy two'),
+    ('2026-10-02', 1, 1, 1.0, 'legacy three');
+"""
+
+
+def run_flask(database_path, *args):
+    """Run a flask CLI command against database_path in a subprocess"""
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database_path}')
+    return subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', *args],
+                          cwd=HERE, env=env, capture_output=True, text=True)
+
+
+def baseline_database(directory):
+    path = os.path.join(directory, 'baseline.db')
+    connection = sqlite3.connect(path)
+    connection.executescript(BASELINE_SCHEMA)
+    connection.close()
+    return path
+
+
+def test_upgrade_converts_a_baseline_database():
+    with tempfile.TemporaryDirectory() as directory:
+        path = baseline_database(directory)
+        result = run_flask(path, 'db', 'upgrade')
+        assert result.returncode == 0, result.stderr
+
+        connection = sqlite3.connect(path)
+        try:
+            entries = connection.execute('SELECT minutes, org_id FROM time_entry ORDER BY id').fetchall()
+            rollup = connection.execute(
+                'SELECT org_id, user_id, project_id, date, minutes, entry_count FROM daily_rollup ORDER BY date'
+            ).fetchall()
+            projects = connection.execute('SELECT org_id, name FROM project').fetchall()
+        finally:
+            connection.close()
+        assert entries == [(90, 1), (15, 1), (60, 1)]
+        assert rollup == [(1, 1, 1, '2026-10-01', 105, 2), (1, 1, 1, '2026-10-02', 60, 1)]
+        assert projects == [(1, 'Legacy Project')]
+
+        result = run_flask(path, 'init-db', '--defaults')
+        assert result.returncode == 0, result.stderr
+
+
+def test_init_db_requires_upgrade_first():
+    with tempfile.TemporaryDirectory() as directory:
+        path = baseline_database(directory)
+        result = run_flask(path, 'init-db', '--defaults')
+        assert result.returncode != 0
+        assert 'flask db upgrade' in result.stderr
+        # Nothing was created before the check
+        connection = sqlite3.connect(path)
+        try:
+            tables = {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        finally:
+            connection.close()
+        assert tables == {'user', 'project', 'settings', 'time_entry'}
+
+
+def test_deploy_commands_create_an_empty_database():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'empty.db')
+        for command in (['db', 'upgrade'], ['init-db', '--defaults']):
+            result = run_flask(path, *command)
+            assert result.returncode == 0, (command, result.stderr)
+
+        connection = sqlite3.connect(path)
+        try:
+            projects = connection.execute('SELECT COUNT(*) FROM project WHERE org_id = 1').fetchone()[0]
+        finally:
+            connection.close()
+        assert projects == 5
+
+
+if __name__ == '__main__':
+    test_upgrade_converts_a_baseline_database()
+    test_init_db_requires_upgrade_first()
+    test_deploy_commands_create_an_empty_database()
+    print('Deploy commands migrate baseline and empty databases.')
@@ -0,0 +1,148 @@
+"""
+Who sees which entries: users within an organization, organizations within
+the deployment, and where the current organization comes from.
+
+Run with pytest.
+"""
+from datetime import date
+
+import pytest
+
+from app import db
+from models import (
+    DEFAULT_ORG_ID, Organization, Project, Settings, TimeEntry, User, current_org_id, get_setting,
+    rebuild_daily_rollups
+)
+from system_stats import compute_system_stats
+
+TODAY = date.today()
+STATS_URL = f'/api/cycle_stats/{TODAY.isoformat()}'
+
+
+def add_entries(app, user_id, project_name, descriptions, minutes=30, org_id=DEFAULT_ORG_ID):
+    """Entries dated today in a project of org_id (created if needed); returns their ids"""
+    with app.app_context():
+        project = Project.query.filter_by(name=project_name, org_id=org_id).first()
+        if project is None:
+            project = Project(name=project_name, org_id=org_id)
+            db.session.add(project)
+            db.session.flush()
+        entries = [TimeEntry(date=TODAY, project_id=project.id, user_id=user_id, org_id=org_id,
+                             minutes=minutes, description=description) for description in descriptions]
+        db.session.add_all(entries)
+        db.session.commit()
+        rebuild_daily_rollups()
+        return [entry.id for entry in entries]
+
+
+def test_entries_are_scoped_to_their_user(app, make_user, login):
+    owner_id = make_user('owner', is_admin=True)
+    scoped_id = make_user('scoped')
+    owner_entry_id = add_entries(app, owner_id, 'Shared Project', ['task 0', 'task 1'], minutes=90)[0]
+    add_entries(app, scoped_id, 'Shared Project', ['private scoped work'], minutes=45)
+
+    client = login('scoped')
+    assert client.get(STATS_URL).get_json()['total_minutes'] == 45
+    # scope=all is ignored for regular users
+    assert client.get(STATS_URL + '?scope=all').get_json()['total_minutes'] == 45
+    assert 'private scoped' in client.get('/search?q=work').get_data(as_text=True)
+    assert 'task 1' not in client.get('/search?q=task').get_data(as_text=True)
+    export = client.get('/export_data?quick=all_data').get_data(as_text=True)
+    assert 'private scoped work' in export and 'task 1' not in export
+    assert client.get(f'/edit_entry/{owner_entry_id}').status_code == 404
+    assert client.post(f'/delete_entry/{owner_entry_id}').status_code == 404
+
+    admin = login('owner')
+    assert admin.get(STATS_URL).get_json()['total_minutes'] == 180
+    assert admin.get(STATS_URL + '?scope=all').get_json()['total_minutes'] == 180 + 45
+    assert 'private scoped' not in admin.get('/search?q=work').get_data(as_text=True)
+    assert 'private scoped' in admin.get('/search?q=work&scope=all').get_data(as_text=True)
+
+
+def test_organizations_are_isolated(app, make_user, login):
+    owner_id = make_user('owner', is_admin=True, is_operator=True)
+    add_entries(app, owner_id, 'Budget Project 1', ['task 1'])
+    with app.app_context():
+        firm = Organization(name='Other Firm')
+        db.session.add(firm)
+        db.session.add(Settings(org_id=DEFAULT_ORG_ID, key='monthly_goal_hours', value='160'))
+        db.session.flush()
+        db.session.add(Settings(org_id=firm.id, key='monthly_goal_hours', value='100'))
+        db.session.commit()
+        firm_id = firm.id
+        owner_project_id = Project.query.filter_by(name='Budget Project 1').one().id
+    tenant_id = make_user('tenant', is_admin=True, org_id=firm_id)
+    # Project names only need to be unique within an organization
+    add_entries(app, tenant_id, 'Budget Project 1', ['tenant work'], org_id=firm_id)
+    with app.app_context():
+        assert get_setting('monthly_goal_hours', org_id=firm_id) == '100'
+
+    tenant = login('tenant')
+    # Even an admin's scope=all covers only their own organization, with its own settings
+    for url in (STATS_URL, STATS_URL + '?scope=all'):
+        stats = tenant.get(url).get_json()
+        assert stats['total_minutes'] == 30 and stats['monthly_goal'] == 100
+    assert tenant.get('/admin/dashboard').status_code == 200
+    assert 'task 1' not in tenant.get('/search?q=task&scope=all').get_data(as_text=True)
+    assert tenant.post(f'/toggle_project/{owner_project_id}').status_code == 404
+    assert tenant.get(f'/admin/users/{owner_id}/edit').status_code == 404
+    response = tenant.post('/api/entries', json={'date': TODAY.isoformat(), 'project_id': owner_project_id,
+                                                 'hours': '1'})
+    assert response.status_code == 400
+
+    # Deployment-wide diagnostics show every organization's queries: operators only
+    assert tenant.get('/admin/metrics').status_code == 302
+    assert tenant.get('/metrics').status_code == 403
+
+    owner = login('owner')
+    assert owner.get('/admin/metrics').status_code == 200
+    assert 'tenant work' not in owner.get('/search?q=work&scope=all').get_data(as_text=True)
+    assert 'tenant' not in owner.get('/admin/users').get_data(as_text=True)
+
+
+def test_signup_creates_its_own_organization(app, make_user):
+    make_user('owner', is_admin=True)
+    with app.app_context():
+        db.session.add_all([Project(name='Existing Project', org_id=DEFAULT_ORG_ID),
+                            Settings(org_id=DEFAULT_ORG_ID, key='monthly_goal_hours', value='160')])
+        db.session.commit()
+
+    client = app.test_client()
+    response = client.post('/signup', data={'username': 'newcomer', 'password': 'newcomer-password',
+                                            'organization': 'Newcomer LLC'})
+    assert response.status_code == 302
+    client.post('/login', data={'username': 'newcomer', 'password': 'newcomer-password'})
+    with app.app_context():
+        newcomer = User.query.filter_by(username='newcomer').one()
+        assert newcomer.is_admin and not newcomer.is_operator
+        assert newcomer.organization.name == 'Newcomer LLC' and newcomer.org_id != DEFAULT_ORG_ID
+        newcomer_org_id = newcomer.org_id
+
+    # The new organization starts with the default projects and settings, and
+    # its admin cannot reach the existing organization's
+    projects = client.get('/projects').get_data(as_text=True)
+    assert 'Client A - Development' in projects and 'Existing Project' not in projects
+    client.post('/settings', data={'monthly_goal_hours': '1', 'cycle_start_day': '25'})
+    with app.app_context():
+        assert get_setting('monthly_goal_hours', org_id=DEFAULT_ORG_ID) == '160'
+        assert get_setting('monthly_goal_hours', org_id=newcomer_org_id) == '1.0'
+
+
+def test_current_org_needs_a_logged_in_user(app):
+    with app.app_context():
+        with pytest.raises(RuntimeError):
+            current_org_id()
+        with pytest.raises(RuntimeError):
+            get_setting('monthly_goal_hours')
+    with app.test_request_context('/'):
+        with pytest.raises(RuntimeError):
+            current_org_id()
+
+
+def test_jobs_and_commands_read_settings_of_an_explicit_org(app):
+    with app.app_context():
+        db.session.add(Settings(org_id=DEFAULT_ORG_ID, key='cycle_start_day', value='1'))
+        db.session.commit()
+        assert get_setting('cycle_start_day', org_id=DEFAULT_ORG_ID) == '1'
+        # The organization's own cycle start day, without a request to take it from
+        assert compute_system_stats(DEFAULT_ORG_ID).cycle.start_date.day == 1
@@ -0,0 +1,72 @@
+"""
+Keyset pagination across entries that have no created_at.
+
+Rows written by older releases have created_at NULL; they must page like any
+other entry instead of breaking the cursor or falling between two pages.
+
+Run with pytest.
+"""
+import html
+import re
+from datetime import date, timedelta
+
+from app import db
+from models import DEFAULT_ORG_ID, Project, TimeEntry
+from queries import PAGE_SIZE
+
+TODAY = date.today()
+
+
+def add_entries(app, user_id, count, legacy_count, days=1):
+    """count entries over the last days; the first legacy_count get created_at NULL"""
+    with app.app_context():
+        project = Project(name='Paged Project', org_id=DEFAULT_ORG_ID)
+        db.session.add(project)
+        db.session.flush()
+        entries = [TimeEntry(date=TODAY - timedelta(days=i % days), project_id=project.id, user_id=user_id,
+                             org_id=DEFAULT_ORG_ID, minutes=30, description=f'paged {i}')
+                   for i in range(count)]
+        db.session.add_all(entries)
+        db.session.flush()
+        TimeEntry.query.filter(TimeEntry.id.in_([entry.id for entry in entries[:legacy_count]])).update(
+            {TimeEntry.created_at: None}, synchronize_session=False)
+        db.session.commit()
+        return [entry.id for entry in entries]
+
+
+def test_api_pages_include_entries_without_created_at(app, make_user, login):
+    entry_ids = add_entries(app, make_user('pager'), count=9, legacy_count=5, days=2)
+    client = login('pager')
+
+    seen, cursor = [], None
+    while True:
+        response = client.get('/api/entries?limit=2' + (f'&cursor={cursor}' if cursor else ''))
+        assert response.status_code == 200, response.get_data(as_text=True)
+        body = response.get_json()
+        seen += [(entry['id'], entry['date'], entry['created_at']) for entry in body['entries']]
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+
+    assert sorted(entry_id for entry_id, _, _ in seen) == sorted(entry_ids)
+    # Newest day first; within a day the entries without created_at come last
+    order = [(entry_date, created_at is None) for _, entry_date, created_at in seen]
+    assert order == sorted(order, key=lambda key: (date.fromisoformat(key[0]), not key[1]), reverse=True)
+
+
+def test_entries_view_loads_more_past_entries_without_created_at(app, make_user, login):
+    add_entries(app, make_user('viewer'), count=PAGE_SIZE + 10, legacy_count=PAGE_SIZE // 2)
+    client = login('viewer')
+
+    response = client.get('/entries')
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    shown = re.findall(r'paged (\d+)<', page)
+    load_more = re.search(r'data-load-more="([^"]+)"', page)
+    next_url = html.unescape(load_more.group(1)) if load_more else None
+    while next_url:
+        body = client.get(next_url).get_json()
+        shown += re.findall(r'paged (\d+)<', body['html'])
+        next_url = body['next_url']
+
+    assert sorted(map(int, shown)) == list(range(PAGE_SIZE + 10))
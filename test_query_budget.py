@@ -0,0 +1,214 @@
+"""
+SQL statement budget per route.
+
+Seeds a throwaway SQLite database with entries spread over many projects,
+requests each list/report view through the Flask test client and fails if a
+view issues more SQL statements than its budget. The budgets do not depend on
+the number of rows, so an N+1 lazy load shows up as a failure.
+
+Run with pytest or directly: python test_query_budget.py
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+# Point the app at a scratch database before it is imported
+_fd, _db_path = tempfile.mkstemp(suffix='.db', prefix='query_budget_')
+os.close(_fd)
+os.environ['DATABASE_URL'] = f'sqlite:///{_db_path}'
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import event
+
+from app import create_app, init_database, db
+
+# Run background export jobs inline so the budget covers generating the file
+_export_dir = tempfile.mkdtemp(prefix='query_budget_exports_')
+app = create_app({'EXPORT_JOBS_EAGER': True, 'EXPORT_DIR': _export_dir})
+
+
+@atexit.register
+def _remove_scratch_database():
+    """Close the pooled connections and delete the database with its WAL files and the exports"""
+    with app.app_context():
+        db.engine.dispose()
+    for path in (_db_path, _db_path + '-wal', _db_path + '-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+    shutil.rmtree(_export_dir, ignore_errors=True)
+
+
+from models import User, Project, TimeEntry, rebuild_daily_rollups
+from response_cache import render_cache
+from instrumentation import metrics
+from system_stats import clear_system_stats_cache
+
+TODAY = date.today()
+
+# Maximum statements per request, independent of how many entries match. Views
+# behind cached_view include the data version lookup that builds their ETag.
+QUERY_BUDGETS = {
+    '/': 6,
+    '/entries': 6,
+    '/search?q=task': 6,
+    '/reports': 5,
+    '/reports/trends?cycles=24': 4,
+    '/api/trends?cycles=36': 4,
+    '/export_data?quick=all_data': 2,
+    f'/api/cycle_stats/{TODAY.isoformat()}': 4,
+    '/admin/dashboard': 8,
+}
+
+# Queuing the job (prune, pending check, insert) plus running it inline (status
+# updates, the row SELECT and the project totals); independent of the row count
+PDF_EXPORT_BUDGET = 12
+
+# Views behind the ETag/render cache and what a cache hit may cost
+CACHED_URLS = ['/', '/reports', '/reports/trends', f'/api/cycle_stats/{TODAY.isoformat()}']
+CACHE_HIT_BUDGET = 2
+
+
+@contextmanager
+def count_queries():
+    """Count SQL statements executed on the app engine inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def seed(entry_count=120, project_count=12):
+    """Create one user and entries spread across many projects"""
+    with app.app_context():
+        init_database()
+        if User.query.filter_by(username='budget').first():
+            return
+        user = User(username='budget', is_admin=True, is_operator=True)
+        user.set_password('budget-password')
+        db.session.add(user)
+        projects = [Project(name=f'Budget Project {i}') for i in range(project_count)]
+        db.session.add_all(projects)
+        db.session.flush()
+        for i in range(entry_count):
+            db.session.add(TimeEntry(
+                date=TODAY - timedelta(days=i % 20),
+                project_id=projects[i % project_count].id,
+                user_id=user.id,
+                org_id=user.org_id,
+                minutes=90,
+                description=f'task {i}'
+            ))
+        db.session.commit()
+        rebuild_daily_rollups()
+
+
+def logged_in_client():
+    client = app.test_client()
+    response = client.post('/login', data={'username': 'budget', 'password': 'budget-password'})
+    assert response.status_code == 302
+    return client
+
+
+def test_views_stay_within_query_budget():
+    seed()
+    client = logged_in_client()
+    # Warm the in-process caches so the budgets measure the steady state
+    for url in QUERY_BUDGETS:
+        client.get(url).get_data()
+    failures = []
+    for url, budget in QUERY_BUDGETS.items():
+        # Measure the view itself, not a render or stats cache hit
+        render_cache.clear()
+        clear_system_stats_cache()
+        with count_queries() as statements:
+            response = client.get(url)
+            response.get_data()  # drain streamed responses
+        assert response.status_code == 200, (url, response.status_code)
+        if len(statements) > budget:
+            failures.append(f'{url}: {len(statements)} statements (budget {budget})')
+    assert not failures, '\n'.join(failures)
+
+
+def test_unchanged_pages_are_served_from_cache():
+    seed()
+    client = logged_in_client()
+    client.get('/')  # shows (and clears) the login flash message, which is never cached
+    for url in CACHED_URLS:
+        first = client.get(url)
+        assert first.status_code == 200 and first.get_etag()[0], url
+
+        # Conditional reload: the user and the data versions are the only lookups
+        with count_queries() as statements:
+            response = client.get(url, headers={'If-None-Match': first.get_etag()[0]})
+        assert response.status_code == 304, (url, response.status_code)
+        assert len(statements) <= CACHE_HIT_BUDGET, (url, statements)
+
+        # Plain reload: same cost, body from the render cache
+        with count_queries() as statements:
+            response = client.get(url)
+        assert response.get_data() == first.get_data(), url
+        assert len(statements) <= CACHE_HIT_BUDGET, (url, statements)
+
+
+def test_entry_write_changes_etag():
+    seed()
+    client = logged_in_client()
+    client.get('/')
+    etag = client.get('/').get_etag()[0]
+    with app.app_context():
+        entry = TimeEntry.query.filter_by(description='task 0').first()
+        entry.minutes += 30
+        db.session.commit()
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+
+
+def test_pdf_export_stays_within_query_budget():
+    seed()
+    client = logged_in_client()
+    with count_queries() as statements:
+        response = client.post('/export_data', data={'format': 'pdf', 'include_totals': 'on'},
+                               headers={'Accept': 'application/json'})
+    assert response.status_code == 202
+    assert response.get_json()['status'] == 'done'
+    assert len(statements) <= PDF_EXPORT_BUDGET, f'PDF export: {len(statements)} statements'
+
+
+def test_instrumentation_counts_statements():
+    seed()
+    client = logged_in_client()
+    client.get('/entries').get_data()
+    metrics.reset()
+    with count_queries() as statements:
+        client.get('/entries').get_data()
+    summary = {row['endpoint']: row for row in metrics.endpoint_summary()}
+    assert summary['main.entries']['requests'] == 1
+    assert summary['main.entries']['max_statements'] == len(statements)
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert 'timetracker_requests_total{endpoint="main.entries"} 1' in response.get_data(as_text=True)
+    assert client.get('/admin/metrics').status_code == 200
+    assert app.test_client().get('/metrics').status_code == 403
+
+
+if __name__ == '__main__':
+    test_views_stay_within_query_budget()
+    test_unchanged_pages_are_served_from_cache()
+    test_entry_write_changes_etag()
+    test_pdf_export_stays_within_query_budget()
+    test_instrumentation_counts_statements()
+    print('All views within query budget.')
@@ -0,0 +1,31 @@
+"""
+Data versions behind the ETag/render cache.
+
+Run with pytest.
+"""
+from datetime import date
+
+from app import db
+from models import (
+    DEFAULT_ORG_ID, Project, TimeEntry, get_data_versions, user_entries_version_key, org_entries_version_key
+)
+
+
+def test_moving_an_entry_bumps_both_users_versions(app, make_user):
+    first_id, second_id = make_user('first'), make_user('second')
+    keys = [user_entries_version_key(first_id), user_entries_version_key(second_id),
+            org_entries_version_key(DEFAULT_ORG_ID)]
+    with app.app_context():
+        project = Project(name='Moved Project', org_id=DEFAULT_ORG_ID)
+        db.session.add(project)
+        db.session.flush()
+        entry = TimeEntry(date=date.today(), project_id=project.id, user_id=first_id, org_id=DEFAULT_ORG_ID,
+                          minutes=30)
+        db.session.add(entry)
+        db.session.commit()
+        before = get_data_versions(keys)
+
+        entry.user_id = second_id
+        db.session.commit()
+        after = get_data_versions(keys)
+    assert all(after[key] > before[key] for key in keys)
@@ -1,78 +1,97 @@
 from datetime import date, datetime, timedelta
-from calendar import monthrange
+from collections import namedtuple
+from functools import lru_cache
 
-def get_current_monthly_cycle():
+# Billing cycles run from the start day of one month to the day before it in
+# the next month (25th to 24th by default). The start day is the
+# 'cycle_start_day' setting; it is capped at 28 so every month has it.
+DEFAULT_CYCLE_START_DAY = 25
+MAX_CYCLE_START_DAY = 28
+
+Cycle = namedtuple('Cycle', ['start_date', 'end_date', 'name'])
+
+# Time entries store whole minutes; hours only appear when values are displayed
+MINUTES_PER_HOUR = 60
+
+def get_cycle_start_day(org_id=None):
+    """Configured first day of an organization's billing cycle, 1-28 (default: the current user's organization)"""
+    from models import get_setting
+    try:
+        start_day = int(get_setting('cycle_start_day', DEFAULT_CYCLE_START_DAY, org_id=org_id))
+    except (TypeError, ValueError):
+        return DEFAULT_CYCLE_START_DAY
+    if 1 <= start_day <= MAX_CYCLE_START_DAY:
+        return start_day
+    return DEFAULT_CYCLE_START_DAY
+
+def ordinal(number):
+    """1 -> '1st', 22 -> '22nd', 25 -> '25th'"""
+    if 10 <= number % 100 <= 20:
+        suffix = 'th'
+    else:
+        suffix = {1: 'st', 2: 'nd', 3: 'rd'}.get(number % 10, 'th')
+    return f"{number}{suffix}"
+
+def cycle_boundary_label(start_day=None):
+    """Human readable cycle boundary, e.g. '25th to 24th'"""
+    if start_day is None:
+        start_day = get_cycle_start_day()
+    if start_day == 1:
+        return '1st to end of month'
+    return f"{ordinal(start_day)} to {ordinal(start_day - 1)}"
+
+def cycle_id_for_date(target_date, start_day=DEFAULT_CYCLE_START_DAY):
     """
-    Get the current monthly cycle dates (25th to 24th).
-    Returns tuple of (start_date, end_date, cycle_name)
+    Cycle id of a date: the month index (year * 12 + month - 1) of the month
+    its cycle starts in. Consecutive cycles have consecutive ids.
     """
-    today = date.today()
-    
-    # If today is before the 25th, we're in the cycle that started last month
-    if today.day < 25:
-        # Cycle started on the 25th of the previous month
-        if today.month == 1:
-            start_year = today.year - 1
-            start_month = 12
-        else:
-            start_year = today.year
-            start_month = today.month - 1
-        
-        start_date = date(start_year, start_month, 25)
-        end_date = date(today.year, today.month, 24)
-        cycle_name = f"{start_date.strftime('%b %Y')} - {end_date.strftime('%b %Y')}"
+    month_index = target_date.year * 12 + target_date.month - 1
+    return month_index - 1 if target_date.day < start_day else month_index
+
+@lru_cache(maxsize=1024)
+def cycle_from_id(cycle_id, start_day=DEFAULT_CYCLE_START_DAY):
+    """Cycle (start_date, end_date, name) for a cycle id"""
+    year, month = divmod(cycle_id, 12)
+    start_date = date(year, month + 1, start_day)
+    next_year, next_month = divmod(cycle_id + 1, 12)
+    end_date = date(next_year, next_month + 1, start_day) - timedelta(days=1)
+    if start_day == 1:
+        name = start_date.strftime('%b %Y')
     else:
-        # Cycle starts on the 25th of this month
-        start_date = date(today.year, today.month, 25)
-        
-        # End date is 24th of next month
-        if today.month == 12:
-            end_year = today.year + 1
-            end_month = 1
-        else:
-            end_year = today.year
-            end_month = today.month + 1
-        
-        end_date = date(end_year, end_month, 24)
-        cycle_name = f"{start_date.strftime('%b %Y')} - {end_date.strftime('%b %Y')}"
-    
-    return start_date, end_date, cycle_name
+        name = f"{start_date.strftime('%b %Y')} - {end_date.strftime('%b %Y')}"
+    return Cycle(start_date, end_date, name)
+
+@lru_cache(maxsize=4096)
+def _cached_cycle_for(target_date, start_day):
+    return cycle_from_id(cycle_id_for_date(target_date, start_day), start_day)
+
+def cycle_for(target_date, start_day=None):
+    """Cycle containing target_date (cached per date and start day)"""
+    if start_day is None:
+        start_day = get_cycle_start_day()
+    return _cached_cycle_for(target_date, start_day)
+
+def cycle_table(first_id, last_id, start_day=None):
+    """{cycle_id: Cycle} for every cycle from first_id to last_id inclusive"""
+    if start_day is None:
+        start_day = get_cycle_start_day()
+    return {cycle_id: cycle_from_id(cycle_id, start_day) for cycle_id in range(first_id, last_id + 1)}
+
+def get_current_monthly_cycle():
+    """
+    Get the current billing cycle.
+    Returns Cycle (start_date, end_date, cycle_name), which also unpacks as a tuple
+    """
+    return cycle_for(date.today())
 
 def get_monthly_cycle_for_date(target_date):
     """
-    Get the monthly cycle dates for a specific date.
-    Returns tuple of (start_date, end_date, cycle_name)
+    Get the billing cycle for a specific date.
+    Returns Cycle (start_date, end_date, cycle_name), which also unpacks as a tuple
     """
     if isinstance(target_date, str):
         target_date = datetime.strptime(target_date, '%Y-%m-%d').date()
-    
-    # If target date is before the 25th, cycle started last month
-    if target_date.day < 25:
-        if target_date.month == 1:
-            start_year = target_date.year - 1
-            start_month = 12
-        else:
-            start_year = target_date.year
-            start_month = target_date.month - 1
-        
-        start_date = date(start_year, start_month, 25)
-        end_date = date(target_date.year, target_date.month, 24)
-    else:
-        # Cycle starts on the 25th of this month
-        start_date = date(target_date.year, target_date.month, 25)
-        
-        # End date is 24th of next month
-        if target_date.month == 12:
-            end_year = target_date.year + 1
-            end_month = 1
-        else:
-            end_year = target_date.year
-            end_month = target_date.month + 1
-        
-        end_date = date(end_year, end_month, 24)
-    
-    cycle_name = f"{start_date.strftime('%b %Y')} - {end_date.strftime('%b %Y')}"
-    return start_date, end_date, cycle_name
+    return cycle_for(target_date)
 
 def hours_to_decimal(hours_str):
     """
@@ -107,6 +126,40 @@ def hours_to_decimal(hours_str):
     except ValueError:
         return 0.0
 
+def hours_to_minutes(hours_str):
+    """
+    Convert an hours string to whole minutes.
+    Accepts the same formats as hours_to_decimal; "8:30" converts exactly and
+    decimal hours are rounded to the nearest minute.
+    """
+    if not hours_str:
+        return 0
+    
+    hours_str = str(hours_str).strip()
+    if ':' in hours_str:
+        try:
+            parts = hours_str.split(':')
+            hours = int(parts[0])
+            minutes = int(parts[1]) if len(parts) > 1 else 0
+        except (ValueError, IndexError):
+            return 0
+        if minutes < 0 or minutes >= MINUTES_PER_HOUR:
+            return 0
+        return hours * MINUTES_PER_HOUR + minutes
+    
+    return round(hours_to_decimal(hours_str) * MINUTES_PER_HOUR)
+
+def minutes_to_hours(minutes):
+    """Whole minutes as decimal hours, for display and charts"""
+    return (minutes or 0) / MINUTES_PER_HOUR
+
+def minutes_to_hours_minutes(minutes):
+    """
+    Convert whole minutes to hours:minutes format.
+    """
+    hours, minutes = divmod(int(minutes or 0), MINUTES_PER_HOUR)
+    return f"{hours}:{minutes:02d}"
+
 def decimal_to_hours_minutes(decimal_hours):
     """
     Convert decimal hours to hours:minutes format.
@@ -114,37 +167,16 @@ def decimal_to_hours_minutes(decimal_hours):
     if not decimal_hours:
         return "0:00"
     
-    total_minutes = int(decimal_hours * 60)
-    hours = total_minutes // 60
-    minutes = total_minutes % 60
-    return f"{hours}:{minutes:02d}"
+    return minutes_to_hours_minutes(round(decimal_hours * MINUTES_PER_HOUR))
 
 def get_previous_cycles(num_cycles=12):
     """
-    Get a list of previous monthly cycles for navigation.
-    Returns list of objects with start_date, end_date, and name attributes
+    Get a list of previous billing cycles for navigation, newest first.
+    Returns list of Cycle tuples with start_date, end_date, and name attributes
     """
-    class Cycle:
-        def __init__(self, start_date, end_date, name):
-            self.start_date = start_date
-            self.end_date = end_date
-            self.name = name
-    
-    cycles = []
-    current_start, current_end, current_name = get_current_monthly_cycle()
-    
-    # Add current cycle
-    cycles.append(Cycle(current_start, current_end, current_name))
-    
-    # Add previous cycles
-    for i in range(1, num_cycles):
-        # Go back one cycle at a time
-        prev_start = current_start - timedelta(days=1)  # Day before current start
-        prev_start, prev_end, prev_name = get_monthly_cycle_for_date(prev_start)
-        cycles.append(Cycle(prev_start, prev_end, prev_name))
-        current_start = prev_start
-    
-    return cycles
+    start_day = get_cycle_start_day()
+    current_id = cycle_id_for_date(date.today(), start_day)
+    return [cycle_from_id(current_id - i, start_day) for i in range(num_cycles)]
 
 def format_date_for_input(date_obj):
     """Format date for HTML date input (YYYY-MM-DD)"""
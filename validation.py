@@ -0,0 +1,78 @@
+"""
+Validation shared by every path that creates or edits time entries
+(HTML forms, JSON API, CSV import).
+"""
+from models import Project, current_org_id
+from utils import hours_to_minutes, parse_date_from_input, MINUTES_PER_HOUR
+
+MAX_HOURS_PER_ENTRY = 24
+MAX_DESCRIPTION_LENGTH = 500
+
+
+def validate_entry_fields(date_str, project_id, hours_str, description='', known_project_ids=None, org_id=None):
+    """
+    Validate raw entry fields.
+    Returns (values, errors) where values is a dict with date, project_id, minutes
+    and description. The project must belong to org_id (default: the current
+    user's organization); pass known_project_ids (a set of ints, from
+    existing_project_ids()) to check it against a preloaded set instead of querying for it.
+    """
+    errors = []
+
+    # Validate date
+    entry_date = parse_date_from_input(date_str) if isinstance(date_str, str) else None
+    if not entry_date:
+        errors.append('Please provide a valid date')
+
+    # Validate project
+    project_id_value = None
+    if project_id in (None, ''):
+        errors.append('Please select a project')
+    else:
+        try:
+            project_id_value = int(project_id)
+        except (TypeError, ValueError):
+            project_id_value = None
+        if project_id_value is None:
+            errors.append('Invalid project selected')
+        elif known_project_ids is not None:
+            if project_id_value not in known_project_ids:
+                errors.append('Invalid project selected')
+        elif not Project.query.filter_by(
+                id=project_id_value, org_id=current_org_id() if org_id is None else org_id).first():
+            errors.append('Invalid project selected')
+
+    # Validate hours
+    minutes = hours_to_minutes(hours_str)
+    if minutes <= 0:
+        errors.append('Please provide valid hours (greater than 0)')
+    if minutes > MAX_HOURS_PER_ENTRY * MINUTES_PER_HOUR:
+        errors.append('Hours cannot exceed 24 per day')
+
+    description = (description or '').strip()
+    if len(description) > MAX_DESCRIPTION_LENGTH:
+        errors.append(f'Description cannot exceed {MAX_DESCRIPTION_LENGTH} characters')
+
+    values = {
+        'date': entry_date,
+        'project_id': project_id_value,
+        'minutes': minutes,
+        'description': description
+    }
+    return values, errors
+
+
+def existing_project_ids(project_ids, org_id=None):
+    """Return the subset of project_ids that exist in org_id (default: the current user's), in one IN query"""
+    ids = set()
+    for project_id in project_ids:
+        try:
+            ids.add(int(project_id))
+        except (TypeError, ValueError):
+            continue
+    if not ids:
+        return set()
+    if org_id is None:
+        org_id = current_org_id()
+    return {project_id for (project_id,) in
+            Project.query.with_entities(Project.id).filter(Project.org_id == org_id, Project.id.in_(ids)).all()}